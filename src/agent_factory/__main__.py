@@ -8,11 +8,19 @@ from opentelemetry.sdk.trace.export import (
 )
 
 from agent_factory.config import TRACES_DIR
-from agent_factory.factory_tools import read_file, search_mcp_servers
-from agent_factory.instructions import load_system_instructions
-from agent_factory.schemas import AgentFactoryOutputs
+from agent_factory.factory_tools import (
+    get_mcp_server_details,
+    preload_tool_sources,
+    read_file,
+    read_files,
+    search_mcp_servers,
+)
+from agent_factory.instructions import instructions_cache_key, load_system_instructions
+from agent_factory.schemas import AgentFactoryOutputs, DraftedReadmeAgentFactoryOutputs
 from agent_factory.utils import logger
 from agent_factory.utils.json_exporter import JsonFileSpanExporter
+from agent_factory.utils.llm_cassette import install_configured_cassette
+from agent_factory.utils.mcp_registry import get_registry_index_async
 
 dotenv.load_dotenv()
 
@@ -32,6 +40,18 @@ async def main(
     host: str = "localhost",
     port: int = 8080,
     log_level: str = "info",
+    tool_digest: bool = False,
+    max_tokens: int | None = None,
+    max_cost: float | None = None,
+    max_seconds: float | None = None,
+    budget_soft_limit: float = 0.8,
+    api_base: str | None = None,
+    prepare_artifacts: bool = False,
+    artifact_workers: int = 4,
+    drafts: int = 1,
+    max_concurrent_drafts: int | None = None,
+    drafts_max_cost: float | None = None,
+    draft_readme: bool = False,
 ):
     """Main entry point for the agent application.
 
@@ -43,39 +63,115 @@ async def main(
         host (str): The host address for the agent server
         port (int): The port for the agent server
         log_level (str): The logging level
+        tool_digest (bool): Whether to embed a digest of the available Python tools in the system instructions
+        max_tokens (int | None): The maximum number of input plus output tokens of a run, unlimited if not set
+        max_cost (float | None): The maximum cost in USD of a run, unlimited if not set
+        max_seconds (float | None): The maximum wall-clock duration in seconds of a run, unlimited if not set
+        budget_soft_limit (float): The fraction of a budget limit at which the agent is asked to wrap up
+        api_base (str | None): The base URL of the model API, e.g. of a local stub model server, instead of the
+            provider's default
+        prepare_artifacts (bool): Whether to prepare the agent artifacts on the server and stream them to the clients,
+            instead of leaving their preparation to each client
+        artifact_workers (int): The number of worker threads preparing the agent artifacts, if prepared on the server
+        drafts (int): The number of speculative drafts generated concurrently for each request, the first one whose
+            artifacts can be prepared being returned. 1 disables the speculative drafts
+        max_concurrent_drafts (int | None): The number of drafts of a request running at the same time, all of them if
+            not set
+        drafts_max_cost (float | None): The maximum total cost in USD of the drafts of a request, unlimited if not set
+        draft_readme (bool): Whether to have the README drafted with the fast model of the `readme` route, instead of
+            written by the agent with `model`
     """
     from any_agent import AgentConfig, AnyAgent
     from any_agent.callbacks import get_default_callbacks
-    from any_agent.serving import A2AServingConfig
+    from any_agent.serving import A2AServingConfig, _get_a2a_app_async, serve_a2a_async
 
-    from agent_factory.callbacks import LimitAgentTurns
+    from agent_factory.callbacks import (
+        CompactContext,
+        ConcurrentToolCalls,
+        LimitAgentBudget,
+        LimitAgentTurns,
+        MemoizeToolCalls,
+        RecordCachedTokens,
+        RecordModelRoute,
+        cacheable,
+        parallelizable,
+    )
     from agent_factory.tools.search_tavily import search_tavily
     from agent_factory.tools.visit_webpage import visit_webpage
+    from agent_factory.utils.model_routing import get_model_router, summarize_long_webpages
 
     logger.info(f"Starting the A2A server in {'chat' if chat else 'non-chat'} mode.")
     logger.info(f"Using framework: {framework} and model: {model}")
+    # Validates the configured routes before serving, instead of on the first routed call.
+    logger.info(f"Routing the mechanical subtasks with {get_model_router()}")
+    install_configured_cassette()
+
+    # Load the MCP registry index (from its snapshot, if there is one) before serving, instead of on the first request.
+    try:
+        await get_registry_index_async()
+    except (RuntimeError, ValueError) as e:
+        logger.warning(f"Failed to load the MCP registry, it will be loaded on first use: {e}")
+    logger.info(f"Preloaded {preload_tool_sources()} tool files")
 
+    instructions = load_system_instructions(chat=chat, include_tool_digest=tool_digest, draft_readme=draft_readme)
+    instructions_key = instructions_cache_key(chat=chat, include_tool_digest=tool_digest, draft_readme=draft_readme)
+    logger.info(f"Using the system instructions {instructions_key}")
+
+    tools = [
+        cacheable(parallelizable(summarize_long_webpages(visit_webpage))),
+        parallelizable(search_tavily),
+        cacheable(parallelizable(read_file)),
+        cacheable(parallelizable(read_files)),
+        cacheable(parallelizable(search_mcp_servers)),
+        cacheable(parallelizable(get_mcp_server_details)),
+    ]
     agent = await AnyAgent.create_async(
         framework,
         AgentConfig(
             model_id=model,
-            instructions=load_system_instructions(chat=chat),
+            api_base=api_base,
+            instructions=instructions,
             description="Agent for generating agentic workflows based on user prompts.",
-            callbacks=[*get_default_callbacks(), LimitAgentTurns(max_turns=max_turns)],
-            tools=[
-                visit_webpage,
-                search_tavily,
-                read_file,
-                search_mcp_servers,
+            callbacks=[
+                *get_default_callbacks(),
+                LimitAgentTurns(max_turns=max_turns),
+                # After the default callbacks, so that the token usage and cost are already on the LLM call spans.
+                LimitAgentBudget(
+                    max_tokens=max_tokens,
+                    max_cost=max_cost,
+                    max_seconds=max_seconds,
+                    soft_limit=budget_soft_limit,
+                ),
+                CompactContext(),
+                RecordCachedTokens(instructions_key=instructions_key),
+                RecordModelRoute(),
+                MemoizeToolCalls(),
+                ConcurrentToolCalls(tools),
             ],
+            tools=tools,
             model_args={"tool_choice": "auto"},
-            output_type=AgentFactoryOutputs,
+            output_type=DraftedReadmeAgentFactoryOutputs if draft_readme else AgentFactoryOutputs,
         ),
     )
 
-    server_handle = await agent.serve_async(
-        A2AServingConfig(host=host, port=port, log_level=log_level, stream_tool_usage=True)
-    )
+    serving_config = A2AServingConfig(host=host, port=port, log_level=log_level, stream_tool_usage=True)
+    if prepare_artifacts or drafts > 1:
+        from agent_factory.utils.artifact_serving import enable_artifact_preparation
+        from agent_factory.utils.speculative_drafts import enable_speculative_drafts
+
+        # Build the A2A app as `agent.serve_async` does, to wrap its agent executor before serving it.
+        app = await _get_a2a_app_async(agent, serving_config=serving_config)
+        if drafts > 1:
+            enable_speculative_drafts(
+                app, drafts, max_concurrent_drafts=max_concurrent_drafts, max_cost=drafts_max_cost
+            )
+        if prepare_artifacts:
+            enable_artifact_preparation(app, max_workers=artifact_workers)
+        server_handle = await serve_a2a_async(
+            app, host=host, port=port, endpoint=serving_config.endpoint, log_level=log_level
+        )
+    else:
+        server_handle = await agent.serve_async(serving_config)
 
     try:
         # Keep the server running
@@ -16,12 +16,15 @@ from agent_factory.utils import (
     create_agent_trace_from_dumped_spans,
     create_message_request,
     get_a2a_agent_card,
+    get_artifact_cache,
+    get_server_prepared_artifacts,
     get_storage_backend,
     logger,
-    prepare_agent_artifacts,
+    prepare_agent_artifacts_async,
     process_a2a_agent_final_response,
     process_streaming_response_message,
 )
+from agent_factory.utils.llm_cassette import install_configured_cassette
 
 trace.set_tracer_provider(TracerProvider())
 HTTPXClientInstrumentor().instrument()
@@ -49,6 +52,8 @@ async def generate_target_agent(
         port: The port for the agent server (default: 8080).
         timeout: The timeout for the request in seconds (default: 600).
     """
+    # The syntax of the generated code may be repaired with an LLM, whose calls can be recorded or replayed.
+    install_configured_cassette()
     with tracer.start_as_current_span("generate_target_agent") as span:
         trace_id = trace.format_trace_id(span.get_span_context().trace_id)
         spans_dump_file_path = TRACES_DIR / f"0x{trace_id}.jsonl"
@@ -71,26 +76,34 @@ async def generate_target_agent(
                 request = create_message_request(message, request_id=request_id)
 
                 responses = []
-                async for response in client.send_message_streaming(request, http_kwargs={"timeout": timeout}):
-                    processed_response = process_streaming_response_message(response)
-                    if processed_response.message:
-                        if processed_response.message_type == "info":
-                            log_message = f"{processed_response.message} \n"
-                            if processed_response.message_attributes:
-                                log_message += f"{processed_response.message_attributes} \n"
-                            logger.info(log_message)
-                        else:
-                            logger.error(processed_response.message)
-                    responses.append(response)
+                with tracer.start_as_current_span("a2a_streaming"):
+                    async for response in client.send_message_streaming(request, http_kwargs={"timeout": timeout}):
+                        processed_response = process_streaming_response_message(response)
+                        if processed_response.message:
+                            if processed_response.message_type == "info":
+                                log_message = f"{processed_response.message} \n"
+                                if processed_response.message_attributes:
+                                    log_message += f"{processed_response.message_attributes} \n"
+                                logger.info(log_message)
+                            else:
+                                logger.error(processed_response.message)
+                        responses.append(response)
 
                 # Process response
                 final_response = responses[-1]
                 response = process_a2a_agent_final_response(final_response)
                 response_json = response.model_dump_json()
                 if response.status == Status.COMPLETED:
-                    prepared_artifacts = prepare_agent_artifacts(response.model_dump())
+                    # A server preparing the artifacts streams them, otherwise they are prepared here.
+                    prepared_artifacts = get_server_prepared_artifacts(responses)
+                    if prepared_artifacts is None:
+                        with tracer.start_as_current_span("prepare_agent_artifacts"):
+                            prepared_artifacts = await prepare_agent_artifacts_async(
+                                response.model_dump(), cache=get_artifact_cache()
+                            )
                     logger.info(f"Saving agent artifacts to {output_dir} folder on {storage_backend.__str__()}")
-                    storage_backend.save(prepared_artifacts, Path(output_dir))
+                    with tracer.start_as_current_span("storage"):
+                        storage_backend.save(prepared_artifacts, Path(output_dir))
                 elif response.status == Status.INPUT_REQUIRED:
                     logger.info(
                         f"Please try again and be more specific with your request. Agent's response: {response.message}"
@@ -111,9 +124,11 @@ async def generate_target_agent(
         finally:
             # Upload trace regardless of success or failure for debugging purposes
             logger.info(f"Creating agent trace from {spans_dump_file_path}")
-            agent_trace = create_agent_trace_from_dumped_spans([spans_dump_file_path], final_output=response_json)
+            with tracer.start_as_current_span("trace_assembly"):
+                agent_trace = create_agent_trace_from_dumped_spans([spans_dump_file_path], final_output=response_json)
             logger.info(f"Uploading agent trace to {output_dir} folder on {storage_backend}")
-            storage_backend.upload_trace_file(agent_trace, Path(output_dir))
+            with tracer.start_as_current_span("storage"):
+                storage_backend.upload_trace_file(agent_trace, Path(output_dir))
 
 
 def main():
@@ -1,4 +1,34 @@
+import asyncio
+import contextvars
+import copy
+import functools
+import inspect
+import json
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any
+
 from any_agent.callbacks import Callback, Context
+from any_agent.tracing.attributes import GenAI
+from any_agent.utils.cast import safe_cast_argument
+
+from agent_factory.config import CHARS_PER_TOKEN
+from agent_factory.utils.artifact_cache import canonical_hash
+from agent_factory.utils.logging import logger
+from agent_factory.utils.model_routing import DESIGN_ROUTE, ROUTE_ATTRIBUTE, ROUTE_LATENCY_ATTRIBUTE
+
+# Maximum number of sync tool calls running at the same time, across all the runs of the process.
+MAX_CONCURRENT_TOOL_CALLS = 8
+
+# Instruction injected once in the conversation when a soft budget limit is reached.
+WRAP_UP_INSTRUCTION = (
+    "You are about to run out of budget ({reasons}). Wrap up now: do not call any more tools unless strictly "
+    "necessary, and return your final answer with what you have so far."
+)
+
+COMPACTED_TOOL_RESULT_PREFIX = "[Compacted tool result"
 
 
 class LimitAgentTurns(Callback):
@@ -12,3 +42,545 @@ class LimitAgentTurns(Callback):
         if context.shared["n_agent_turns"] > self.max_turns:
             raise RuntimeError(f"Reached limit of agent turns: {self.max_turns}")
         return context
+
+
+class LimitAgentBudget(Callback):
+    """Enforce token, cost and wall-clock limits on a run.
+
+    The input and output tokens and the cost of every LLM call are read from its span and accumulated in
+    `context.shared["budget_usage"]`, along with the seconds elapsed since the start of the run. Before each LLM call,
+    usage is compared with the limits:
+
+    - Once any usage reaches `soft_limit` times its limit, an instruction to wrap up now is appended (once) to the
+      messages sent to the model. Only the `tinyagent` framework messages can be extended, for the others a warning is
+      logged.
+    - Once any usage reaches its limit, the run is aborted with a `RuntimeError`.
+
+    Args:
+        max_tokens: Maximum number of input plus output tokens, `None` for no limit.
+        max_cost: Maximum cost in USD, as computed by `AddCostInfo`, `None` for no limit.
+        max_seconds: Maximum wall-clock seconds, `None` for no limit.
+        soft_limit: Fraction of each limit at which the agent is asked to wrap up.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int | None = None,
+        max_cost: float | None = None,
+        max_seconds: float | None = None,
+        soft_limit: float = 0.8,
+    ):
+        if not 0 < soft_limit <= 1:
+            raise ValueError(f"soft_limit must be in (0, 1], got {soft_limit}")
+        self.limits = {"tokens": max_tokens, "cost": max_cost, "seconds": max_seconds}
+        self.soft_limit = soft_limit
+
+    def _usage(self, context: Context) -> dict[str, float]:
+        if "budget_usage" not in context.shared:
+            context.shared["budget_usage"] = {
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "cost": 0.0,
+                "started_at": time.monotonic(),
+            }
+        return context.shared["budget_usage"]
+
+    def _exceeded(self, current: dict[str, float], fraction: float) -> list[str]:
+        """Return a description of every limit whose `fraction` is reached by the `current` usage."""
+        return [
+            f"{current[name]:.6g}/{limit:g} {name}"
+            for name, limit in self.limits.items()
+            if limit is not None and current[name] >= fraction * limit
+        ]
+
+    def before_agent_invocation(self, context: Context, *args, **kwargs) -> Context:
+        # Starts the clock of the run, so that the time before its first LLM call counts as well.
+        self._usage(context)
+        return context
+
+    def before_llm_call(self, context: Context, *args, **kwargs) -> Context:
+        usage = self._usage(context)
+        current = {
+            "tokens": usage["input_tokens"] + usage["output_tokens"],
+            "cost": usage["cost"],
+            "seconds": time.monotonic() - usage["started_at"],
+        }
+        exceeded = self._exceeded(current, 1.0)
+        if exceeded:
+            raise RuntimeError(f"Reached agent budget limit: {', '.join(exceeded)}")
+
+        exceeded = self._exceeded(current, self.soft_limit)
+        if exceeded and not context.shared.get("budget_wrap_up"):
+            context.shared["budget_wrap_up"] = True
+            messages = kwargs.get("messages")
+            if isinstance(messages, list):
+                messages.append({"role": "user", "content": WRAP_UP_INSTRUCTION.format(reasons=", ".join(exceeded))})
+                logger.info(f"Asked the agent to wrap up, soft budget limit reached: {', '.join(exceeded)}")
+            else:
+                logger.warning(f"Soft budget limit reached ({', '.join(exceeded)}), but the agent cannot be told")
+        return context
+
+    def after_llm_call(self, context: Context, *args, **kwargs) -> Context:
+        usage = self._usage(context)
+        attributes = getattr(context.current_span, "attributes", None) or {}
+        usage["input_tokens"] += int(attributes.get(GenAI.USAGE_INPUT_TOKENS, 0))
+        usage["output_tokens"] += int(attributes.get(GenAI.USAGE_OUTPUT_TOKENS, 0))
+        usage["cost"] += _llm_call_cost(context)
+        return context
+
+
+def _llm_call_cost(context: Context) -> float:
+    """The cost in USD of the current LLM call, as recorded on its span by `AddCostInfo`."""
+    attributes = getattr(context.current_span, "attributes", None) or {}
+    return float(attributes.get(GenAI.USAGE_INPUT_COST, 0.0)) + float(attributes.get(GenAI.USAGE_OUTPUT_COST, 0.0))
+
+
+class SpeculativeDrafts:
+    """The state shared by the drafts generated concurrently for a request.
+
+    Args:
+        max_cost: Maximum total cost in USD of the drafts, `None` for no limit. Once it is reached, every draft but the
+            first one is stopped, so that the request costs at most what it would without speculative drafts, plus
+            `max_cost`.
+    """
+
+    def __init__(self, max_cost: float | None = None):
+        self.max_cost = max_cost
+        self.cost = 0.0
+        self.answered = False
+
+    def stop_reason(self, draft: int) -> str | None:
+        """Return why the `draft`-th draft must stop, or `None` if it may go on."""
+        if self.answered:
+            return "the request was already answered"
+        if draft != 0 and self.max_cost is not None and self.cost >= self.max_cost:
+            return f"the drafts reached their cost cap of {self.max_cost:g} USD"
+        return None
+
+
+# The drafts of the request and the index of the draft being generated, in the context of each draft run.
+current_draft: ContextVar[tuple[SpeculativeDrafts, int] | None] = ContextVar("current_draft", default=None)
+
+
+class StopSpeculativeDrafts(Callback):
+    """Account the cost of the speculative drafts of a request, and stop those that must not go on.
+
+    A draft is stopped, with a `RuntimeError`, before its next LLM call or tool execution once the request was
+    answered, e.g. with another draft, or once the drafts reached their cost cap (see `SpeculativeDrafts`). Runs
+    outside of `current_draft` are left alone. Must come after the default callbacks, so that the cost is already on
+    the spans.
+    """
+
+    def _check(self, context: Context) -> Context:
+        if (draft := current_draft.get()) is not None:
+            drafts, index = draft
+            if reason := drafts.stop_reason(index):
+                raise RuntimeError(f"Stopped speculative draft {index}: {reason}")
+        return context
+
+    def before_llm_call(self, context: Context, *args, **kwargs) -> Context:
+        return self._check(context)
+
+    def before_tool_execution(self, context: Context, *args, **kwargs) -> Context:
+        return self._check(context)
+
+    def after_llm_call(self, context: Context, *args, **kwargs) -> Context:
+        if (draft := current_draft.get()) is not None:
+            draft[0].cost += _llm_call_cost(context)
+        return context
+
+
+def _cached_input_tokens(response: Any) -> int | None:
+    """Return the number of input tokens read from the provider's prompt cache, if the response reports it."""
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None)
+    if cached_tokens is None:
+        # Reported by some providers, such as Anthropic, outside of the prompt tokens details.
+        cached_tokens = getattr(usage, "cache_read_input_tokens", None)
+    return cached_tokens if isinstance(cached_tokens, int) else None
+
+
+class RecordCachedTokens(Callback):
+    """Record on each LLM call span how many of its input tokens were served from the provider's prompt cache.
+
+    The span gets the number of cached input tokens and their ratio to the input tokens, and the total for the run is
+    accumulated in `context.shared["cached_input_tokens"]`. Only the `tinyagent` framework responses are supported.
+
+    Args:
+        instructions_key: The cache key of the system instructions (see `instructions_cache_key`), recorded on each LLM
+            call span to correlate the cache hits with the instructions sent.
+    """
+
+    def __init__(self, instructions_key: str | None = None):
+        self.instructions_key = instructions_key
+
+    def after_llm_call(self, context: Context, *args, **kwargs) -> Context:
+        if self.instructions_key is not None:
+            context.current_span.set_attribute("agent_factory.instructions.cache_key", self.instructions_key)
+        cached_tokens = _cached_input_tokens(args[0]) if args else None
+        if cached_tokens is None:
+            return context
+
+        context.shared["cached_input_tokens"] = context.shared.get("cached_input_tokens", 0) + cached_tokens
+        context.current_span.set_attribute("agent_factory.usage.cached_input_tokens", cached_tokens)
+        input_tokens = getattr(args[0].usage, "prompt_tokens", None)
+        if input_tokens:
+            context.current_span.set_attribute("agent_factory.usage.cached_input_ratio", cached_tokens / input_tokens)
+        return context
+
+
+class RecordModelRoute(Callback):
+    """Record on each LLM call span of the agent its model route and latency, as `ModelRouter` does for its calls.
+
+    The LLM calls of the factory agent design the workflows, so they are on the `design` route by default.
+
+    Args:
+        route: The route recorded on the LLM call spans.
+    """
+
+    def __init__(self, route: str = DESIGN_ROUTE):
+        self.route = route
+
+    def before_llm_call(self, context: Context, *args, **kwargs) -> Context:
+        context.shared["llm_call_started_at"] = time.perf_counter()
+        return context
+
+    def after_llm_call(self, context: Context, *args, **kwargs) -> Context:
+        context.current_span.set_attribute(ROUTE_ATTRIBUTE, self.route)
+        if (started_at := context.shared.pop("llm_call_started_at", None)) is not None:
+            context.current_span.set_attribute(ROUTE_LATENCY_ATTRIBUTE, time.perf_counter() - started_at)
+        return context
+
+
+def _estimate_tokens(messages: list[dict[str, Any]]) -> int:
+    return sum(len(json.dumps(message, default=str)) for message in messages) // CHARS_PER_TOKEN
+
+
+class CompactContext(Callback):
+    """Compact the results of older tool calls once the conversation grows past `max_tokens`.
+
+    Before each LLM call, the conversation size is estimated and, if it exceeds `max_tokens`, the tool results older
+    than the last `keep_recent_turns` assistant turns are replaced, oldest first, by a digest of their first
+    `digest_chars` characters, until the conversation fits. The system prompt, the user messages and the assistant
+    messages are never modified. The messages are compacted in place, so compacted results stay compacted in the next
+    turns.
+
+    The estimated number of tokens saved by each call is recorded on its span, and their total in
+    `context.shared["context_tokens_saved"]`. Only the `tinyagent` framework messages can be compacted.
+
+    Args:
+        max_tokens: Estimated conversation size above which tool results are compacted.
+        keep_recent_turns: Number of most recent assistant turns whose tool results are kept intact.
+        digest_chars: Number of characters of a tool result kept in its digest.
+    """
+
+    def __init__(self, max_tokens: int = 60_000, keep_recent_turns: int = 3, digest_chars: int = 500):
+        self.max_tokens = max_tokens
+        self.keep_recent_turns = keep_recent_turns
+        self.digest_chars = digest_chars
+
+    def _digest(self, content: str, tool_name: str) -> str:
+        omitted = len(content) - self.digest_chars
+        return (
+            f"{COMPACTED_TOOL_RESULT_PREFIX} of {tool_name}, {omitted} characters omitted, call the tool again if "
+            f"they are needed]\n{content[: self.digest_chars]}"
+        )
+
+    def compact(self, messages: list[dict[str, Any]]) -> int:
+        """Compact the older tool results of `messages` in place, returning the estimated number of tokens saved."""
+        total_tokens = _estimate_tokens(messages)
+        if total_tokens <= self.max_tokens:
+            return 0
+
+        assistant_indices = [i for i, message in enumerate(messages) if message.get("role") == "assistant"]
+        if len(assistant_indices) <= self.keep_recent_turns:
+            return 0
+        recent_start = assistant_indices[-self.keep_recent_turns] if self.keep_recent_turns else len(messages)
+
+        tool_names = {
+            tool_call["id"]: tool_call["function"]["name"]
+            for message in messages
+            if message.get("role") == "assistant"
+            for tool_call in message.get("tool_calls") or []
+        }
+        saved_tokens = 0
+        for message in messages[:recent_start]:
+            if total_tokens - saved_tokens <= self.max_tokens:
+                break
+            content = message.get("content")
+            if (
+                message.get("role") != "tool"
+                or not isinstance(content, str)
+                or content.startswith(COMPACTED_TOOL_RESULT_PREFIX)
+            ):
+                continue
+            digest = self._digest(content, tool_names.get(message.get("tool_call_id"), "a tool"))
+            if len(digest) >= len(content):
+                continue
+            message["content"] = digest
+            saved_tokens += (len(content) - len(digest)) // CHARS_PER_TOKEN
+        return saved_tokens
+
+    def before_llm_call(self, context: Context, *args, **kwargs) -> Context:
+        messages = kwargs.get("messages")
+        if not isinstance(messages, list) or not all(isinstance(message, dict) for message in messages):
+            return context
+
+        saved_tokens = self.compact(messages)
+        if saved_tokens:
+            context.shared["context_tokens_saved"] = context.shared.get("context_tokens_saved", 0) + saved_tokens
+            logger.debug(f"Compacted older tool results, saving about {saved_tokens} tokens")
+        context.current_span.set_attribute("agent_factory.context_compaction.tokens_saved", saved_tokens)
+        return context
+
+
+class _ToolCallMemo:
+    """The memoized tool results of a run, handed by `MemoizeToolCalls` to the `cacheable` tool being executed."""
+
+    def __init__(self, cache: dict[str, Any]):
+        self.cache = cache
+        self.cacheable = False
+        self.hit = False
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        self.cacheable = True
+        if key not in self.cache:
+            return False, None
+        self.hit = True
+        return True, copy.deepcopy(self.cache[key])
+
+    def put(self, key: str, result: Any) -> Any:
+        # Results are copied, so that a caller modifying its result can't affect the others.
+        self.cache[key] = result
+        return copy.deepcopy(result)
+
+
+_tool_call_memo: ContextVar[_ToolCallMemo | None] = ContextVar("tool_call_memo", default=None)
+
+
+def _memo_key(name: str, args: tuple, kwargs: dict[str, Any]) -> str:
+    """The key of the memoized result of a call to the `cacheable` tool `name`."""
+    return canonical_hash({"tool": name, "args": args, "kwargs": kwargs})
+
+
+def cacheable(tool: Callable[..., Any]) -> Callable[..., Any]:
+    """Declare a tool as deterministic, so that `MemoizeToolCalls` can reuse its results for identical calls in a run.
+
+    Outside of a run using `MemoizeToolCalls`, the tool is called as usual.
+    """
+
+    def call_key(args: tuple, kwargs: dict) -> str:
+        return _memo_key(tool.__name__, args, kwargs)
+
+    if inspect.iscoroutinefunction(tool):
+
+        @functools.wraps(tool)
+        async def async_wrapper(*args, **kwargs):
+            memo = _tool_call_memo.get()
+            if memo is None:
+                return await tool(*args, **kwargs)
+            key = call_key(args, kwargs)
+            found, result = memo.get(key)
+            return result if found else memo.put(key, await tool(*args, **kwargs))
+
+        return async_wrapper
+
+    @functools.wraps(tool)
+    def wrapper(*args, **kwargs):
+        memo = _tool_call_memo.get()
+        if memo is None:
+            return tool(*args, **kwargs)
+        key = call_key(args, kwargs)
+        found, result = memo.get(key)
+        return result if found else memo.put(key, tool(*args, **kwargs))
+
+    return wrapper
+
+
+class MemoizeToolCalls(Callback):
+    """Reuse the results of identical calls to `cacheable` tools within a run, instead of executing them again.
+
+    The results are kept in the run's `context.shared`, so they never leak across runs. Each tool span records whether
+    the call was served from the cache, and the number of cache hits so far in the run.
+    """
+
+    def before_tool_execution(self, context: Context, *args, **kwargs) -> Context:
+        cache = context.shared.setdefault("tool_call_cache", {})
+        _tool_call_memo.set(_ToolCallMemo(cache))
+        return context
+
+    def after_tool_execution(self, context: Context, *args, **kwargs) -> Context:
+        memo = _tool_call_memo.get()
+        _tool_call_memo.set(None)
+        if memo is None or not memo.cacheable:
+            return context
+
+        context.shared["tool_call_cache_hits"] = context.shared.get("tool_call_cache_hits", 0) + memo.hit
+        context.current_span.set_attribute("agent_factory.tool_call_cache.hit", memo.hit)
+        context.current_span.set_attribute("agent_factory.tool_call_cache.hits", context.shared["tool_call_cache_hits"])
+        return context
+
+
+_tool_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_TOOL_CALLS, thread_name_prefix="tool-call")
+
+# Tool calls of the current LLM turn waiting for the first of them to be executed, keyed by `_tool_call_key`.
+_pending_tool_calls: ContextVar[dict[str, tuple[Callable[..., Any], dict[str, Any]]] | None] = ContextVar(
+    "pending_tool_calls", default=None
+)
+
+# Tool calls of the current LLM turn already started by `ConcurrentToolCalls`, keyed by `_tool_call_key`.
+_started_tool_calls: ContextVar[dict[str, "_ToolCall"] | None] = ContextVar("started_tool_calls", default=None)
+
+# The execution time of the last `parallelizable` tool call awaited, in seconds.
+_tool_call_execution_seconds: ContextVar[float | None] = ContextVar("tool_call_execution_seconds", default=None)
+
+TOOL_EXECUTION_ATTRIBUTE = "agent_factory.tool_call.execution_seconds"
+
+
+def _tool_call_key(name: str, arguments: dict[str, Any]) -> str:
+    return canonical_hash({"tool": name, "arguments": arguments})
+
+
+class _ToolCall:
+    """A started call of a `parallelizable` tool, with the time its execution took once it is done."""
+
+    def __init__(self, tool: Callable[..., Any], arguments: dict[str, Any]):
+        self.execution_seconds: float | None = None
+        if inspect.iscoroutinefunction(tool):
+            self.future = asyncio.ensure_future(self._run_async(tool, arguments))
+        else:
+            # In a copy of the current context, so that the spans started by the tool belong to the trace of the run.
+            self.future = asyncio.get_running_loop().run_in_executor(
+                _tool_executor, contextvars.copy_context().run, self._run, tool, arguments
+            )
+
+    def _run(self, tool: Callable[..., Any], arguments: dict[str, Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return tool(**arguments)
+        finally:
+            self.execution_seconds = time.perf_counter() - start
+
+    async def _run_async(self, tool: Callable[..., Any], arguments: dict[str, Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return await tool(**arguments)
+        finally:
+            self.execution_seconds = time.perf_counter() - start
+
+
+def parallelizable(tool: Callable[..., Any]) -> Callable[..., Any]:
+    """Declare a tool as independent of the other tools, so that `ConcurrentToolCalls` can run it alongside them.
+
+    The returned tool is a coroutine function: sync tools are run in a bounded thread pool, so they don't block the
+    event loop even when they are called on their own.
+    """
+    signature = inspect.signature(tool)
+
+    @functools.wraps(tool)
+    async def wrapper(*args, **kwargs):
+        arguments = signature.bind(*args, **kwargs).arguments
+        started_calls = _started_tool_calls.get() or {}
+        call = started_calls.get(_tool_call_key(tool.__name__, arguments)) or _ToolCall(tool, arguments)
+        try:
+            return await call.future
+        finally:
+            _tool_call_execution_seconds.set(call.execution_seconds)
+
+    # Copied onto the wrappers of the returned tool by `functools.wraps`, e.g. by `cacheable`.
+    wrapper._parallelizable_tool = tool
+    return wrapper
+
+
+def _discard(futures: list[asyncio.Future]) -> None:
+    for future in futures:
+        if not future.done():
+            future.cancel()
+        elif not future.cancelled():
+            # Retrieve the exception of unused calls, so that it isn't reported as never retrieved.
+            future.exception()
+
+
+class ConcurrentToolCalls(Callback):
+    """Run all the `parallelizable` tool calls requested in an LLM response at once, instead of one after another.
+
+    When a response requests several tool calls, they are all started once the first of them is about to be executed:
+    sync tools in a bounded thread pool, async tools as tasks. The agent then executes the calls in their original order
+    as usual, each of them awaiting the result of the already started call, so the turn only takes as long as its
+    slowest call. As the execution spans of the calls then measure that wait, the time each call took to execute is
+    recorded on its span as well.
+
+    Must come after the callbacks that may stop the run before a tool execution, such as the budget guards: the calls
+    are only started once these let the first call of the turn through. The calls whose result `MemoizeToolCalls`
+    already holds for the run are not started, they are served from it.
+
+    Only the `tinyagent` framework responses are supported, for the others the tool calls are executed as usual.
+
+    Args:
+        tools: The tools of the agent, those declared `parallelizable` being run concurrently.
+    """
+
+    def __init__(self, tools: list[Callable[..., Any]]):
+        self.parallelizable_tools = {
+            tool.__name__: tool._parallelizable_tool for tool in tools if hasattr(tool, "_parallelizable_tool")
+        }
+
+    def after_llm_call(self, context: Context, *args, **kwargs) -> Context:
+        previous_calls = _started_tool_calls.get()
+        if previous_calls:
+            _discard([call.future for call in previous_calls.values()])
+        _started_tool_calls.set(None)
+        _pending_tool_calls.set(None)
+
+        try:
+            tool_calls = args[0].choices[0].message.tool_calls or []
+        except (AttributeError, IndexError):
+            return context
+        if len(tool_calls) < 2:
+            return context
+
+        pending_calls: dict[str, tuple[Callable[..., Any], dict[str, Any]]] = {}
+        for tool_call in tool_calls:
+            tool = self.parallelizable_tools.get(tool_call.function.name)
+            if tool is None:
+                continue
+            try:
+                arguments = json.loads(tool_call.function.arguments or "{}")
+            except json.JSONDecodeError:
+                continue
+            # Cast the arguments the way the agent will, so that its calls match the started ones.
+            for name, annotation in tool.__annotations__.items():
+                if name in arguments:
+                    arguments[name] = safe_cast_argument(arguments[name], annotation)
+            pending_calls.setdefault(_tool_call_key(tool.__name__, arguments), (tool, arguments))
+
+        if pending_calls:
+            _pending_tool_calls.set(pending_calls)
+        return context
+
+    def before_tool_execution(self, context: Context, *args, **kwargs) -> Context:
+        _tool_call_execution_seconds.set(None)
+        pending_calls = _pending_tool_calls.get()
+        if not pending_calls:
+            return context
+        _pending_tool_calls.set(None)
+
+        memoized_calls = context.shared.get("tool_call_cache", {})
+        started_calls = {
+            key: _ToolCall(tool, arguments)
+            for key, (tool, arguments) in pending_calls.items()
+            # The agent calls the tools with keyword arguments only.
+            if _memo_key(tool.__name__, (), arguments) not in memoized_calls
+        }
+        if started_calls:
+            logger.debug(f"Started {len(started_calls)} tool calls concurrently")
+            _started_tool_calls.set(started_calls)
+        return context
+
+    def after_tool_execution(self, context: Context, *args, **kwargs) -> Context:
+        execution_seconds = _tool_call_execution_seconds.get()
+        _tool_call_execution_seconds.set(None)
+        if execution_seconds is not None:
+            context.current_span.set_attribute(TOOL_EXECUTION_ATTRIBUTE, execution_seconds)
+        return context
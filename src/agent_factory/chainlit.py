@@ -20,9 +20,11 @@ from agent_factory.utils import (
     create_agent_trace_from_dumped_spans,
     create_message_request,
     get_a2a_agent_card,
+    get_artifact_cache,
+    get_server_prepared_artifacts,
     get_storage_backend,
     logger,
-    prepare_agent_artifacts,
+    prepare_agent_artifacts_async,
     process_a2a_agent_final_response,
     process_streaming_response_message,
 )
@@ -165,7 +167,12 @@ async def create_agent(message: cl.Message):
                 final_response = process_a2a_agent_final_response(final_response)
 
                 if final_response.status == Status.COMPLETED:
-                    prepared_artifacts = prepare_agent_artifacts(final_response.model_dump())
+                    # A server preparing the artifacts streams them, otherwise they are prepared here.
+                    prepared_artifacts = get_server_prepared_artifacts(responses)
+                    if prepared_artifacts is None:
+                        prepared_artifacts = await prepare_agent_artifacts_async(
+                            final_response.model_dump(), cache=get_artifact_cache()
+                        )
                     storage_backend.save(prepared_artifacts, output_dir)
 
                 response_json = final_response.model_dump_json()
@@ -14,3 +14,44 @@ if not TRACES_DIR.is_absolute():
     TRACES_DIR = PROJECT_ROOT / TRACES_DIR
 
 DEFAULT_EXPORT_PATH = PROJECT_ROOT / "generated_workflows"
+
+TOOLS_DIR = Path(__file__).parent / "tools"
+
+# An empty value disables the cache of prepared agent artifact bundles.
+_artifact_cache_dir = os.getenv("ARTIFACT_CACHE_DIR", ".cache/artifacts")
+ARTIFACT_CACHE_DIR = Path(_artifact_cache_dir) if _artifact_cache_dir else None
+if ARTIFACT_CACHE_DIR is not None and not ARTIFACT_CACHE_DIR.is_absolute():
+    ARTIFACT_CACHE_DIR = PROJECT_ROOT / ARTIFACT_CACHE_DIR
+
+# Seconds after which the in-memory MCP registry index is refreshed (in the background) from the mcpd registry.
+MCP_REGISTRY_TTL = float(os.getenv("MCP_REGISTRY_TTL", "3600"))
+
+# Snapshot of the MCP registry, loaded at start instead of fetching the registry, and rewritten on every fetch.
+MCP_REGISTRY_SNAPSHOT_PATH = Path(os.getenv("MCP_REGISTRY_SNAPSHOT_PATH", ".cache/mcp_registry.json"))
+if not MCP_REGISTRY_SNAPSHOT_PATH.is_absolute():
+    MCP_REGISTRY_SNAPSHOT_PATH = PROJECT_ROOT / MCP_REGISTRY_SNAPSHOT_PATH
+
+# Module of system instructions rendered at build time, loaded at start instead of rendering them when it has them.
+PRECOMPILED_INSTRUCTIONS_PATH = Path(os.getenv("PRECOMPILED_INSTRUCTIONS_PATH", ".cache/precompiled_instructions.py"))
+if not PRECOMPILED_INSTRUCTIONS_PATH.is_absolute():
+    PRECOMPILED_INSTRUCTIONS_PATH = PROJECT_ROOT / PRECOMPILED_INSTRUCTIONS_PATH
+
+# Model of the mechanical subtasks of the factory (syntax repair, README drafting, web page summaries), and the model of
+# each of them overriding it, as comma-separated task=model pairs, e.g. "readme=openai/gpt-4.1-mini".
+FAST_MODEL = os.getenv("FAST_MODEL", "openai/gpt-4o-mini")
+MODEL_ROUTES = os.getenv("MODEL_ROUTES", "")
+
+# Web pages visited by the factory agent that are longer than this many characters are summarized with the fast model
+# before they enter its context. 0 disables the summaries.
+WEBPAGE_SUMMARY_MIN_CHARS = int(os.getenv("WEBPAGE_SUMMARY_MIN_CHARS", "20000"))
+
+# Cassette of recorded LLM calls: in "record" mode the calls are appended to it, in "replay" mode they are served from
+# it without calling the model. An empty value disables the cassette.
+_llm_cassette_path = os.getenv("LLM_CASSETTE_PATH", "")
+LLM_CASSETTE_PATH = Path(_llm_cassette_path) if _llm_cassette_path else None
+if LLM_CASSETTE_PATH is not None and not LLM_CASSETTE_PATH.is_absolute():
+    LLM_CASSETTE_PATH = PROJECT_ROOT / LLM_CASSETTE_PATH
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "replay")
+
+# Rough number of characters per token, used to estimate the size of the conversation without tokenizing it.
+CHARS_PER_TOKEN = 4
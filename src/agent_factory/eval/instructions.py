@@ -2,6 +2,8 @@
 The structured JSON output is saved as JSON format.
 """
 
+from functools import lru_cache
+
 from jinja2 import Template
 
 EVALUATION_CATEGORIES = """
@@ -126,10 +128,15 @@ Analyze the agent's task, tools, and expected workflow to create thorough evalua
 """  # noqa: E501
 
 
+@lru_cache(maxsize=1)
+def _compiled_template() -> Template:
+    return Template(INSTRUCTIONS_TEMPLATE)
+
+
+@lru_cache(maxsize=32)
 def get_instructions(generated_workflow_dir: str) -> str:
     """Get evaluation instructions with the generated_workflow_dir properly set."""
-    template = Template(INSTRUCTIONS_TEMPLATE)
-    return template.render(
+    return _compiled_template().render(
         generated_workflow_dir=generated_workflow_dir,
         evaluation_categories=EVALUATION_CATEGORIES,
         agent_script_and_json_example=AGENT_SCRIPT_AND_JSON_EXAMPLE,
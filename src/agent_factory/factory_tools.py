@@ -1,32 +1,70 @@
+import copy
 from pathlib import Path
 from typing import Any
 
-from agent_factory.utils.mcpd_utils import BINARY_NAME_MCPD, run_binary
+from agent_factory.config import TOOLS_DIR
+from agent_factory.utils.mcp_registry import get_registry_index_async
+from agent_factory.utils.ttl_cache import CacheInfo, TTLCache
 
 KEYS_TO_DROP = ("display_name", "repository", "homepage", "author", "categories", "tags", "examples")
 
+DEFAULT_SEARCH_LIMIT = 10
 
-def _cleanup_mcp_server_info(server_info):
-    for k in KEYS_TO_DROP:
-        server_info.pop(k, None)
+# Servers scoring less than this fraction of the best match are left out of the search results.
+SEARCH_RELEVANCE_CUTOFF = 0.25
+
+SEARCH_CACHE_MAXSIZE = 256
+SEARCH_CACHE_TTL = 600.0
+
+# Per-process cache of search results, keyed by the registry version and the normalized query.
+_search_cache = TTLCache(maxsize=SEARCH_CACHE_MAXSIZE, ttl=SEARCH_CACHE_TTL)
+
+# Files read by `read_file` that are larger than this are read from disk on every call instead of being cached.
+MAX_CACHED_FILE_SIZE = 256 * 1024
 
-    for tool in server_info.get("tools", []):
-        tool.pop("inputSchema", None)
+# Contents of the files read by `read_file`, keyed by resolved path, with the (mtime, size) they were read at.
+_file_cache: dict[Path, tuple[tuple[int, int], str]] = {}
+
+
+def _cleanup_mcp_server_info(server_info):
+    # Project the record without the dropped keys and tool schemas, leaving the indexed record untouched.
+    server_info = {k: v for k, v in server_info.items() if k not in KEYS_TO_DROP}
+    if "tools" in server_info:
+        server_info["tools"] = [{k: v for k, v in tool.items() if k != "inputSchema"} for tool in server_info["tools"]]
 
     return server_info
 
 
-def search_mcp_servers(
+def _compact_mcp_server_info(server_info):
+    description = (server_info.get("description") or "").strip()
+    return {
+        "name": server_info["name"],
+        "description": description.split("\n", 1)[0].split(". ", 1)[0],
+        "tools": [tool["name"] for tool in server_info.get("tools", [])],
+    }
+
+
+async def search_mcp_servers(
     keyphrase: str,
     license: str | None = None,
     categories: list[str] | None = None,
     tags: list[str] | None = None,
     is_official: bool = False,
+    limit: int = DEFAULT_SEARCH_LIMIT,
+    offset: int = 0,
+    compact: bool = True,
 ) -> list[dict[str, Any]]:
     """Search for MCP servers using a keyphrase and optional filters.
 
-    This function queries the MCP server registry and returns servers matching the provided keyphrase.
-    The keyphrase may appear in the server name or description. If set to "*", all servers are returned.
+    This function queries the MCP server registry and returns servers matching the provided keyphrase, best matches
+    first. Every word of the keyphrase must appear (possibly as a prefix of a longer word) in the server name,
+    description, tool names, categories or tags. If set to "*", all servers are returned. Servers much less relevant
+    than the best match are left out.
+
+    Results are paginated with `limit` and `offset`, and by default are compact: each server is described only by its
+    name, a one-line description and the names of its tools. Use the compact results to choose a server, and only call
+    `get_mcp_server_details` for one specific server when you need its full description (e.g. its tool descriptions
+    and input schemas, or the environment variables it requires).
 
     Optional filters include `license`, `categories`, `tags`, and an `is_official` flag, which narrow results by:
     - license name (partial match),
@@ -38,11 +76,13 @@ def search_mcp_servers(
 
     Example:
         ```python
-        results = search_mcp_servers(keyphrase="google calendar")
-        results = search_mcp_servers(keyphrase="github", is_official=True)
-        results = search_mcp_servers(keyphrase="github", license="MIT")
-        results = search_mcp_servers(keyphrase="github", categories=["Dev Tools"])
-        results = search_mcp_servers(keyphrase="mcp", tags=["automation", "llm"])
+        results = await search_mcp_servers(keyphrase="google calendar")
+        results = await search_mcp_servers(keyphrase="github", is_official=True)
+        results = await search_mcp_servers(keyphrase="github", license="MIT")
+        results = await search_mcp_servers(keyphrase="github", categories=["Dev Tools"])
+        results = await search_mcp_servers(keyphrase="mcp", tags=["automation", "llm"])
+        results = await search_mcp_servers(keyphrase="database", limit=5, offset=5)
+        results = await search_mcp_servers(keyphrase="slack", limit=1, compact=False)
         ```
 
     Args:
@@ -59,6 +99,10 @@ def search_mcp_servers(
                 When multiple values are supplied matching is cumulative requiring partial (sub-string) matches for all
                 tags.
         is_official: If `True`, only official servers will be returned. Defaults to `False`.
+        limit: Maximum number of servers to return. Defaults to 10.
+        offset: Number of matching servers to skip, to get the next page of results. Defaults to 0.
+        compact: If `True`, only the name, a one-line description and the tool names of each server are returned.
+                If `False`, the full server descriptions are returned. Defaults to `True`.
 
     Returns:
         A list of server descriptions that match the search criteria.
@@ -67,42 +111,123 @@ def search_mcp_servers(
 
     Raises:
         ValueError: If keyphrase contains commas, indicating multiple words.
-        ValueError: If the search results are not valid JSON.
-        RuntimeError: If there are issues executing the search.
+        ValueError: If `limit` is lower than 1 or `offset` is negative.
+        ValueError: If the registry metadata is not valid JSON.
+        RuntimeError: If there are issues fetching the registry, or if it times out.
     """
     if not keyphrase.strip() or any(sep in keyphrase for sep in [","]):
         raise ValueError("Keyphrase must be a single word (no commas)")
+    if limit < 1 or offset < 0:
+        raise ValueError(f"`limit` must be at least 1 and `offset` non-negative. Got {limit=}, {offset=}")
 
-    # Normalize and sanitize.
+    # Normalize and sanitize, the same values being used for the search and its cache key.
     keyphrase = keyphrase.strip().lower()
+    license = license.strip().lower() if license else None
+    categories = sorted(category.strip().lower() for category in categories or [])
+    tags = sorted(tag.strip().lower() for tag in tags or [])
+
+    index = await get_registry_index_async()
+
+    # Including the registry version in the key invalidates the cached results whenever the registry changes.
+    cache_key = (index.version, keyphrase, license, tuple(categories), tuple(tags), is_official)
+    results = _search_cache.get(cache_key)
+    if results is None:
+        servers = index.search(
+            keyphrase,
+            license=license,
+            categories=categories,
+            tags=tags,
+            is_official=is_official,
+            min_relative_score=SEARCH_RELEVANCE_CUTOFF,
+        )
+        results = [_cleanup_mcp_server_info(server) for server in servers]
+        _search_cache.put(cache_key, results)
 
-    args = ["search", keyphrase, "--format=json"]
-    if categories:
-        for category in categories:
-            args.extend(["--category", category])
+    # Pages are sliced from the cached results, so paginating through a search does not run it again.
+    page = results[offset : offset + limit]
+    if compact:
+        return [_compact_mcp_server_info(server) for server in page]
 
-    if tags:
-        for tag in tags:
-            args.extend(["--tag", tag])
+    # Return a copy, so that callers can't modify the cached results.
+    return copy.deepcopy(page)
 
-    if license:
-        args.extend(["--license", license])
 
-    if is_official:
-        args.extend(["--official"])
+def search_mcp_servers_cache_info() -> CacheInfo:
+    """Return the hit and miss counters, and the size, of the `search_mcp_servers` result cache."""
+    return _search_cache.cache_info()
 
-    output = run_binary(BINARY_NAME_MCPD, args)
-    if output.get("results") is None or not output.get("results"):
-        return []
 
-    servers = output.get("results")
+async def get_mcp_server_details(name: str) -> dict[str, Any]:
+    """Get the full description of the MCP server called `name`, as found with `search_mcp_servers`.
 
-    return [_cleanup_mcp_server_info(server) for server in servers]
+    The description includes each tool's description and `inputSchema`, the server arguments and environment
+    variables, and its installation options. Only call it for a server you are considering, once you need these
+    details to choose the subset of its tools to use.
+
+    Example:
+        ```python
+        details = await get_mcp_server_details(name="slack")
+        ```
+
+    Args:
+        name: The exact name of the MCP server, as returned by `search_mcp_servers`.
+
+    Returns:
+        The full registry description of the MCP server.
+
+    Raises:
+        ValueError: If there is no MCP server called `name` in the registry.
+        RuntimeError: If there are issues fetching the registry, or if it times out.
+    """
+    index = await get_registry_index_async()
+    server = index.servers_by_name.get(name.strip())
+    if server is None:
+        raise ValueError(f"MCP server '{name}' not found. Use `search_mcp_servers` to find the exact server name.")
+
+    return copy.deepcopy(server)
+
+
+def _validate_file_path(file_name: str) -> Path:
+    file_path = Path(file_name)
+
+    # TODO: this is just a hacky way to restrict file access to "mimic" the MCP filesystem server.
+    if file_path.parent.name != "tools":
+        raise ValueError(f"`file_name` parent dir must be `tools`. Got {file_path.parent}")
+
+    return file_path
+
+
+def _read_cached(file_path: Path) -> str:
+    """Read a file through the in-memory cache, which is keyed by the resolved path and refreshed when it changes."""
+    resolved_path = file_path.resolve()
+    stat = resolved_path.stat()
+    cached = _file_cache.get(resolved_path)
+    if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        return cached[1]
+
+    content = resolved_path.read_text()
+    if stat.st_size <= MAX_CACHED_FILE_SIZE:
+        _file_cache[resolved_path] = ((stat.st_mtime_ns, stat.st_size), content)
+    return content
+
+
+def preload_tool_sources(tools_dir: Path = TOOLS_DIR) -> int:
+    """Load the files that `read_file` gives access to in the cache, so that the agent's first reads hit it.
+
+    Returns:
+        The number of files loaded.
+    """
+    file_paths = [path for path in tools_dir.iterdir() if path.is_file() and path.suffix in (".py", ".md")]
+    for file_path in file_paths:
+        _read_cached(file_path)
+    return len(file_paths)
 
 
 def read_file(file_name: str) -> str:
     """Read the contents of the given `file_name`.
 
+    To read several files, use `read_files` instead, which reads them all in a single call.
+
     Args:
         file_name: The path to the file you want to read.
 
@@ -113,10 +238,26 @@ def read_file(file_name: str) -> str:
         ValueError: For the following cases:
             - If the path to the file is not allowed.
     """
-    file_path = Path(file_name)
+    return _read_cached(_validate_file_path(file_name))
 
-    # TODO: this is just a hacky way to restrict file access to "mimic" the MCP filesystem server.
-    if file_path.parent.name != "tools":
-        raise ValueError(f"`file_name` parent dir must be `tools`. Got {file_path.parent}")
 
-    return file_path.read_text()
+def read_files(file_names: list[str]) -> dict[str, str]:
+    """Read the contents of all the given `file_names` at once.
+
+    Example:
+        ```python
+        contents = read_files(["tools/README.md", "tools/search_tavily.py", "tools/visit_webpage.py"])
+        ```
+
+    Args:
+        file_names: The paths to the files you want to read.
+
+    Returns:
+        A dictionary mapping each of the `file_names` to its contents.
+
+    Raises:
+        ValueError: For the following cases:
+            - If the path to any of the files is not allowed.
+    """
+    file_paths = {file_name: _validate_file_path(file_name) for file_name in file_names}
+    return {file_name: _read_cached(file_path) for file_name, file_path in file_paths.items()}
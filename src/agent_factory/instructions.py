@@ -1,7 +1,15 @@
 """Instructions for the agent code generator."""
 
+import hashlib
+import importlib.util
+from functools import lru_cache
+from pathlib import Path
+
+import fire
 from jinja2 import Template
 
+from agent_factory.config import PRECOMPILED_INSTRUCTIONS_PATH
+
 CODE_EXAMPLE = """
 # agent.py
 
@@ -199,7 +207,10 @@ The final expected output is a dictionary with the following structure:
 10. `prompt_template` is an f-string which is formatted with the values of `cli_args` to build the final input prompt to
     the generated agent.
     This string replaces the {{prompt_template}} placeholder in the agent code template.
-11. `readme` should contain clear and concise setup instructions. Follow this template:
+"""  # noqa: E501
+
+
+README_INSTRUCTIONS = """11. `readme` should contain clear and concise setup instructions. Follow this template:
     ```markdown
     # Title of the Agent
 
@@ -252,6 +263,11 @@ The final expected output is a dictionary with the following structure:
 """  # noqa: E501
 
 
+# Replaces the `README_INSTRUCTIONS` when the README is drafted from the other outputs with the model of its route.
+DRAFTED_README_INSTRUCTIONS = """11. `readme` should be left empty: the README is drafted for you from the other fields.
+"""
+
+
 AGENT_CODE_TEMPLATE = """
 # agent.py
 
@@ -396,12 +412,14 @@ using Mozilla's any-agent library. The implementation should:
     a. Python Functions: The available tools are described in the local file at `tools/README.md`,
        which can be read using `read_file` tool. Each tool in `README.md` has a corresponding `.py`
        file in the `tools/` directory that implements the function.
+       Use the `read_files` tool to read the `.py` files of all the tools you consider in a single call.
     b. MCP Servers: Always look for MCP servers using the `search_mcp_servers` tool,
        giving it a keyphrase that describes the task you want to accomplish.
        Then, read each MCP server's description carefully to verify which one provides the tools you need for the task.
+       Search results are compact and paginated; only call `get_mcp_server_details` for a specific server when you need its full description and tool input schemas.
        Always suggest only the minimum subset of tools from the MCP server URL that are necessary for the solving the task at hand.
        If the agent is required to generate any intermediate files, you may ask it to save them in a path relative to the current working directory (do not give absolute paths).
-       You must never import or assign `search_mcp_servers` to the tools list of the generated agent in `agent_code`.
+       You must never import or assign `search_mcp_servers` or `get_mcp_server_details` to the tools list of the generated agent in `agent_code`.
 
 #### Structured Output (output_type):
 - Define Pydantic v2 models to structure the agent's final output
@@ -434,7 +452,7 @@ If the code corresponds to running the agent via CLI, use the following instruct
 
 SINGLE_STEP_INSTRUCTIONS = """
 You will be provided with a task description and a set of tools to use. Read the task description carefully to
-understand what the user wants you to do. Read the following instructions and code examples, and then generate the agent
+understand what the user wants you to do. Follow the instructions and code examples above, and then generate the agent
 code that will solve the task. Fill the `message` field with a confirmation saying "✅ Done! Your agent is ready!", and
 set `status` to `completed`.
 """
@@ -495,7 +513,9 @@ General notes:
 """  # noqa: E501
 
 
-# Define the template with Jinja2 syntax
+# Define the template with Jinja2 syntax.
+# The static instructions come first and the parts that vary with the mode and options last, so that the rendered
+# instructions of every mode share a byte-identical prefix which the model providers can cache across requests.
 INSTRUCTIONS_TEMPLATE = """
 You are an expert software developer with a deep understanding of Mozilla AI's any-agent Python library.
 
@@ -506,8 +526,6 @@ Any-agent library enables you to:
 - Leverage built-in tools like web search and webpage visiting as well as MCP servers
 - Implement comprehensive tracing and evaluation capabilities
 
-{{ flow_instructions}}
-
 **Any-agent Code Generation Instructions**
 
 {{ code_generation_instructions }}
@@ -522,16 +540,145 @@ agent:
 
 ** Deliverables Instructions**
 
-{{ deliverables_instructions }}
+{{ deliverables_instructions }}{{ readme_instructions }}
+{% if tool_digest %}
+**Available Python Tools**
+
+The following digest lists every Python function available in the `tools/` directory, with its signature and a one-line
+summary. Use it to choose the Python tools instead of reading `tools/README.md` and the tools' `.py` files, and only read
+a tool's `.py` file if you need more details about it than the digest provides.
+
+{{ tool_digest }}
+{% endif %}
+**Workflow**
+
+{{ flow_instructions }}
 """  # noqa: E501
 
 
-def load_system_instructions(chat: bool = False) -> str:
-    template = Template(INSTRUCTIONS_TEMPLATE)
-    return template.render(
+def _short_hash(*texts: str) -> str:
+    return hashlib.sha256("\0".join(texts).encode("utf-8")).hexdigest()[:16]
+
+
+# Changes whenever the template or any of the instructions rendered into it changes.
+INSTRUCTIONS_TEMPLATE_VERSION = _short_hash(
+    INSTRUCTIONS_TEMPLATE,
+    CODE_GENERATION_INSTRUCTIONS,
+    AGENT_CODE_TEMPLATE,
+    CODE_EXAMPLE,
+    DELIVERABLES_INSTRUCTIONS,
+    README_INSTRUCTIONS,
+    DRAFTED_README_INSTRUCTIONS,
+    SINGLE_STEP_INSTRUCTIONS,
+    MULTI_STEP_INSTRUCTIONS,
+)
+
+
+def _tool_digest(include_tool_digest: bool) -> str | None:
+    # Imported here, as `agent_factory.utils` imports this module.
+    from agent_factory.utils.tool_digest import build_tool_digest
+
+    return build_tool_digest() if include_tool_digest else None
+
+
+def _cache_key(chat: bool, tool_digest: str | None, draft_readme: bool = False) -> str:
+    mode = "multi_step" if chat else "single_step"
+    key = f"{mode}:{INSTRUCTIONS_TEMPLATE_VERSION}:{_short_hash(tool_digest) if tool_digest else 'no_tool_digest'}"
+    return f"{key}:drafted_readme" if draft_readme else key
+
+
+def instructions_cache_key(chat: bool = False, include_tool_digest: bool = False, draft_readme: bool = False) -> str:
+    """Return the key of the rendered system instructions, from their mode, template version, tool digest and README.
+
+    Identical instructions have the same key and any change to them changes it, so it can be recorded with the LLM calls
+    to correlate their prompt cache hits with the instructions they were sent.
+    """
+    return _cache_key(chat, _tool_digest(include_tool_digest), draft_readme)
+
+
+@lru_cache(maxsize=1)
+def _compiled_template() -> Template:
+    return Template(INSTRUCTIONS_TEMPLATE)
+
+
+def _render_system_instructions(chat: bool, tool_digest: str | None, draft_readme: bool = False) -> str:
+    return _compiled_template().render(
         flow_instructions=MULTI_STEP_INSTRUCTIONS if chat else SINGLE_STEP_INSTRUCTIONS,
         code_generation_instructions=CODE_GENERATION_INSTRUCTIONS,
         agent_code_template=AGENT_CODE_TEMPLATE,
         code_example=CODE_EXAMPLE,
         deliverables_instructions=DELIVERABLES_INSTRUCTIONS,
+        readme_instructions=DRAFTED_README_INSTRUCTIONS if draft_readme else README_INSTRUCTIONS,
+        tool_digest=tool_digest,
     )
+
+
+@lru_cache(maxsize=1)
+def _precompiled_instructions() -> dict[str, str]:
+    """Load the instructions precompiled by `precompile_instructions`, by cache key, if there are any."""
+    from agent_factory.utils.logging import logger
+
+    if not PRECOMPILED_INSTRUCTIONS_PATH.is_file():
+        return {}
+    try:
+        spec = importlib.util.spec_from_file_location("precompiled_instructions", PRECOMPILED_INSTRUCTIONS_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return dict(module.INSTRUCTIONS)
+    except Exception as e:
+        logger.warning(f"Ignoring the precompiled instructions at {PRECOMPILED_INSTRUCTIONS_PATH}: {e}")
+        return {}
+
+
+_rendered_instructions: dict[str, str] = {}
+
+
+def load_system_instructions(chat: bool = False, include_tool_digest: bool = False, draft_readme: bool = False) -> str:
+    """Return the system instructions of the agent factory.
+
+    With `draft_readme`, the agent is asked to leave the `readme` empty, the README being drafted from its other
+    outputs with the model of the `readme` route (see `agent_factory.utils.model_routing`).
+
+    The instructions are rendered once per cache key (see `instructions_cache_key`), or taken from the precompiled
+    instructions if they include that key. Precompiled instructions of an older template or tool digest have another
+    key, so they are never used.
+    """
+    tool_digest = _tool_digest(include_tool_digest)
+    key = _cache_key(chat, tool_digest, draft_readme)
+    if key not in _rendered_instructions:
+        _rendered_instructions[key] = _precompiled_instructions().get(key) or _render_system_instructions(
+            chat, tool_digest, draft_readme
+        )
+    return _rendered_instructions[key]
+
+
+def precompile_instructions(output: str | None = None) -> Path:
+    """Render the system instructions of every mode into a Python module, loaded instead of rendering them at runtime.
+
+    Args:
+        output: Where to write the module. Defaults to `PRECOMPILED_INSTRUCTIONS_PATH`.
+
+    Returns:
+        The path of the module.
+    """
+    output_path = Path(output) if output else PRECOMPILED_INSTRUCTIONS_PATH
+    instructions = {}
+    for chat in (False, True):
+        for include_tool_digest in (False, True):
+            tool_digest = _tool_digest(include_tool_digest)
+            for draft_readme in (False, True):
+                instructions[_cache_key(chat, tool_digest, draft_readme)] = _render_system_instructions(
+                    chat, tool_digest, draft_readme
+                )
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(
+        '"""System instructions precompiled by `agent_factory.instructions.precompile_instructions`."""\n\n'
+        f"INSTRUCTIONS = {instructions!r}\n",
+        encoding="utf-8",
+    )
+    return output_path
+
+
+if __name__ == "__main__":
+    fire.Fire(precompile_instructions)
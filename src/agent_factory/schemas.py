@@ -39,7 +39,13 @@ class AgentFactoryOutputs(BaseModel):
     prompt_template: str = Field(
         ..., description="A prompt template that, completed with cli_args, defines the agent's input prompt."
     )
-    readme: str = Field(..., description="The run instructions in Markdown format")
+    readme: str = Field(..., description="The run instructions in Markdown format.")
+
+
+class DraftedReadmeAgentFactoryOutputs(AgentFactoryOutputs):
+    """The outputs of the factory agent when the README is drafted from the other outputs, by the fast model."""
+
+    readme: str = Field(description="Left empty, the README is drafted from the other outputs.", default="")
 
 
 class SyntaxErrorMessage(BaseModel):
@@ -9,6 +9,12 @@ set -eu
 : "${LOG_LEVEL:=info}"
 : "${CHAT:=1}"
 : "${MAX_TURNS:=40}"
+: "${TOOL_DIGEST:=0}"
+: "${BUDGET_SOFT_LIMIT:=0.8}"
+: "${PREPARE_ARTIFACTS:=0}"
+: "${ARTIFACT_WORKERS:=4}"
+: "${DRAFTS:=1}"
+: "${DRAFT_README:=0}"
 
 # Check if CHAT is set to 1 or 0 and set the chat flag accordingly
 if [ "$CHAT" -eq 1 ]; then
@@ -17,6 +23,49 @@ else
     chat_flag="--nochat"
 fi
 
+# Check if TOOL_DIGEST is set to 1 or 0 and set the tool digest flag accordingly
+if [ "$TOOL_DIGEST" -eq 1 ]; then
+    tool_digest_flag="--tool-digest"
+else
+    tool_digest_flag="--notool-digest"
+fi
+
+# Budget limits are only passed when set, leaving them unset means no limit
+set -- --budget-soft-limit "$BUDGET_SOFT_LIMIT"
+if [ -n "${MAX_TOKENS:-}" ]; then
+    set -- "$@" --max-tokens "$MAX_TOKENS"
+fi
+if [ -n "${MAX_COST:-}" ]; then
+    set -- "$@" --max-cost "$MAX_COST"
+fi
+if [ -n "${MAX_SECONDS:-}" ]; then
+    set -- "$@" --max-seconds "$MAX_SECONDS"
+fi
+
+# Point the model at another API, e.g. a local stub model server, when set
+if [ -n "${MODEL_API_BASE:-}" ]; then
+    set -- "$@" --api-base "$MODEL_API_BASE"
+fi
+
+# Prepare the agent artifacts on the server and stream them to the clients when enabled
+if [ "$PREPARE_ARTIFACTS" -eq 1 ]; then
+    set -- "$@" --prepare-artifacts --artifact-workers "$ARTIFACT_WORKERS"
+fi
+
+# Generate several speculative drafts of each request when DRAFTS is above 1, the first valid one being returned
+set -- "$@" --drafts "$DRAFTS"
+if [ -n "${MAX_CONCURRENT_DRAFTS:-}" ]; then
+    set -- "$@" --max-concurrent-drafts "$MAX_CONCURRENT_DRAFTS"
+fi
+if [ -n "${DRAFTS_MAX_COST:-}" ]; then
+    set -- "$@" --drafts-max-cost "$DRAFTS_MAX_COST"
+fi
+
+# Draft the README with the fast model of the readme route instead of the agent's model when enabled
+if [ "$DRAFT_README" -eq 1 ]; then
+    set -- "$@" --draft-readme
+fi
+
 exec uv run -m agent_factory \
     --framework "$FRAMEWORK" \
     --model "$MODEL" \
@@ -24,4 +73,6 @@ exec uv run -m agent_factory \
     --port "$A2A_SERVER_PORT" \
     --log-level "$LOG_LEVEL" \
     --max-turns "$MAX_TURNS" \
-    "$chat_flag"
+    "$chat_flag" \
+    "$tool_digest_flag" \
+    "$@"
@@ -0,0 +1,205 @@
+"""Stub model server speaking the OpenAI chat completions protocol, to run the factory without a real model.
+
+The server replays a script of tool calls that drives the factory agent through a realistic generation, then answers
+with the final `AgentFactoryOutputs` JSON. The step of the script is derived from the number of assistant messages in
+the conversation, so that any number of generations can run concurrently. The latency and token counts of the
+responses are configurable, e.g. to load test the A2A server:
+
+    python -m agent_factory.stub_model_server --port 8000 --latency 0.5
+    OPENAI_API_KEY=stub python -m agent_factory --model openai/stub --api-base http://localhost:8000/v1 --nochat
+"""
+
+import asyncio
+import json
+import random
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+import fire
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from agent_factory.config import CHARS_PER_TOKEN
+from agent_factory.utils.logging import logger
+
+# The tool calls of each turn of the default script, as (tool name, arguments).
+DEFAULT_TOOL_CALLS: list[list[tuple[str, dict[str, Any]]]] = [
+    [("search_mcp_servers", {"keyphrase": "web"})],
+    [("read_file", {"file_name": "tools/visit_webpage.py"})],
+]
+
+DEFAULT_FINAL_OUTPUT: dict[str, Any] = {
+    "message": "✅ Done! Your agent is ready!",
+    "status": "completed",
+    "imports": "from tools.visit_webpage import visit_webpage",
+    "agent_instructions": "Visit the webpage given by the user and summarize its main content in 4-6 sentences.",
+    "tools": "TOOLS = [\n    visit_webpage,  # Fetch webpage content\n]",
+    "mcp_servers": None,
+    "structured_outputs": (
+        "class StructuredOutput(BaseModel):\n"
+        '    url: str = Field(..., description="The webpage URL.")\n'
+        '    summary: str = Field(..., description="The summary of the webpage.")'
+    ),
+    "cli_args": "url: str",
+    "agent_description": "Fetches a webpage and returns a concise summary of its main content.",
+    "prompt_template": 'f"Summarize the content of the following webpage: {url}"',
+    "readme": "# Webpage Summarizer Agent\n\nRun it with `uv run python agent.py --url https://example.com`.",
+}
+
+
+class StubModel:
+    """Scripted chat completions.
+
+    Args:
+        tool_calls: The tool calls requested at each turn, as (tool name, arguments).
+        final_output: The final answer, returned once the tool calls of every turn were requested.
+        latency: Mean seconds before each response is returned.
+        latency_jitter: Maximum deviation in seconds from the mean latency, uniformly distributed.
+        completion_tokens: Number of output tokens reported for each response.
+    """
+
+    def __init__(
+        self,
+        tool_calls: list[list[tuple[str, dict[str, Any]]]] = DEFAULT_TOOL_CALLS,
+        final_output: dict[str, Any] = DEFAULT_FINAL_OUTPUT,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        completion_tokens: int = 100,
+    ):
+        self.tool_calls = tool_calls
+        self.final_output = final_output
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.completion_tokens = completion_tokens
+
+    def message(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Return the assistant message answering the chat completion `request`."""
+        messages = request.get("messages") or []
+        step = sum(message.get("role") == "assistant" for message in messages)
+        # Requests without tools only ask for the final answer, e.g. to conform it to the response format.
+        if step < len(self.tool_calls) and request.get("tools"):
+            return {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{step}_{i}",
+                        "type": "function",
+                        "function": {"name": name, "arguments": json.dumps(arguments)},
+                    }
+                    for i, (name, arguments) in enumerate(self.tool_calls[step])
+                ],
+            }
+        return {"role": "assistant", "content": json.dumps(self.final_answer(request))}
+
+    def final_answer(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Return the final output, wrapped in the A2A envelope when the response format requires it."""
+        response_format = request.get("response_format") or {}
+        schema = (response_format.get("json_schema") or {}).get("schema") or {}
+        if {"task_status", "data"} <= set(schema.get("properties") or {}):
+            # The envelope any-agent uses for the output of the agents served over A2A.
+            return {"task_status": "completed", "data": self.final_output}
+        return self.final_output
+
+    def usage(self, request: dict[str, Any]) -> dict[str, int]:
+        prompt_tokens = len(json.dumps(request.get("messages") or [])) // CHARS_PER_TOKEN
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": prompt_tokens + self.completion_tokens,
+        }
+
+    async def wait(self) -> None:
+        delay = self.latency + random.uniform(-self.latency_jitter, self.latency_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _completion(model: str, message: dict[str, Any], usage: dict[str, int]) -> dict[str, Any]:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {"index": 0, "message": message, "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}
+        ],
+        "usage": usage,
+    }
+
+
+def _stream(completion: dict[str, Any]) -> list[str]:
+    """Split a completion into server-sent chat completion chunks: the message first, then its finish reason."""
+    base = {key: completion[key] for key in ("id", "created", "model")} | {"object": "chat.completion.chunk"}
+    choice = completion["choices"][0]
+    chunks = [
+        base | {"choices": [{"index": 0, "delta": choice["message"], "finish_reason": None}]},
+        base | {"choices": [{"index": 0, "delta": {}, "finish_reason": choice["finish_reason"]}]},
+        base | {"choices": [], "usage": completion["usage"]},
+    ]
+    return [f"data: {json.dumps(chunk)}\n\n" for chunk in chunks] + ["data: [DONE]\n\n"]
+
+
+def create_app(model: StubModel) -> Starlette:
+    """Create the ASGI app serving `POST /v1/chat/completions` and `GET /v1/models` with the `model` script."""
+
+    async def chat_completions(request: Request) -> Response:
+        body = await request.json()
+        await model.wait()
+        completion = _completion(body.get("model", "stub"), model.message(body), model.usage(body))
+        if body.get("stream"):
+            return StreamingResponse(iter(_stream(completion)), media_type="text/event-stream")
+        return JSONResponse(completion)
+
+    async def models(request: Request) -> Response:
+        return JSONResponse(
+            {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "agent-factory"}]}
+        )
+
+    return Starlette(
+        routes=[
+            Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+            Route("/v1/models", models, methods=["GET"]),
+        ]
+    )
+
+
+def serve(
+    host: str = "localhost",
+    port: int = 8000,
+    latency: float = 0.0,
+    latency_jitter: float = 0.0,
+    completion_tokens: int = 100,
+    script: str | None = None,
+    log_level: str = "warning",
+) -> None:
+    """Run the stub model server.
+
+    Args:
+        host: The host address to listen on.
+        port: The port to listen on.
+        latency: Mean seconds before each response is returned.
+        latency_jitter: Maximum deviation in seconds from the mean latency.
+        completion_tokens: Number of output tokens reported for each response.
+        script: Optional JSON file with the `tool_calls` of each turn (lists of `{"name", "arguments"}` objects) and
+            the `final_output`, replacing the default script.
+        log_level: The uvicorn logging level.
+    """
+    tool_calls, final_output = DEFAULT_TOOL_CALLS, DEFAULT_FINAL_OUTPUT
+    if script:
+        data = json.loads(Path(script).read_text(encoding="utf-8"))
+        tool_calls = [[(call["name"], call.get("arguments", {})) for call in turn] for turn in data["tool_calls"]]
+        final_output = data.get("final_output", final_output)
+
+    model = StubModel(tool_calls, final_output, latency, latency_jitter, completion_tokens)
+    logger.info(f"Serving the stub model on http://{host}:{port}/v1")
+    uvicorn.run(create_app(model), host=host, port=port, log_level=log_level)
+
+
+if __name__ == "__main__":
+    fire.Fire(serve)
@@ -1,13 +1,15 @@
+from .artifact_cache import get_artifact_cache
 from .artifact_validation import clean_python_code_with_autoflake, prepare_python_code, validate_dependencies
 from .client_utils import (
     create_a2a_http_client,
     create_agent_trace_from_dumped_spans,
     create_message_request,
     get_a2a_agent_card,
+    get_server_prepared_artifacts,
     process_a2a_agent_final_response,
     process_streaming_response_message,
 )
-from .io_utils import prepare_agent_artifacts
+from .io_utils import prepare_agent_artifacts, prepare_agent_artifacts_async
 from .logging import logger
 from .storage import get_storage_backend
 
@@ -16,12 +18,15 @@ __all__ = [
     "validate_dependencies",
     "prepare_python_code",
     "prepare_agent_artifacts",
+    "prepare_agent_artifacts_async",
     "create_a2a_http_client",
     "get_a2a_agent_card",
+    "get_server_prepared_artifacts",
     "create_message_request",
     "process_a2a_agent_final_response",
     "process_streaming_response_message",
     "create_agent_trace_from_dumped_spans",
     "get_storage_backend",
+    "get_artifact_cache",
     "logger",
 ]
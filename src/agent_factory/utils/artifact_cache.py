@@ -0,0 +1,117 @@
+"""Persistent cache of prepared agent artifact bundles."""
+
+import hashlib
+import json
+import tempfile
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from agent_factory.config import ARTIFACT_CACHE_DIR, TOOLS_DIR
+from agent_factory.utils.artifact_validation import ANY_AGENT_VERSION
+from agent_factory.utils.logging import logger
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def canonical_hash(data: Any) -> str:
+    """Return a SHA-256 hex digest of a canonical (key-sorted, compact) JSON serialization of `data`."""
+    serialized = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_json_default)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=8)
+def _hash_tool_files(fingerprint: tuple[tuple[str, int, int], ...], tools_dir: Path) -> str:
+    digest = hashlib.sha256()
+    for name, _, _ in fingerprint:
+        digest.update(name.encode("utf-8"))
+        digest.update((tools_dir / name).read_bytes())
+    return digest.hexdigest()
+
+
+def tool_catalog_hash(tools_dir: Path = TOOLS_DIR) -> str:
+    """Return a hash of the contents of the tool files that can be bundled with a generated agent.
+
+    The (comparatively expensive) content hash is only recomputed when the name, size or mtime of a file changes.
+    """
+    fingerprint = tuple(
+        (path.name, path.stat().st_mtime_ns, path.stat().st_size) for path in sorted(tools_dir.glob("*.py"))
+    )
+    return _hash_tool_files(fingerprint, tools_dir)
+
+
+class ArtifactBundleCache:
+    """Cache prepared agent artifacts on disk, keyed by a canonical hash of the Agent Factory outputs.
+
+    The key also covers the tool catalog and the any-agent version pinned in the generated requirements, so any
+    change to either of them invalidates all the existing entries. For outputs with MCP servers, it covers the version
+    of the MCP registry as well, as the cached mcpd config is rendered from the registry records of the servers.
+
+    Args:
+        cache_dir: Directory where the cached bundles are stored. It is created on the first write.
+        tools_dir: Directory containing the tool files that can be bundled with a generated agent.
+    """
+
+    def __init__(self, cache_dir: Path, tools_dir: Path = TOOLS_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.tools_dir = tools_dir
+
+    def __str__(self) -> str:
+        """Human-readable string identifying the cache location."""
+        return f"artifact bundle cache at {self.cache_dir}"
+
+    def key(self, agent_factory_outputs: dict[str, Any]) -> str:
+        # Imported here as the registry access itself relies on `canonical_hash`.
+        from agent_factory.utils.mcp_registry import registry_version
+
+        return canonical_hash(
+            {
+                "agent_factory_outputs": agent_factory_outputs,
+                "tool_catalog": tool_catalog_hash(self.tools_dir),
+                "any_agent_version": ANY_AGENT_VERSION,
+                "registry_version": registry_version() if agent_factory_outputs.get("mcp_servers") else None,
+            }
+        )
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, agent_factory_outputs: dict[str, Any]) -> dict[str, str] | None:
+        """Return the cached artifacts for the given outputs, or `None` on a cache miss."""
+        entry_path = self._entry_path(self.key(agent_factory_outputs))
+        if not entry_path.exists():
+            return None
+        try:
+            return json.loads(entry_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable artifact cache entry {entry_path}: {e}")
+            return None
+
+    def put(self, agent_factory_outputs: dict[str, Any], artifacts: dict[str, str]) -> None:
+        """Store the artifacts prepared for the given outputs.
+
+        The entry is written to a temporary file and then atomically moved in place, so that concurrent readers never
+        see a partially written bundle.
+        """
+        entry_path = self._entry_path(self.key(agent_factory_outputs))
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=self.cache_dir, suffix=".tmp", delete=False
+            ) as tmp_file:
+                json.dump(artifacts, tmp_file)
+            Path(tmp_file.name).replace(entry_path)
+        except OSError as e:
+            logger.warning(f"Failed to write artifact cache entry {entry_path}: {e}")
+
+
+def get_artifact_cache() -> ArtifactBundleCache | None:
+    """Return the artifact bundle cache configured via `ARTIFACT_CACHE_DIR`, or `None` if it is disabled."""
+    if ARTIFACT_CACHE_DIR is None:
+        return None
+    return ArtifactBundleCache(ARTIFACT_CACHE_DIR)
@@ -0,0 +1,113 @@
+"""Server-side preparation of the agent artifacts, streamed to the A2A clients as artifact parts.
+
+By default the factory server answers with the `AgentFactoryOutputs` JSON only, and every client prepares the artifacts
+itself. With the artifact preparation enabled, the server prepares them next to the agent instead, in a pool of worker
+threads shared by all requests and with the artifact cache of the server, and streams each file as an A2A artifact as
+soon as it is ready, before the final status update.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from uuid import uuid4
+
+from a2a.server.agent_execution import AgentExecutor, RequestContext
+from a2a.server.apps import A2AStarletteApplication
+from a2a.server.events import EventQueue
+from a2a.types import Artifact, Part, TaskArtifactUpdateEvent, TaskState, TaskStatusUpdateEvent, TextPart
+from pydantic import ValidationError
+
+from agent_factory.schemas import AgentFactoryOutputs, Status
+from agent_factory.utils.artifact_cache import ArtifactBundleCache, get_artifact_cache
+from agent_factory.utils.client_utils import ARTIFACT_COUNT_METADATA_KEY
+from agent_factory.utils.io_utils import iter_agent_artifacts
+from agent_factory.utils.logging import logger
+
+
+class _FinalStatusInterceptor:
+    """Event queue forwarding the events of an agent executor, except its final status update which is held back."""
+
+    def __init__(self, event_queue: EventQueue):
+        self._event_queue = event_queue
+        self.final_event: TaskStatusUpdateEvent | None = None
+
+    async def enqueue_event(self, event: Any) -> None:
+        if isinstance(event, TaskStatusUpdateEvent) and event.final:
+            self.final_event = event
+            return
+        await self._event_queue.enqueue_event(event)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._event_queue, name)
+
+
+def _completed_outputs(event: TaskStatusUpdateEvent) -> dict[str, Any] | None:
+    """The `AgentFactoryOutputs` of a final status update, if the agent completed the generation."""
+    if event.status.state != TaskState.completed or not event.status.message:
+        return None
+    try:
+        outputs = AgentFactoryOutputs.model_validate(json.loads(event.status.message.parts[0].root.text))
+    except (AttributeError, IndexError, json.JSONDecodeError, ValidationError):
+        return None
+    return outputs.model_dump() if outputs.status == Status.COMPLETED else None
+
+
+class ArtifactPreparingExecutor(AgentExecutor):
+    """Agent executor preparing the agent artifacts of the completed generations of the wrapped executor.
+
+    Each artifact is streamed as an A2A artifact named after its path. The final status update is forwarded once all of
+    them were streamed, recording their number under `ARTIFACT_COUNT_METADATA_KEY`. If the preparation fails, the
+    final status update is forwarded without it, and the clients prepare the artifacts themselves.
+
+    Args:
+        agent_executor: The executor running the factory agent.
+        max_workers: The number of worker threads running the preparation stages, shared by all the requests.
+        cache: The artifact bundle cache shared by all the requests, if any.
+    """
+
+    def __init__(self, agent_executor: AgentExecutor, max_workers: int = 4, cache: ArtifactBundleCache | None = None):
+        self.agent_executor = agent_executor
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="artifact-preparation")
+        self.cache = cache
+
+    async def execute(self, context: RequestContext, event_queue: EventQueue) -> None:
+        interceptor = _FinalStatusInterceptor(event_queue)
+        await self.agent_executor.execute(context, interceptor)
+        final_event = interceptor.final_event
+        if final_event is None:
+            return
+
+        if (outputs := _completed_outputs(final_event)) is not None:
+            count = 0
+            try:
+                async for path, content in iter_agent_artifacts(outputs, cache=self.cache, executor=self.pool):
+                    await event_queue.enqueue_event(
+                        TaskArtifactUpdateEvent(
+                            task_id=final_event.task_id,
+                            context_id=final_event.context_id,
+                            artifact=Artifact(
+                                artifact_id=uuid4().hex, name=path, parts=[Part(root=TextPart(text=content))]
+                            ),
+                            last_chunk=True,
+                        )
+                    )
+                    count += 1
+            except Exception as e:
+                logger.error(f"Failed to prepare the agent artifacts, leaving them to the client: {e}", exc_info=True)
+            else:
+                final_event.metadata = (final_event.metadata or {}) | {ARTIFACT_COUNT_METADATA_KEY: count}
+        await event_queue.enqueue_event(final_event)
+
+    async def cancel(self, context: RequestContext, event_queue: EventQueue) -> None:
+        await self.agent_executor.cancel(context, event_queue)
+
+
+def enable_artifact_preparation(app: A2AStarletteApplication, max_workers: int = 4) -> ArtifactPreparingExecutor:
+    """Make the A2A `app` prepare the agent artifacts of the completed generations, and stream them to the clients."""
+    request_handler = app.handler.request_handler
+    executor = ArtifactPreparingExecutor(
+        request_handler.agent_executor, max_workers=max_workers, cache=get_artifact_cache()
+    )
+    request_handler.agent_executor = executor
+    logger.info(f"Preparing the agent artifacts on the server with {max_workers} workers")
+    return executor
@@ -2,10 +2,10 @@ import importlib.metadata
 import json
 
 import autoflake
-from any_llm import completion
 
 from agent_factory.schemas import CodeSnippet, SyntaxErrorMessage
 from agent_factory.utils.logging import logger
+from agent_factory.utils.model_routing import get_model_router
 
 ANY_AGENT_VERSION = importlib.metadata.version("any_agent")
 
@@ -24,16 +24,15 @@ def clean_python_code_with_autoflake(code: str) -> str:
         raise
 
 
-def fix_python_syntax_errors(error_message: SyntaxErrorMessage, model: str = "gpt-4o-mini") -> str:
+def fix_python_syntax_errors(error_message: SyntaxErrorMessage) -> str:
     """Fix Python syntax issues in the code.
 
     Use an LLM to suggest a fix for the provided Python code that has a syntax error. The LLM is prompted
-    with the code snippet and the error message, and it is expected to return a corrected version of the code.
+    with the code snippet and the error message, and it is expected to return a corrected version of the code. The LLM
+    is the model of the `syntax_repair` route (see `ModelRouter`).
 
     Args:
         error_message: An instance of SyntaxErrorMessage containing the code with the details of the syntax error.
-        model: The LLM model to use for generating the fix.
-        provider: The LLM provider to use.
 
     Returns:
         A string containing the fixed Python code.
@@ -49,8 +48,8 @@ def fix_python_syntax_errors(error_message: SyntaxErrorMessage, model: str = "gp
 
     You should return the whole code snippet again, fixed.
     """
-    response = completion(
-        model=model,
+    response = get_model_router().completion(
+        "syntax_repair",
         messages=[{"content": content, "role": "user"}],
         response_format=CodeSnippet,  # Code validation does not run at this point
     )
@@ -68,7 +67,6 @@ def validate_python_syntax(
     code: str,
     max_retries: int = 3,
     attempt: int = 1,
-    model: str = "gpt-4o-mini",
 ) -> CodeSnippet:
     """Validate Python code syntax recursively.
 
@@ -104,7 +102,7 @@ def validate_python_syntax(
         logger.error(f"Error details: {e.msg} on line {e.lineno}")
 
         try:
-            fixed_code = fix_python_syntax_errors(error_message, model=model)
+            fixed_code = fix_python_syntax_errors(error_message)
         except json.JSONDecodeError as e:
             logger.error(f"Failed to decode JSON response while fixing syntax errors: {e}")
             raise
@@ -113,13 +111,13 @@ def validate_python_syntax(
             "A syntax error was caught during Agent code generation. "
             "An fix was suggested. Re-validating the new code..."
         )
-        return validate_python_syntax(fixed_code, max_retries, attempt + 1, model=model)
+        return validate_python_syntax(fixed_code, max_retries, attempt + 1)
 
 
 def prepare_python_code(code: str) -> CodeSnippet:
     try:
         cleaned_code = clean_python_code_with_autoflake(code)
-        return validate_python_syntax(cleaned_code, max_retries=3, attempt=1, model="gpt-4o-mini")
+        return validate_python_syntax(cleaned_code, max_retries=3, attempt=1)
     except SyntaxError as e:
         logger.error(f"Agent's code contains syntax errors: {e}")
         raise e
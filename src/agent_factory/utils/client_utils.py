@@ -13,7 +13,9 @@ from a2a.types import (
     MessageSendParams,
     SendMessageResponse,
     SendStreamingMessageRequest,
+    TaskArtifactUpdateEvent,
     TaskState,
+    TaskStatusUpdateEvent,
 )
 from any_agent.tracing.agent_trace import AgentSpan, AgentTrace
 from any_agent.tracing.attributes import GenAI
@@ -22,6 +24,9 @@ from pydantic import BaseModel
 from agent_factory.schemas import AgentFactoryOutputs
 from agent_factory.utils.logging import logger
 
+# Metadata of the final status update of a server preparing the agent artifacts, with the number of artifacts streamed.
+ARTIFACT_COUNT_METADATA_KEY = "agent_factory_artifact_count"
+
 
 class ProcessedStreamingResponse(BaseModel):
     message_type: Literal["info", "error"] = "info"
@@ -110,7 +115,10 @@ def process_streaming_response_message(response: Any) -> ProcessedStreamingRespo
         # submitted, working, completed, failed, input-required, canceled, unknown
         # See: https://www.a2aprotocol.net/docs/specification
         # Using a subset of these states to log different messages
-        if response.root.result.status.state == TaskState.submitted:
+        if isinstance(response.root.result, TaskArtifactUpdateEvent):
+            processed_response.message = f"Received the agent artifact {response.root.result.artifact.name}"
+
+        elif response.root.result.status.state == TaskState.submitted:
             processed_response.message = "Manufacturing agent has received the message and is processing it."
 
         elif response.root.result.status.state == TaskState.working and response.root.result.status.message:
@@ -138,6 +146,32 @@ def process_streaming_response_message(response: Any) -> ProcessedStreamingRespo
         return processed_response
 
 
+def get_streamed_artifact(response: Any) -> tuple[str, str] | None:
+    """Return the (path, content) of the agent artifact carried by a streaming response, if any.
+
+    Servers preparing the agent artifacts stream each file as an A2A artifact named after its path.
+    """
+    result = getattr(response.root, "result", None)
+    if not isinstance(result, TaskArtifactUpdateEvent):
+        return None
+    return result.artifact.name, "".join(part.root.text for part in result.artifact.parts if part.root.kind == "text")
+
+
+def get_server_prepared_artifacts(responses: list[Any]) -> dict[str, str] | None:
+    """Return the agent artifacts streamed by the server, or `None` if it did not prepare all of them.
+
+    The final status update of a server preparing the artifacts records how many it streamed, so that a client never
+    saves an incomplete set, e.g. when the server failed to prepare them and left it to the client.
+    """
+    artifacts = dict(artifact for response in responses if (artifact := get_streamed_artifact(response)))
+    final_result = getattr(responses[-1].root, "result", None) if responses else None
+    if not isinstance(final_result, TaskStatusUpdateEvent) or not final_result.metadata:
+        return None
+    if final_result.metadata.get(ARTIFACT_COUNT_METADATA_KEY) != len(artifacts):
+        return None
+    return artifacts
+
+
 def create_agent_trace_from_dumped_spans(
     spans_dump_file_path: list[Path],
     final_output: str | None = None,
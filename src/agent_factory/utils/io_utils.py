@@ -1,15 +1,25 @@
 import ast
+import asyncio
+import contextvars
 import importlib.metadata
 import sys
-from pathlib import Path
+import time
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, TypeVar
 
+from pydantic import BaseModel, Field
+
+from agent_factory.config import TOOLS_DIR
 from agent_factory.instructions import AGENT_CODE_TEMPLATE
 from agent_factory.schemas import AgentParameters
 from agent_factory.utils import prepare_python_code, validate_dependencies
+from agent_factory.utils.artifact_cache import ArtifactBundleCache
 from agent_factory.utils.logging import logger
 from agent_factory.utils.mcpd_utils import export_mcpd_config_artifacts
+from agent_factory.utils.model_routing import draft_readme
 
-TOOLS_DIR = Path(__file__).parent.parent / "tools"
+T = TypeVar("T")
 
 
 def parse_cli_args_to_params_json(cli_args_str: str) -> str:
@@ -110,41 +120,242 @@ def extract_requirements_from_string(python_code: str) -> set[str]:
     return final_packages
 
 
-def prepare_agent_artifacts(agent_factory_outputs: dict[str, str]) -> dict[str, str]:
-    """Prepares the agent outputs (based on AgentFactoryOutputs)
-    for saving by filling in the code generation templates
-    and gathering (Python) tool files.
-    """
-    artifacts_to_save = {}
+class ArtifactPipelineResult(BaseModel):
+    """The outcome of a run of the artifact preparation pipeline."""
+
+    artifacts: dict[str, str] = Field(..., description="File paths mapped to their contents.")
+    stage_timings: dict[str, float] = Field(..., description="Wall-clock seconds spent in each pipeline stage.")
+
+
+def _timed_stage(stage_name: str, stage_fn: Callable[..., T], *args: Any) -> tuple[str, T, float]:
+    start = time.perf_counter()
+    result = stage_fn(*args)
+    return stage_name, result, time.perf_counter() - start
 
-    agent_code = AGENT_CODE_TEMPLATE.format(**agent_factory_outputs)
-    valid_agent_code = prepare_python_code(agent_code)
-    artifacts_to_save["agent.py"] = valid_agent_code.code
 
-    artifacts_to_save["README.md"] = agent_factory_outputs["readme"]
+def _render_agent_code(agent_factory_outputs: dict[str, Any]) -> str:
+    return AGENT_CODE_TEMPLATE.format(**agent_factory_outputs)
 
+
+def _prepare_agent_code_stage(agent_code: str) -> str:
+    """Clean up and validate the rendered agent code (autoflake, syntax check and, if needed, LLM fixes)."""
+    return prepare_python_code(agent_code).code
+
+
+def _bundle_tool_files_stage(agent_code: str) -> tuple[dict[str, str], set[str]]:
+    """Gather the tool files referenced by the agent code together with their third-party dependencies."""
+    tool_artifacts = {}
     dependencies = set()
-    # Identify and read tool files
     for tool_file in TOOLS_DIR.iterdir():
         if tool_file.is_file() and (tool_file.stem in agent_code or tool_file.name == "__init__.py"):
             if tool_file.suffix != ".py":
                 continue
             tool_code = tool_file.read_text(encoding="utf-8")
             dependencies.update(extract_requirements_from_string(tool_code))
-            artifacts_to_save[f"tools/{tool_file.name}"] = tool_code
+            tool_artifacts[f"tools/{tool_file.name}"] = tool_code
+    return tool_artifacts, dependencies
+
+
+def _export_mcpd_config_stage(agent_factory_outputs: dict[str, Any]) -> dict[str, str]:
+    return export_mcpd_config_artifacts(agent_factory_outputs)
+
+
+def _draft_readme_stage(agent_factory_outputs: dict[str, Any]) -> str:
+    """Draft the README the agent left empty, with the model of the `readme` route."""
+    return draft_readme(agent_factory_outputs)
+
 
-    dependencies.update(extract_requirements_from_string(valid_agent_code.code))  # type: ignore
-    dependencies_list = list(dependencies)
-    validated_dependencies = validate_dependencies(agent_factory_outputs["tools"], dependencies_list)
-    artifacts_to_save["requirements.txt"] = validated_dependencies
+GITIGNORE = "*secrets*.dev.toml\n!secrets.prod.toml"
+
+
+def _stage_artifacts(name: str, result: Any) -> dict[str, str]:
+    """The final artifacts produced by a single concurrent stage."""
+    if name == "agent_code":
+        return {"agent.py": result}
+    if name == "readme":
+        return {"README.md": result}
+    if name == "tools":
+        return result[0]
+    return result
+
+
+def _assemble_artifacts(
+    agent_factory_outputs: dict[str, Any],
+    stage_results: dict[str, Any],
+    stage_timings: dict[str, float],
+) -> ArtifactPipelineResult:
+    """Join the results of the concurrent stages into the final set of artifacts.
+
+    Extracting the requirements is the only stage depending on more than one of the concurrent stages, so it runs
+    here, once the validated agent code and the bundled tools are both available.
+    """
+    valid_agent_code: str = stage_results["agent_code"]
+    tool_artifacts, dependencies = stage_results["tools"]
+
+    readme = stage_results.get("readme", agent_factory_outputs["readme"])
+    artifacts_to_save = {"agent.py": valid_agent_code, "README.md": readme}
+    artifacts_to_save.update(tool_artifacts)
+
+    start = time.perf_counter()
+    # Sorted, so that the requirements of the same artifacts are identical whichever order the stages ran in.
+    dependencies_list = sorted(dependencies | extract_requirements_from_string(valid_agent_code))
+    artifacts_to_save["requirements.txt"] = validate_dependencies(agent_factory_outputs["tools"], dependencies_list)
+    stage_timings["requirements"] = time.perf_counter() - start
 
     cli_args_str = agent_factory_outputs.get("cli_args", "")
     artifacts_to_save["agent_parameters.json"] = parse_cli_args_to_params_json(cli_args_str)
 
-    mcpd_artifacts = export_mcpd_config_artifacts(agent_factory_outputs)
-    artifacts_to_save.update(mcpd_artifacts)
+    artifacts_to_save.update(stage_results["mcpd"])
 
     # Add a .gitignore file for ignoring secrets
-    artifacts_to_save[".gitignore"] = "*secrets*.dev.toml\n!secrets.prod.toml"
+    artifacts_to_save[".gitignore"] = GITIGNORE
+
+    logger.info(
+        "Artifact preparation stage timings: "
+        + ", ".join(f"{stage}={elapsed:.3f}s" for stage, elapsed in stage_timings.items())
+    )
+    return ArtifactPipelineResult(artifacts=artifacts_to_save, stage_timings=stage_timings)
+
+
+def _concurrent_stages(agent_factory_outputs: dict[str, Any]) -> list[tuple[str, Callable[..., Any], Any]]:
+    """The independent stages of the pipeline, as (name, function, argument) triples.
+
+    Tool bundling only needs the rendered (not yet cleaned) agent code to know which tools are referenced, so it does
+    not wait for the code cleanup and validation stage. The README is only drafted if the agent left it empty.
+    """
+    agent_code = _render_agent_code(agent_factory_outputs)
+    stages = [
+        ("mcpd", _export_mcpd_config_stage, agent_factory_outputs),
+        ("agent_code", _prepare_agent_code_stage, agent_code),
+        ("tools", _bundle_tool_files_stage, agent_code),
+    ]
+    if not agent_factory_outputs["readme"]:
+        stages.append(("readme", _draft_readme_stage, agent_factory_outputs))
+    return stages
+
+
+def run_artifact_pipeline(agent_factory_outputs: dict[str, Any]) -> ArtifactPipelineResult:
+    """Prepare the agent artifacts, running the independent stages concurrently in a thread pool.
+
+    The stages are: mcpd config export, agent code cleanup and validation, tool bundling and, if the agent left it
+    empty, README drafting. Requirements extraction runs once the code and the tools are ready.
+
+    Args:
+        agent_factory_outputs: The outputs from the Agent Factory (based on `AgentFactoryOutputs`).
+
+    Returns:
+        The prepared artifacts together with the wall-clock time spent in each stage.
+    """
+    stages = _concurrent_stages(agent_factory_outputs)
+    stage_results, stage_timings = {}, {}
+    with ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="artifact-pipeline") as executor:
+        # In a copy of the current context, so that the spans of the LLM calls of the stages belong to its trace.
+        futures = [
+            executor.submit(contextvars.copy_context().run, _timed_stage, name, fn, arg) for name, fn, arg in stages
+        ]
+        for future in futures:
+            name, result, elapsed = future.result()
+            stage_results[name], stage_timings[name] = result, elapsed
+
+    return _assemble_artifacts(agent_factory_outputs, stage_results, stage_timings)
+
+
+async def run_artifact_pipeline_async(agent_factory_outputs: dict[str, Any]) -> ArtifactPipelineResult:
+    """Async counterpart of `run_artifact_pipeline`, which does not block the running event loop.
+
+    Args:
+        agent_factory_outputs: The outputs from the Agent Factory (based on `AgentFactoryOutputs`).
+
+    Returns:
+        The prepared artifacts together with the wall-clock time spent in each stage.
+    """
+    stages = _concurrent_stages(agent_factory_outputs)
+    completed = await asyncio.gather(*(asyncio.to_thread(_timed_stage, name, fn, arg) for name, fn, arg in stages))
+    stage_results = {name: result for name, result, _ in completed}
+    stage_timings = {name: elapsed for name, _, elapsed in completed}
+
+    return await asyncio.to_thread(_assemble_artifacts, agent_factory_outputs, stage_results, stage_timings)
+
+
+def prepare_agent_artifacts(
+    agent_factory_outputs: dict[str, Any], cache: ArtifactBundleCache | None = None
+) -> dict[str, str]:
+    """Prepares the agent outputs (based on AgentFactoryOutputs)
+    for saving by filling in the code generation templates
+    and gathering (Python) tool files.
+
+    If a `cache` is supplied, artifacts previously prepared for the same outputs are returned straight from it and
+    freshly prepared artifacts are stored into it.
+    """
+    if cache is not None and (cached_artifacts := cache.get(agent_factory_outputs)) is not None:
+        logger.info(f"Using agent artifacts from the {cache}")
+        return cached_artifacts
+
+    artifacts = run_artifact_pipeline(agent_factory_outputs).artifacts
+    if cache is not None:
+        cache.put(agent_factory_outputs, artifacts)
+    return artifacts
+
+
+async def prepare_agent_artifacts_async(
+    agent_factory_outputs: dict[str, Any], cache: ArtifactBundleCache | None = None
+) -> dict[str, str]:
+    """Async counterpart of `prepare_agent_artifacts`."""
+    if (
+        cache is not None
+        and (cached_artifacts := await asyncio.to_thread(cache.get, agent_factory_outputs)) is not None
+    ):
+        logger.info(f"Using agent artifacts from the {cache}")
+        return cached_artifacts
+
+    artifacts = (await run_artifact_pipeline_async(agent_factory_outputs)).artifacts
+    if cache is not None:
+        await asyncio.to_thread(cache.put, agent_factory_outputs, artifacts)
+    return artifacts
+
+
+async def iter_agent_artifacts(
+    agent_factory_outputs: dict[str, Any],
+    cache: ArtifactBundleCache | None = None,
+    executor: Executor | None = None,
+) -> AsyncIterator[tuple[str, str]]:
+    """Prepare the agent artifacts like `prepare_agent_artifacts_async`, yielding each file as soon as it is ready.
+
+    The files needing no preparation are yielded first, then the files of each concurrent stage as it completes, and
+    the requirements last. The stages run in `executor`, or in the default executor of the event loop.
+
+    Yields:
+        The (path, content) of each artifact.
+    """
+    loop = asyncio.get_running_loop()
+    if (
+        cache is not None
+        and (cached_artifacts := await loop.run_in_executor(executor, cache.get, agent_factory_outputs)) is not None
+    ):
+        logger.info(f"Using agent artifacts from the {cache}")
+        for artifact in cached_artifacts.items():
+            yield artifact
+        return
+
+    if agent_factory_outputs["readme"]:
+        yield "README.md", agent_factory_outputs["readme"]
+    yield "agent_parameters.json", parse_cli_args_to_params_json(agent_factory_outputs.get("cli_args", ""))
+    yield ".gitignore", GITIGNORE
+
+    stage_results, stage_timings = {}, {}
+    stages = [
+        loop.run_in_executor(executor, contextvars.copy_context().run, _timed_stage, name, fn, arg)
+        for name, fn, arg in _concurrent_stages(agent_factory_outputs)
+    ]
+    for stage in asyncio.as_completed(stages):
+        name, result, elapsed = await stage
+        stage_results[name], stage_timings[name] = result, elapsed
+        for artifact in _stage_artifacts(name, result).items():
+            yield artifact
 
-    return artifacts_to_save
+    result = await loop.run_in_executor(
+        executor, _assemble_artifacts, agent_factory_outputs, stage_results, stage_timings
+    )
+    yield "requirements.txt", result.artifacts["requirements.txt"]
+    if cache is not None:
+        await loop.run_in_executor(executor, cache.put, agent_factory_outputs, result.artifacts)
@@ -35,3 +35,19 @@ class JsonFileSpanExporter(SpanExporter):
 
     def shutdown(self):
         pass
+
+
+def merge_trace_files(source_trace_id: int, target_trace_id: int, output_dir: str | Path) -> None:
+    """Move the spans exported for the `source_trace_id` trace to the file of the `target_trace_id` trace."""
+    output_dir = Path(output_dir)
+    source_file = output_dir / f"0x{format_trace_id(source_trace_id)}.jsonl"
+    if not source_file.exists():
+        return
+    with (output_dir / f"0x{format_trace_id(target_trace_id)}.jsonl").open("a", encoding="utf-8") as f:
+        f.write(source_file.read_text(encoding="utf-8"))
+    source_file.unlink()
+
+
+def delete_trace_file(trace_id: int, output_dir: str | Path) -> None:
+    """Delete the spans exported for the `trace_id` trace, if any."""
+    (Path(output_dir) / f"0x{format_trace_id(trace_id)}.jsonl").unlink(missing_ok=True)
@@ -0,0 +1,213 @@
+"""Record and replay of the LLM calls made by the factory, for deterministic offline runs.
+
+In record mode, every call to the wrapped completion functions is forwarded to the model, and the request and its
+response (or its chunks, for streamed responses) are appended to a JSON lines cassette file. In replay mode, the
+responses are served from the cassette instead, without any network access.
+"""
+
+import functools
+import importlib
+import inspect
+import json
+import threading
+from collections import defaultdict
+from collections.abc import AsyncIterator, Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+from any_llm.types.completion import ChatCompletion, ChatCompletionChunk
+from pydantic import BaseModel
+
+from agent_factory.config import LLM_CASSETTE_MODE, LLM_CASSETTE_PATH
+from agent_factory.utils.artifact_cache import canonical_hash
+from agent_factory.utils.logging import logger
+
+CASSETTE_MODES = ("record", "replay")
+
+# Request parameters that don't affect the response, left out of the request keys.
+IGNORED_REQUEST_PARAMETERS = frozenset({"api_key", "api_base", "api_timeout", "client_args", "user"})
+
+# The completion functions called by the factory agent and by its routed subtasks, as (module, attribute).
+PATCHED_COMPLETIONS = (
+    ("any_agent.frameworks.tinyagent", "acompletion"),
+    ("agent_factory.utils.model_routing", "completion"),
+)
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when the cassette has no response recorded for a request."""
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, type) and issubclass(value, BaseModel):
+        return value.model_json_schema()
+    if isinstance(value, BaseModel):
+        return _normalize(value.model_dump(exclude_none=True))
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list | tuple):
+        return [_normalize(v) for v in value]
+    if callable(value):
+        return getattr(value, "__name__", repr(value))
+    return value
+
+
+def normalize_request(params: dict[str, Any]) -> dict[str, Any]:
+    """Return the JSON-serializable parts of the completion `params` that determine the response.
+
+    Unset parameters, credentials and endpoints are left out, response formats are replaced by their JSON schema, and
+    the content of tool results is dropped: tool calls such as web page visits are not recorded, and their results
+    should not prevent a recorded conversation from being replayed.
+    """
+    request = _normalize({k: v for k, v in params.items() if k not in IGNORED_REQUEST_PARAMETERS})
+    for message in request.get("messages", []):
+        if isinstance(message, dict) and message.get("role") == "tool":
+            message.pop("content", None)
+    return request
+
+
+class LLMCassette:
+    """Cassette of recorded LLM requests and responses, stored as JSON lines in `path`.
+
+    Args:
+        path: The cassette file. It must exist in replay mode, and is appended to in record mode.
+        mode: Either "record" or "replay".
+
+    Raises:
+        ValueError: If `mode` is not a known mode.
+        FileNotFoundError: If the cassette doesn't exist in replay mode.
+    """
+
+    def __init__(self, path: Path, mode: str = "replay"):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}', expected one of {CASSETTE_MODES}")
+        self.path = Path(path)
+        self.mode = mode
+        self._interactions: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        self._replayed: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        if mode == "replay":
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        interaction = json.loads(line)
+                        self._interactions[interaction["key"]].append(interaction)
+
+    def __len__(self) -> int:
+        """Number of interactions in the cassette."""
+        return sum(len(interactions) for interactions in self._interactions.values())
+
+    def _record(self, key: str, request: dict[str, Any], **response: Any) -> None:
+        line = json.dumps({"key": key, "request": request, **response}, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._interactions[key].append({"key": key, **response})
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line)
+
+    def _replay(self, key: str) -> dict[str, Any]:
+        """Return the next response recorded for `key`, the last one being repeated once all were replayed."""
+        with self._lock:
+            interactions = self._interactions.get(key)
+            if not interactions:
+                raise CassetteMissError(f"No response recorded in {self.path} for LLM request {key}")
+            index = min(self._replayed[key], len(interactions) - 1)
+            self._replayed[key] += 1
+            return interactions[index]
+
+    def _recorded_chunks(self, key: str, request: dict[str, Any], chunks: Iterator[Any]) -> Iterator[Any]:
+        recorded = []
+        for chunk in chunks:
+            recorded.append(chunk.model_dump(mode="json"))
+            yield chunk
+        self._record(key, request, chunks=recorded)
+
+    async def _arecorded_chunks(
+        self, key: str, request: dict[str, Any], chunks: AsyncIterator[Any]
+    ) -> AsyncIterator[Any]:
+        recorded = []
+        async for chunk in chunks:
+            recorded.append(chunk.model_dump(mode="json"))
+            yield chunk
+        self._record(key, request, chunks=recorded)
+
+    @staticmethod
+    async def _areplayed_chunks(chunks: list[ChatCompletionChunk]) -> AsyncIterator[ChatCompletionChunk]:
+        for chunk in chunks:
+            yield chunk
+
+    def _replayed_response(self, key: str) -> ChatCompletion | list[ChatCompletionChunk]:
+        interaction = self._replay(key)
+        if "chunks" in interaction:
+            return [ChatCompletionChunk.model_validate(chunk) for chunk in interaction["chunks"]]
+        return ChatCompletion.model_validate(interaction["response"])
+
+    def wrap(self, completion: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a sync or async completion function, e.g. `any_llm.acompletion`, to record or replay its calls."""
+        if inspect.iscoroutinefunction(completion):
+
+            @functools.wraps(completion)
+            async def async_wrapper(**params):
+                request = normalize_request(params)
+                key = canonical_hash(request)
+                if self.mode == "replay":
+                    response = self._replayed_response(key)
+                    if isinstance(response, list):
+                        return self._areplayed_chunks(response)
+                    return response
+
+                response = await completion(**params)
+                if params.get("stream"):
+                    return self._arecorded_chunks(key, request, response)
+                self._record(key, request, response=response.model_dump(mode="json"))
+                return response
+
+            return async_wrapper
+
+        @functools.wraps(completion)
+        def wrapper(**params):
+            request = normalize_request(params)
+            key = canonical_hash(request)
+            if self.mode == "replay":
+                response = self._replayed_response(key)
+                return iter(response) if isinstance(response, list) else response
+
+            response = completion(**params)
+            if params.get("stream"):
+                return self._recorded_chunks(key, request, response)
+            self._record(key, request, response=response.model_dump(mode="json"))
+            return response
+
+        return wrapper
+
+
+_installed: dict[tuple[str, str], Callable[..., Any]] = {}
+
+
+def install_cassette(path: Path, mode: str = "replay") -> LLMCassette:
+    """Route the completion calls of the factory agent and of its routed subtasks through a cassette.
+
+    Any previously installed cassette is replaced.
+    """
+    cassette = LLMCassette(path, mode)
+    uninstall_cassette()
+    for module_name, attribute in PATCHED_COMPLETIONS:
+        module = importlib.import_module(module_name)
+        _installed[module_name, attribute] = getattr(module, attribute)
+        setattr(module, attribute, cassette.wrap(_installed[module_name, attribute]))
+    logger.info(f"LLM calls are {'recorded to' if mode == 'record' else 'replayed from'} the cassette {path}")
+    return cassette
+
+
+def uninstall_cassette() -> None:
+    """Restore the completion functions replaced by `install_cassette`."""
+    for (module_name, attribute), completion in _installed.items():
+        setattr(importlib.import_module(module_name), attribute, completion)
+    _installed.clear()
+
+
+def install_configured_cassette() -> LLMCassette | None:
+    """Install the cassette configured by `LLM_CASSETTE_PATH` and `LLM_CASSETTE_MODE`, if any and not yet installed."""
+    if LLM_CASSETTE_PATH is None or _installed:
+        return None
+    return install_cassette(LLM_CASSETTE_PATH, LLM_CASSETTE_MODE)
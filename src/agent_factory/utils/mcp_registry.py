@@ -0,0 +1,238 @@
+"""Access to the metadata of the MCP servers available in the mcpd registry."""
+
+import asyncio
+import copy
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any
+
+import fire
+
+from agent_factory.config import MCP_REGISTRY_SNAPSHOT_PATH, MCP_REGISTRY_TTL
+from agent_factory.utils.artifact_cache import canonical_hash
+from agent_factory.utils.logging import logger
+from agent_factory.utils.mcp_registry_index import RegistryIndex
+from agent_factory.utils.mcp_registry_snapshot import read_registry_snapshot, write_registry_snapshot
+from agent_factory.utils.mcpd_utils import BINARY_NAME_MCPD, run_binary_async
+
+REGISTRY_WILDCARD = "*"
+
+
+async def fetch_registry_servers_async() -> list[dict[str, Any]]:
+    """Fetch the metadata of every MCP server in the registry with a single `mcpd search` call.
+
+    The call shares the bound on the concurrent mcpd runs of the event loop, and mcpd is killed if it is cancelled.
+
+    Returns:
+        The list of server records, as returned by mcpd (including tool input schemas, arguments and installations).
+    """
+    output = await run_binary_async(BINARY_NAME_MCPD, ["search", REGISTRY_WILDCARD, "--format=json"])
+    return output.get("results") or []
+
+
+def fetch_registry_servers() -> list[dict[str, Any]]:
+    """Fetch the registry like `fetch_registry_servers_async`, from outside of an event loop.
+
+    Used by the background refreshes and the snapshot builds, which run in their own thread or process.
+    """
+    return asyncio.run(fetch_registry_servers_async())
+
+
+def build_registry_index() -> RegistryIndex:
+    """Fetch the registry, persist it as a snapshot and build the search index over its servers."""
+    return _index_registry_servers(fetch_registry_servers())
+
+
+def _index_registry_servers(registry_servers: list[dict[str, Any]]) -> RegistryIndex:
+    """Persist the fetched `registry_servers` as a snapshot and build the search index over them."""
+    try:
+        snapshot = write_registry_snapshot(registry_servers, MCP_REGISTRY_SNAPSHOT_PATH)
+        version = snapshot.registry_version
+    except OSError as e:
+        logger.warning(f"Failed to write the MCP registry snapshot {MCP_REGISTRY_SNAPSHOT_PATH}: {e}")
+        version = canonical_hash(registry_servers)
+
+    index = RegistryIndex(registry_servers, version=version)
+    logger.info(f"Loaded metadata for {len(index)} MCP servers from the registry")
+    return index
+
+
+def build_registry_snapshot(snapshot_path: str | None = None) -> None:
+    """Fetch the registry and write it as a snapshot, e.g. at image build time.
+
+    Args:
+        snapshot_path: Where to write the snapshot. Defaults to `MCP_REGISTRY_SNAPSHOT_PATH`.
+    """
+    snapshot_path = Path(snapshot_path) if snapshot_path else MCP_REGISTRY_SNAPSHOT_PATH
+    snapshot = write_registry_snapshot(fetch_registry_servers(), snapshot_path)
+    logger.info(f"Wrote a snapshot of {len(snapshot.servers)} MCP servers to {snapshot_path}")
+
+
+def _read_registry_index() -> tuple[RegistryIndex, float] | None:
+    """Load the registry index from the snapshot, if there is a valid one.
+
+    Returns:
+        The index and its age in seconds, or `None` if the registry has to be fetched.
+    """
+    try:
+        snapshot = read_registry_snapshot(MCP_REGISTRY_SNAPSHOT_PATH)
+    except FileNotFoundError:
+        logger.info(f"No MCP registry snapshot at {MCP_REGISTRY_SNAPSHOT_PATH}, fetching the registry")
+    except ValueError as e:
+        logger.warning(f"Ignoring the MCP registry snapshot at {MCP_REGISTRY_SNAPSHOT_PATH}: {e}")
+    else:
+        index = RegistryIndex(snapshot.servers, version=snapshot.registry_version)
+        logger.info(f"Loaded metadata for {len(index)} MCP servers from the snapshot at {MCP_REGISTRY_SNAPSHOT_PATH}")
+        return index, snapshot.age
+    return None
+
+
+class _RegistryState:
+    """The registry index shared by the process, with the time it was loaded and the background refresh state."""
+
+    def __init__(self):
+        self.index: RegistryIndex | None = None
+        self.loaded_at = 0.0
+        self.lock = threading.Lock()
+        self.refresh_thread: threading.Thread | None = None
+        # The first load of the index, which runs outside of the lock and is awaited by the concurrent callers.
+        self.loading: Future[RegistryIndex] | None = None
+
+
+_state = _RegistryState()
+
+
+def _refresh_in_background() -> None:
+    try:
+        index = build_registry_index()
+    except Exception as e:
+        # Keep serving the stale index, the refresh is attempted again on the next access.
+        logger.warning(f"Failed to refresh the MCP registry index: {e}")
+        with _state.lock:
+            _state.loaded_at = time.monotonic()
+        return
+    with _state.lock:
+        _state.index, _state.loaded_at = index, time.monotonic()
+
+
+def _claim_registry_index(ttl: float) -> tuple[RegistryIndex | Future[RegistryIndex], bool]:
+    """Return the loaded index, refreshing it in the background if it is older than `ttl` seconds.
+
+    If it is not loaded yet, return the future of its first load instead. The flag is `True` when the caller started
+    that load, and is then the one to load the index and publish it.
+    """
+    with _state.lock:
+        index = _state.index
+        if index is not None:
+            is_stale = time.monotonic() - _state.loaded_at > ttl
+            refreshing = _state.refresh_thread is not None and _state.refresh_thread.is_alive()
+            if is_stale and not refreshing:
+                _state.refresh_thread = threading.Thread(
+                    target=_refresh_in_background, name="mcp-registry-refresh", daemon=True
+                )
+                _state.refresh_thread.start()
+            return index, False
+
+        if _state.loading is not None:
+            return _state.loading, False
+        _state.loading = Future()
+        _state.loading.set_running_or_notify_cancel()
+        return _state.loading, True
+
+
+def _publish_registry_index(loading: Future[RegistryIndex], index: RegistryIndex, age: float) -> None:
+    with _state.lock:
+        _state.index, _state.loaded_at = index, time.monotonic() - age
+        _state.loading = None
+    loading.set_result(index)
+
+
+def _fail_registry_index(loading: Future[RegistryIndex], error: BaseException) -> None:
+    with _state.lock:
+        _state.loading = None
+    if not isinstance(error, Exception):
+        error = RuntimeError("The MCP registry load was cancelled")
+    loading.set_exception(error)
+
+
+def get_registry_index(ttl: float = MCP_REGISTRY_TTL) -> RegistryIndex:
+    """Return the registry index, loading it on first access.
+
+    The index is loaded from the registry snapshot when there is one, so that only the very first access without a
+    snapshot waits for the registry to be fetched. Concurrent first accesses share a single load, which runs without
+    holding the lock of the index. Once the index is older than `ttl` seconds, it is rebuilt in a background thread
+    while the current one keeps being served.
+    """
+    loading, is_loader = _claim_registry_index(ttl)
+    if isinstance(loading, RegistryIndex):
+        return loading
+    if not is_loader:
+        return loading.result()
+
+    try:
+        index, age = _read_registry_index() or (build_registry_index(), 0.0)
+    except BaseException as e:
+        _fail_registry_index(loading, e)
+        raise
+    _publish_registry_index(loading, index, age)
+    return index
+
+
+async def get_registry_index_async(ttl: float = MCP_REGISTRY_TTL) -> RegistryIndex:
+    """Return the registry index like `get_registry_index`, without blocking the event loop.
+
+    When this call is the one loading the index, the registry is fetched in the event loop with
+    `fetch_registry_servers_async`, so that mcpd is killed if the call is cancelled.
+    """
+    loading, is_loader = _claim_registry_index(ttl)
+    if isinstance(loading, RegistryIndex):
+        return loading
+    if not is_loader:
+        return await asyncio.wrap_future(loading)
+
+    try:
+        loaded = await asyncio.to_thread(_read_registry_index)
+        if loaded is None:
+            registry_servers = await fetch_registry_servers_async()
+            loaded = await asyncio.to_thread(_index_registry_servers, registry_servers), 0.0
+    except BaseException as e:
+        _fail_registry_index(loading, e)
+        raise
+    _publish_registry_index(loading, *loaded)
+    return loaded[0]
+
+
+def registry_index_loaded() -> bool:
+    """Return `True` if the registry index is already loaded, i.e. `get_registry_index` will not block."""
+    return _state.index is not None
+
+
+def get_registry_server(name: str) -> dict[str, Any]:
+    """Return the registry record of the MCP server called `name`.
+
+    The registry is fetched once per process and cached, a copy of the record is returned so callers can modify it.
+
+    Raises:
+        KeyError: If no server called `name` exists in the registry.
+    """
+    servers = get_registry_index().servers_by_name
+    if name not in servers:
+        raise KeyError(f"MCP server '{name}' not found in the registry")
+    return copy.deepcopy(servers[name])
+
+
+def registry_version() -> str:
+    """Return a hash of the cached registry metadata, which changes whenever the registry content changes."""
+    return get_registry_index().version
+
+
+def clear_registry_cache() -> None:
+    """Drop the cached registry metadata, so it is fetched again on next access."""
+    with _state.lock:
+        _state.index, _state.loaded_at = None, 0.0
+
+
+if __name__ == "__main__":
+    fire.Fire(build_registry_snapshot)
@@ -0,0 +1,178 @@
+"""In-memory full-text index over the MCP servers in the mcpd registry."""
+
+import math
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Any
+
+WILDCARD = "*"
+
+# BM25 parameters, using the usual defaults.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Split `text` into lowercase alphanumeric terms, e.g. "Google-Calendar MCP" -> ["google", "calendar", "mcp"]."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _indexed_text(server: dict[str, Any]) -> str:
+    return " ".join(
+        [
+            server.get("name", ""),
+            server.get("displayName", ""),
+            server.get("description", ""),
+            *(tool["name"] for tool in server.get("tools") or []),
+            *(server.get("categories") or []),
+            *(server.get("tags") or []),
+        ]
+    )
+
+
+def _bitset(doc_ids: list[int]) -> int:
+    bits = 0
+    for doc_id in doc_ids:
+        bits |= 1 << doc_id
+    return bits
+
+
+class RegistryIndex:
+    """Inverted index over the name, description, tool names, categories and tags of the registry servers.
+
+    Keyphrase matches are ranked with BM25. The license, category, tag and official filters are precomputed as
+    bitsets (one bit per server), so filtering a search only takes a few integer operations.
+
+    Args:
+        servers: The server records, as returned by `mcpd search`.
+        version: Identifier of the registry content the index was built from.
+    """
+
+    def __init__(self, servers: list[dict[str, Any]], version: str = ""):
+        self.servers = servers
+        self.version = version
+        self.servers_by_name = {server["name"]: server for server in servers}
+        self.all_servers = (1 << len(servers)) - 1
+
+        self._postings: dict[str, dict[int, int]] = defaultdict(dict)
+        self._doc_lengths: list[int] = []
+        for doc_id, server in enumerate(servers):
+            terms = tokenize(_indexed_text(server))
+            self._doc_lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self._postings[term][doc_id] = frequency
+        self._vocabulary = sorted(self._postings)
+        self._average_doc_length = sum(self._doc_lengths) / len(servers) if servers else 0.0
+
+        self._official = _bitset([doc_id for doc_id, server in enumerate(servers) if server.get("isOfficial")])
+        self._licenses = self._value_bitsets(lambda server: [server.get("license") or ""])
+        self._categories = self._value_bitsets(lambda server: server.get("categories") or [])
+        self._tags = self._value_bitsets(lambda server: server.get("tags") or [])
+
+    def __len__(self) -> int:
+        """Number of indexed servers."""
+        return len(self.servers)
+
+    def _value_bitsets(self, get_values) -> dict[str, int]:
+        doc_ids_by_value: dict[str, list[int]] = defaultdict(list)
+        for doc_id, server in enumerate(self.servers):
+            for value in get_values(server):
+                doc_ids_by_value[value.lower()].append(doc_id)
+        return {value: _bitset(doc_ids) for value, doc_ids in doc_ids_by_value.items()}
+
+    @staticmethod
+    def _partial_match(bitsets: dict[str, int], substring: str) -> int:
+        substring = substring.lower()
+        bits = 0
+        for value, value_bits in bitsets.items():
+            if substring in value:
+                bits |= value_bits
+        return bits
+
+    def filter_mask(
+        self,
+        license: str | None = None,
+        categories: list[str] | None = None,
+        tags: list[str] | None = None,
+        is_official: bool = False,
+    ) -> int:
+        """Return the bitset of the servers matching all the given filters (see `search`)."""
+        mask = self.all_servers
+        if license:
+            mask &= self._partial_match(self._licenses, license)
+        for category in categories or []:
+            mask &= self._partial_match(self._categories, category)
+        for tag in tags or []:
+            mask &= self._partial_match(self._tags, tag)
+        if is_official:
+            mask &= self._official
+        return mask
+
+    def _expand(self, term: str) -> list[str]:
+        """Return the indexed terms starting with `term` (so that e.g. "calend" matches "calendar")."""
+        start = bisect_left(self._vocabulary, term)
+        end = start
+        while end < len(self._vocabulary) and self._vocabulary[end].startswith(term):
+            end += 1
+        return self._vocabulary[start:end]
+
+    def _scores(self, keyphrase: str) -> dict[int, float]:
+        """BM25 scores of the servers matching every term of `keyphrase`."""
+        scores: dict[int, float] = {}
+        for position, term in enumerate(tokenize(keyphrase)):
+            term_scores: dict[int, float] = defaultdict(float)
+            for indexed_term in self._expand(term):
+                postings = self._postings[indexed_term]
+                idf = math.log(1 + (len(self.servers) - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    length_norm = 1 - BM25_B + BM25_B * self._doc_lengths[doc_id] / self._average_doc_length
+                    term_scores[doc_id] += idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+            if position == 0:
+                scores = dict(term_scores)
+            else:
+                scores = {
+                    doc_id: score + term_scores[doc_id] for doc_id, score in scores.items() if doc_id in term_scores
+                }
+            if not scores:
+                break
+        return scores
+
+    def search(
+        self,
+        keyphrase: str,
+        license: str | None = None,
+        categories: list[str] | None = None,
+        tags: list[str] | None = None,
+        is_official: bool = False,
+        min_relative_score: float = 0.0,
+    ) -> list[dict[str, Any]]:
+        """Return the servers matching every term of `keyphrase` and all the filters, best matches first.
+
+        Args:
+            keyphrase: The terms to search for, or "*" to match every server (in registry order).
+            license: Optional full or partial match of the server license.
+            categories: Optional substrings that must each match one of the server categories.
+            tags: Optional substrings that must each match one of the server tags.
+            is_official: If `True`, only official servers are returned.
+            min_relative_score: Relevance cutoff, servers scoring less than this fraction of the best match are left
+                out. Ignored for the wildcard.
+
+        Returns:
+            The matching server records. They are shared with the index, so callers must copy them before modifying.
+        """
+        mask = self.filter_mask(license=license, categories=categories, tags=tags, is_official=is_official)
+        if keyphrase.strip() == WILDCARD:
+            return [server for doc_id, server in enumerate(self.servers) if mask >> doc_id & 1]
+
+        scores = {doc_id: score for doc_id, score in self._scores(keyphrase).items() if mask >> doc_id & 1}
+        if scores and min_relative_score > 0:
+            cutoff = min_relative_score * max(scores.values())
+            scores = {doc_id: score for doc_id, score in scores.items() if score >= cutoff}
+        ranked = sorted(
+            scores,
+            key=lambda doc_id: (-scores[doc_id], self.servers[doc_id]["name"]),
+        )
+        return [self.servers[doc_id] for doc_id in ranked]
@@ -0,0 +1,72 @@
+"""Versioned on-disk snapshot of the MCP servers in the mcpd registry."""
+
+import json
+import mmap
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from agent_factory.utils.artifact_cache import canonical_hash
+
+# Bumped whenever the layout of the snapshot changes, snapshots with another version are ignored.
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+class RegistrySnapshot(NamedTuple):
+    """The registry server records, with the hash of their content and the time (epoch seconds) they were fetched."""
+
+    servers: list[dict[str, Any]]
+    registry_version: str
+    created_at: float
+
+    @property
+    def age(self) -> float:
+        """Seconds elapsed since the registry was fetched."""
+        return max(0.0, time.time() - self.created_at)
+
+
+def write_registry_snapshot(servers: list[dict[str, Any]], snapshot_path: Path) -> RegistrySnapshot:
+    """Write a snapshot of the registry server records, atomically replacing any previous snapshot.
+
+    Raises:
+        OSError: If the snapshot cannot be written.
+    """
+    snapshot = RegistrySnapshot(servers, canonical_hash(servers), time.time())
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=snapshot_path.parent, suffix=".tmp", delete=False
+    ) as tmp_file:
+        json.dump(
+            {
+                "format_version": SNAPSHOT_FORMAT_VERSION,
+                "registry_version": snapshot.registry_version,
+                "created_at": snapshot.created_at,
+                "servers": snapshot.servers,
+            },
+            tmp_file,
+            separators=(",", ":"),
+        )
+    Path(tmp_file.name).replace(snapshot_path)
+    return snapshot
+
+
+def read_registry_snapshot(snapshot_path: Path) -> RegistrySnapshot:
+    """Read a snapshot written by `write_registry_snapshot`, mapping the file in memory to load it in a single read.
+
+    Raises:
+        FileNotFoundError: If there is no snapshot.
+        ValueError: If the snapshot is invalid, or was written with another format version.
+    """
+    with snapshot_path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        data = json.loads(mapped[:])
+
+    format_version = data.get("format_version") if isinstance(data, dict) else None
+    if format_version != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported MCP registry snapshot format {format_version}, expected {SNAPSHOT_FORMAT_VERSION}"
+        )
+    try:
+        return RegistrySnapshot(data["servers"], data["registry_version"], data["created_at"])
+    except KeyError as e:
+        raise ValueError(f"Invalid MCP registry snapshot, missing {e}") from e
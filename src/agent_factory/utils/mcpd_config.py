@@ -0,0 +1,300 @@
+"""In-process generation of the mcpd configuration files, equivalent to `mcpd init`, `mcpd add` and
+`mcpd config export`, but driven by the (cached) registry metadata instead of a chain of subprocesses.
+"""
+
+import json
+import re
+import tomllib
+from collections.abc import Callable
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from agent_factory.utils.mcp_registry import get_registry_server, registry_version
+
+# Runtimes supported by mcpd, in order of preference when a server has no recommended installation.
+RUNTIME_PREFERENCE = ("uvx", "npx")
+
+# Maps the argument types declared in the registry to the corresponding `.mcpd.toml` server fields.
+REQUIRED_ARGUMENT_FIELDS = {
+    "environment": "required_env",
+    "argument_positional": "required_args_positional",
+    "argument": "required_args",
+    "argument_bool": "required_args_bool",
+}
+
+# The fields of the `.mcpd.toml` server entries, see `build_server_entry`.
+SERVER_ENTRY_FIELDS = frozenset({"name", "package", "tools", *REQUIRED_ARGUMENT_FIELDS.values()})
+
+MAX_CACHED_SERVER_FRAGMENTS = 256
+
+CONFIG_FILE_NAME = ".mcpd.toml"
+CONTRACT_FILE_NAME = ".env"
+CONTEXT_FILE_NAME = "secrets.prod.toml"
+
+_BARE_TOML_KEY = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def _toml_key(key: str) -> str:
+    return key if _BARE_TOML_KEY.match(key) else json.dumps(key)
+
+
+def _toml_string(value: str) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _toml_string_array(values: list[str]) -> str:
+    return "[" + ", ".join(_toml_string(value) for value in values) + "]"
+
+
+def _placeholder_name(server_name: str, argument_name: str) -> str:
+    """Name of the environment variable mcpd uses to source the value of a server argument.
+
+    e.g. ("sqlite", "--db-path") -> "MCPD__SQLITE__DB_PATH"
+    """
+
+    def normalize(name: str) -> str:
+        return re.sub(r"[^A-Z0-9]", "_", name.lstrip("-").upper())
+
+    return f"MCPD__{normalize(server_name)}__{normalize(argument_name)}"
+
+
+def select_installation(server: dict[str, Any]) -> dict[str, Any]:
+    """Pick the installation of a server that mcpd would use: the recommended one, or the first supported runtime.
+
+    Raises:
+        ValueError: If the server cannot be installed with any of the supported runtimes.
+    """
+    installations = {
+        runtime: installation
+        for runtime, installation in (server.get("installations") or {}).items()
+        if runtime in RUNTIME_PREFERENCE and not installation.get("deprecated", False)
+    }
+    if not installations:
+        raise ValueError(f"MCP server '{server['name']}' has no installation for runtimes {RUNTIME_PREFERENCE}")
+
+    for installation in installations.values():
+        if installation.get("recommended"):
+            return installation
+    return next(installations[runtime] for runtime in RUNTIME_PREFERENCE if runtime in installations)
+
+
+def build_server_entry(server: dict[str, Any], tools: list[str] | None = None, version: str | None = None) -> dict:
+    """Build the `.mcpd.toml` entry for a server, as `mcpd add` would.
+
+    Args:
+        server: The registry record of the server.
+        tools: Optional subset of the server tools to allow. If none are supplied, all the server tools are allowed.
+        version: Optional version to pin for the server. Defaults to the registry version, or `latest`.
+
+    Raises:
+        ValueError: If any of the requested tools is not provided by the server.
+    """
+    available_tools = [tool["name"] for tool in server.get("tools", [])]
+    if tools:
+        unknown_tools = [tool for tool in tools if tool not in available_tools]
+        if unknown_tools:
+            raise ValueError(f"MCP server '{server['name']}' does not provide the tools {unknown_tools}")
+        tools = list(dict.fromkeys(tools))
+    else:
+        tools = available_tools
+
+    installation = select_installation(server)
+    version = version or installation.get("version") or "latest"
+    entry: dict[str, Any] = {
+        "name": server["name"],
+        "package": f"{installation['runtime']}::{installation['package']}@{version}",
+        "tools": tools,
+    }
+
+    # Positional arguments keep their declared order, the others are sorted by name (mcpd order is not stable).
+    required_arguments = sorted(
+        (argument for argument in (server.get("arguments") or {}).values() if argument.get("required")),
+        key=lambda argument: (argument.get("position", 0), argument["name"]),
+    )
+    for argument_type, field in REQUIRED_ARGUMENT_FIELDS.items():
+        names = [argument["name"] for argument in required_arguments if argument.get("type") == argument_type]
+        if names:
+            entry[field] = names
+
+    return entry
+
+
+class ServerConfigFragment(NamedTuple):
+    """The parts of the mcpd configuration files contributed by a single server."""
+
+    name: str
+    mcpd_toml: str
+    env_placeholders: tuple[str, ...]
+    secrets_context: str
+
+
+def render_server_fragment(entry: dict[str, Any]) -> ServerConfigFragment:
+    """Render the configuration fragments of a server entry (see `build_server_entry`)."""
+    server_name = entry["name"]
+
+    lines = ["[[servers]]", f"  name = {_toml_string(server_name)}", f"  package = {_toml_string(entry['package'])}"]
+    for field in ("tools", *REQUIRED_ARGUMENT_FIELDS.values()):
+        if entry.get(field):
+            lines.append(f"  {field} = {_toml_string_array(entry[field])}")
+    mcpd_toml = "\n".join(lines)
+
+    env_placeholders = tuple(
+        _placeholder_name(server_name, name)
+        for field in REQUIRED_ARGUMENT_FIELDS.values()
+        for name in entry.get(field, [])
+    )
+
+    server_key = f"servers.{_toml_key(server_name)}"
+    args = [f"${{{_placeholder_name(server_name, name)}}}" for name in entry.get("required_args_positional", [])]
+    args += [
+        f"{name}=${{{_placeholder_name(server_name, name)}}}"
+        for field in ("required_args", "required_args_bool")
+        for name in entry.get(field, [])
+    ]
+    env = {name: f"${{{_placeholder_name(server_name, name)}}}" for name in entry.get("required_env", [])}
+    lines = [f"  [{server_key}]"]
+    if args:
+        lines.append(f"    args = {_toml_string_array(args)}")
+    if env:
+        lines.append(f"    [{server_key}.env]")
+        lines.extend(f"      {_toml_key(name)} = {_toml_string(value)}" for name, value in sorted(env.items()))
+    secrets_context = "\n".join(lines)
+
+    return ServerConfigFragment(server_name, mcpd_toml, env_placeholders, secrets_context)
+
+
+@lru_cache(maxsize=MAX_CACHED_SERVER_FRAGMENTS)
+def _cached_server_fragment(
+    name: str, version: str | None, tools: tuple[str, ...], registry_version_token: str
+) -> ServerConfigFragment:
+    # `registry_version_token` is only part of the key, so fragments are re-rendered when the registry changes.
+    return render_server_fragment(build_server_entry(get_registry_server(name), tools=list(tools), version=version))
+
+
+def get_server_fragment(
+    name: str,
+    tools: list[str] | None = None,
+    version: str | None = None,
+    get_server: Callable[[str], dict[str, Any]] | None = None,
+) -> ServerConfigFragment:
+    """Return the configuration fragments of a server, as registered with the given tools and version.
+
+    Fragments built from the cached registry metadata are cached themselves, keyed by server name, version and
+    (sorted) tools, and invalidated when the registry metadata changes.
+
+    Args:
+        name: The name of the server in the registry.
+        tools: Optional subset of the server tools to allow. If none are supplied, all the server tools are allowed.
+        version: Optional version to pin for the server.
+        get_server: Optional function returning the registry record of a server given its name. When supplied, the
+            fragments are not cached.
+    """
+    sorted_tools = tuple(sorted(set(tools or [])))
+    if get_server is not None:
+        return render_server_fragment(build_server_entry(get_server(name), tools=list(sorted_tools), version=version))
+    return _cached_server_fragment(name, version, sorted_tools, registry_version())
+
+
+def compose_mcpd_config_artifacts(fragments: list[ServerConfigFragment]) -> dict[str, str]:
+    """Compose the per-server fragments into the `.mcpd.toml`, `.env` and `secrets.prod.toml` file contents."""
+    env_placeholders = sorted(placeholder for fragment in fragments for placeholder in fragment.env_placeholders)
+    secrets_blocks = [fragment.secrets_context for fragment in sorted(fragments, key=lambda fragment: fragment.name)]
+    return {
+        CONFIG_FILE_NAME: "\n\n".join(fragment.mcpd_toml for fragment in fragments) + "\n",
+        CONTRACT_FILE_NAME: "".join(f"{placeholder}=${{{placeholder}}}\n" for placeholder in env_placeholders),
+        CONTEXT_FILE_NAME: "\n".join(["[servers]", *secrets_blocks]) + "\n",
+    }
+
+
+def generate_mcpd_config_artifacts(
+    mcp_servers: list[dict[str, Any]],
+    get_server: Callable[[str], dict[str, Any]] | None = None,
+) -> dict[str, str]:
+    """Generate the mcpd configuration artifacts for the given servers without running the mcpd binary.
+
+    Args:
+        mcp_servers: The MCP servers required by the generated agent, each a dictionary with the server `name` and,
+            optionally, the `tools` and `version` to pin.
+        get_server: Function returning the registry record of a server given its name. Defaults to a lookup in the
+            cached registry metadata.
+
+    Returns:
+        Dictionary with the `.mcpd.toml`, `.env` and `secrets.prod.toml` file contents.
+
+    Raises:
+        KeyError: If a server is not found in the registry.
+        ValueError: If a server cannot be configured as requested.
+    """
+    fragments = [
+        get_server_fragment(server["name"], server.get("tools"), server.get("version"), get_server=get_server)
+        for server in mcp_servers
+    ]
+    return compose_mcpd_config_artifacts(fragments)
+
+
+def _read_config_entries(config_path: Path) -> list[dict[str, Any]]:
+    """Read the server entries of an existing mcpd config file, none if there is no such file.
+
+    Raises:
+        ValueError: If the file is not valid TOML, or has settings that the entries rendered by
+            `render_server_fragment` would not keep.
+    """
+    if not config_path.exists():
+        return []
+    try:
+        config = tomllib.loads(config_path.read_text(encoding="utf-8"))
+    except tomllib.TOMLDecodeError as e:
+        raise ValueError(f"Invalid mcpd config file {config_path}: {e}") from e
+
+    entries = config.pop("servers", [])
+    unknown_settings = set(config) | {key for entry in entries for key in entry.keys() - SERVER_ENTRY_FIELDS}
+    if unknown_settings:
+        raise ValueError(
+            f"Cannot merge the servers into {config_path}, unsupported settings {sorted(unknown_settings)}"
+        )
+    return entries
+
+
+def register_mcp_servers(
+    mcp_servers: list[dict[str, Any]],
+    config_path: Path,
+    get_server: Callable[[str], dict[str, Any]] | None = None,
+) -> None:
+    """Register several MCP servers at once, writing the mcpd config file in a single step.
+
+    This is the batch, in-process, counterpart of calling `register_mcp_server` for each server: no mcpd process is
+    launched, whatever the number of servers. Like `mcpd add`, the servers are added to those already in the config
+    file, if there is one, e.g. after `initialize_mcp_config`.
+
+    Example:
+        ```python
+        register_mcp_servers(
+            [{"name": "github", "tools": ["get_pull_request_status"]}, {"name": "slack"}],
+            config_path=Path("/tmp/.mcpd.toml"),
+        )
+        ```
+
+    Args:
+        mcp_servers: The MCP servers to register, each a dictionary with the server `name` and, optionally, the
+            `tools` and `version` to pin.
+        config_path: Path to the configuration file to write.
+        get_server: Optional function returning the registry record of a server given its name.
+
+    Raises:
+        KeyError: If a server is not found in the registry.
+        ValueError: If a server cannot be configured as requested or is already registered, or if the existing config
+            file cannot be merged with.
+    """
+    entries = _read_config_entries(config_path)
+    registered = {entry["name"] for entry in entries}
+    for server in mcp_servers:
+        if server["name"] in registered:
+            raise ValueError(f"MCP server '{server['name']}' is already registered in {config_path}")
+
+    fragments = [render_server_fragment(entry) for entry in entries]
+    fragments += [
+        get_server_fragment(server["name"], server.get("tools"), server.get("version"), get_server=get_server)
+        for server in mcp_servers
+    ]
+    config_path.write_text(compose_mcpd_config_artifacts(fragments)[CONFIG_FILE_NAME], encoding="utf-8")
@@ -1,6 +1,8 @@
+import asyncio
 import json
 import subprocess
 import tempfile
+import weakref
 from contextlib import nullcontext
 from pathlib import Path
 from typing import Any
@@ -9,8 +11,17 @@ from agent_factory.utils.logging import logger
 
 BINARY_NAME_MCPD = "mcpd"
 
+DEFAULT_BINARY_TIMEOUT = 60.0
+MAX_CONCURRENT_BINARY_RUNS = 4
 
-def run_binary(path: str, args: list[str], ignore_response: bool = False) -> dict:
+_binary_semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def run_binary(
+    path: str, args: list[str], ignore_response: bool = False, timeout: float | None = DEFAULT_BINARY_TIMEOUT
+) -> dict:
     """Run a compiled binary and parse its JSON output from STDOUT.
 
     Uses subprocess to execute the specified binary with arguments.
@@ -20,16 +31,17 @@ def run_binary(path: str, args: list[str], ignore_response: bool = False) -> dic
         path: Path to the executable binary.
         args: List of arguments to pass to the binary.
         ignore_response: If `True`, STDOUT response is ignored and an empty response is returned.
+        timeout: Maximum number of seconds the binary is allowed to run for, `None` to wait indefinitely.
 
     Returns:
         Parsed JSON output as a Python dictionary.
 
     Raises:
-        RuntimeError: If the subprocess fails (e.g., non-zero exit code).
+        RuntimeError: If the subprocess fails (e.g., non-zero exit code) or times out.
         ValueError: If the STDOUT response cannot be parsed as valid JSON when response is not being ignored.
     """
     try:
-        result = subprocess.run([path, *args], capture_output=True, text=True, check=True)
+        result = subprocess.run([path, *args], capture_output=True, text=True, check=True, timeout=timeout)
         if ignore_response:
             logger.info(f"Ignoring binary ({path}) STDOUT response, return code: {result.returncode}")
             return {"return_code": result.returncode}
@@ -38,6 +50,9 @@ def run_binary(path: str, args: list[str], ignore_response: bool = False) -> dic
         logger.error(f"Command '{e.cmd}' failed with code {e.returncode}")
         logger.error(f"Stderr: {e.stderr}")
         raise RuntimeError("Subprocess failed") from e
+    except subprocess.TimeoutExpired as e:
+        logger.error(f"Command '{e.cmd}' timed out after {timeout} seconds")
+        raise RuntimeError(f"Binary timed out: {path}") from e
     except json.JSONDecodeError as e:
         logger.error("Failed to parse JSON from subprocess output")
         logger.error(f"Output was: {result.stdout.strip()}")
@@ -50,6 +65,79 @@ def run_binary(path: str, args: list[str], ignore_response: bool = False) -> dic
         raise RuntimeError("An unexpected error occurred during binary execution") from e
 
 
+def _get_binary_semaphore() -> asyncio.Semaphore:
+    """Return the semaphore bounding the concurrent binary executions in the running event loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in _binary_semaphores:
+        _binary_semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENT_BINARY_RUNS)
+    return _binary_semaphores[loop]
+
+
+async def run_binary_async(
+    path: str, args: list[str], ignore_response: bool = False, timeout: float | None = DEFAULT_BINARY_TIMEOUT
+) -> dict:
+    """Asynchronously run a compiled binary and parse its JSON output from STDOUT.
+
+    Unlike `run_binary`, the event loop is not blocked while the binary runs. At most `MAX_CONCURRENT_BINARY_RUNS`
+    binaries run at the same time (per event loop), further calls wait for a slot. If the call is cancelled, or the
+    timeout expires, the binary is killed.
+
+    Args:
+        path: Path to the executable binary.
+        args: List of arguments to pass to the binary.
+        ignore_response: If `True`, STDOUT response is ignored and an empty response is returned.
+        timeout: Maximum number of seconds the binary is allowed to run for (not counting the time spent waiting for
+            a slot), `None` to wait indefinitely.
+
+    Returns:
+        Parsed JSON output as a Python dictionary.
+
+    Raises:
+        RuntimeError: If the subprocess fails (e.g., non-zero exit code) or times out.
+        ValueError: If the STDOUT response cannot be parsed as valid JSON when response is not being ignored.
+    """
+    async with _get_binary_semaphore():
+        try:
+            process = await asyncio.create_subprocess_exec(
+                path, *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError as e:
+            logger.error(f"Binary not found at path: {path}")
+            raise RuntimeError(f"Binary not found: {path}") from e
+
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except TimeoutError as e:
+            await _kill_process(process)
+            logger.error(f"Command '{[path, *args]}' timed out after {timeout} seconds")
+            raise RuntimeError(f"Binary timed out: {path}") from e
+        except asyncio.CancelledError:
+            await _kill_process(process)
+            raise
+
+    if process.returncode != 0:
+        logger.error(f"Command '{[path, *args]}' failed with code {process.returncode}")
+        logger.error(f"Stderr: {stderr.decode(errors='replace')}")
+        raise RuntimeError("Subprocess failed")
+
+    if ignore_response:
+        logger.info(f"Ignoring binary ({path}) STDOUT response, return code: {process.returncode}")
+        return {"return_code": process.returncode}
+
+    try:
+        return json.loads(stdout)
+    except json.JSONDecodeError as e:
+        logger.error("Failed to parse JSON from subprocess output")
+        logger.error(f"Output was: {stdout.decode(errors='replace').strip()}")
+        raise ValueError("Invalid JSON output") from e
+
+
+async def _kill_process(process: asyncio.subprocess.Process) -> None:
+    if process.returncode is None:
+        process.kill()
+        await process.wait()
+
+
 def initialize_mcp_config(config_path: Path) -> int:
     """Initialize the config file used by mcpd.
 
@@ -136,13 +224,18 @@ def register_mcp_server(
 
 
 def export_mcpd_config_artifacts(
-    agent_factory_outputs: dict[str, Any], output_dir: Path | None = None
+    agent_factory_outputs: dict[str, Any], output_dir: Path | None = None, use_binary: bool = False
 ) -> dict[str, str]:
     """Export mcpd configuration files as sanitized artifacts.
 
-    Initialize an mcpd config file (`.mcpd.toml`) in a temporary directory from the supplied Agent Factory outputs.
-    Parse the contents of the config file to generate portable configuration files that separate the configuration
-    structure from sensitive values, making the generated agent more portable while protecting secrets.
+    Generate an mcpd config file (`.mcpd.toml`) from the supplied Agent Factory outputs, together with portable
+    configuration files that separate the configuration structure from sensitive values, making the generated agent
+    more portable while protecting secrets.
+
+    The files are generated in-process from the cached registry metadata. If that fails (e.g. a server is missing from
+    the registry metadata), or if `use_binary` is `True`, the mcpd binary is used instead: a config file is initialized
+    in a temporary directory, each server is registered with `mcpd add` and the files are exported with
+    `mcpd config export`.
 
     The portable configuration files only handle required variables (not optional ones) for an MCP server.
 
@@ -153,6 +246,7 @@ def export_mcpd_config_artifacts(
         output_dir: Optional path to use as output directory for generated files. If None, a temporary directory will be
             created and automatically cleaned up. If provided, the directory and its contents will be preserved for
             further use (this causes a side effect).
+        use_binary: If `True`, always generate the files with the mcpd binary rather than in-process.
 
     Returns:
         Dictionary with exported configuration artifacts.
@@ -167,12 +261,33 @@ def export_mcpd_config_artifacts(
         When `output_dir` is None, temporary files are cleaned up automatically.
         When `output_dir` is provided, all generated files remain in the specified directory (not recommended).
     """
-    exported_artifacts = {}
-
     mcp_servers: list[dict[str, str | list[str]]] | None = agent_factory_outputs.get("mcp_servers")
     if not mcp_servers:
         logger.warning("Agent Factory output does not contain MCP servers, no related artifacts will be exported.")
-        return exported_artifacts
+        return {}
+
+    if not use_binary:
+        # Imported here as the registry access itself relies on `run_binary_async`.
+        from agent_factory.utils.mcpd_config import generate_mcpd_config_artifacts
+
+        try:
+            exported_artifacts = generate_mcpd_config_artifacts(mcp_servers)  # type: ignore
+        except (KeyError, ValueError, RuntimeError) as e:
+            logger.warning(f"In-process mcpd config generation failed, falling back to the mcpd binary: {e}")
+        else:
+            if output_dir is not None:
+                output_dir.mkdir(parents=True, exist_ok=True)
+                for file_name, content in exported_artifacts.items():
+                    (output_dir / file_name).write_text(content, encoding="utf-8")
+            return exported_artifacts
+
+    return _export_mcpd_config_artifacts_with_binary(mcp_servers, output_dir)
+
+
+def _export_mcpd_config_artifacts_with_binary(
+    mcp_servers: list[dict[str, str | list[str]]], output_dir: Path | None = None
+) -> dict[str, str]:
+    exported_artifacts = {}
 
     # Expected file names.
     config_file_name = ".mcpd.toml"
@@ -0,0 +1,235 @@
+"""Routing of the LLM calls the factory makes besides its agent, each task to its own model.
+
+The factory agent designs the workflows with the model it was started with, while the mechanical subtasks around it
+are routed to a faster and cheaper model: repairing the syntax of the generated code, drafting the README, and
+summarizing long web pages before they enter the context of the agent. The model of each task is configured by
+`FAST_MODEL` and `MODEL_ROUTES`.
+
+Every routed call is recorded as an LLM call span, like those of the agent, with its route, latency and cost.
+"""
+
+import functools
+import inspect
+import json
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from any_agent.callbacks.span_cost import add_cost_info
+from any_agent.tracing.attributes import GenAI
+from any_llm import completion
+from any_llm.types.completion import ChatCompletion
+from opentelemetry import trace
+from opentelemetry.trace import StatusCode
+
+from agent_factory.config import FAST_MODEL, MODEL_ROUTES, WEBPAGE_SUMMARY_MIN_CHARS
+from agent_factory.instructions import README_INSTRUCTIONS
+from agent_factory.utils.logging import logger
+
+# The route of the LLM calls of the factory agent itself, which stay on the model it was started with.
+DESIGN_ROUTE = "design"
+
+# The tasks routed by `ModelRouter`.
+ROUTED_TASKS = ("syntax_repair", "readme", "webpage_summary")
+
+# Span attributes of the LLM calls, of the agent and routed alike.
+ROUTE_ATTRIBUTE = "agent_factory.route"
+ROUTE_LATENCY_ATTRIBUTE = "agent_factory.route.latency_seconds"
+
+WEBPAGE_SUMMARY_PROMPT = """
+The following web page was fetched by an agent writing Python agents with the any-agent library. Summarize it in at
+most a few hundred words, keeping verbatim everything the agent may need to write code with it: the names and
+signatures of functions, classes, tools and parameters, short code examples, environment variables, URLs and version
+numbers. Leave out navigation, advertisements and unrelated content.
+
+URL: {url}
+
+{content}
+"""
+
+README_PROMPT = """
+Write the README of a Python agent, from the outputs it was generated from below. The instructions for the `readme`
+output are:
+
+{readme_instructions}
+
+Return the README only, in Markdown, without wrapping it in a code block.
+
+{outputs}
+"""
+
+# The outputs of the factory the README is written from.
+README_SOURCE_FIELDS = (
+    "agent_description",
+    "agent_instructions",
+    "cli_args",
+    "tools",
+    "mcp_servers",
+    "prompt_template",
+)
+
+tracer = trace.get_tracer(__name__)
+
+# The costs in USD of the routed calls made within `track_routed_costs`.
+_routed_costs: ContextVar[list[float] | None] = ContextVar("routed_costs", default=None)
+
+
+@contextmanager
+def track_routed_costs() -> Iterator[list[float]]:
+    """Collect the cost in USD of the routed completions made in the current context, as a list of costs.
+
+    The threads started with a copy of the context, e.g. by `asyncio.to_thread`, add their costs to the same list.
+    """
+    costs: list[float] = []
+    token = _routed_costs.set(costs)
+    try:
+        yield costs
+    finally:
+        _routed_costs.reset(token)
+
+
+def parse_model_routes(routes: str) -> dict[str, str]:
+    """Parse comma-separated `task=model` pairs, e.g. "readme=openai/gpt-4.1-mini,syntax_repair=openai/gpt-4o-mini".
+
+    Raises:
+        ValueError: If a pair is not of the form `task=model`, or its task is not one of `ROUTED_TASKS`.
+    """
+    parsed = {}
+    for pair in filter(None, (pair.strip() for pair in routes.split(","))):
+        task, separator, model = (part.strip() for part in pair.partition("="))
+        if not separator or not model:
+            raise ValueError(f"Invalid model route '{pair}', expected task=model")
+        if task not in ROUTED_TASKS:
+            raise ValueError(f"Unknown task '{task}' in the model routes, expected one of {ROUTED_TASKS}")
+        parsed[task] = model
+    return parsed
+
+
+class ModelRouter:
+    """Send the completions of each of the `ROUTED_TASKS` to its model.
+
+    Args:
+        default_model: The model of the tasks without a route of their own.
+        routes: The model of each task, by task.
+
+    Raises:
+        ValueError: If a route is for a task that is not one of `ROUTED_TASKS`.
+    """
+
+    def __init__(self, default_model: str = FAST_MODEL, routes: dict[str, str] | None = None):
+        unknown_tasks = set(routes or {}) - set(ROUTED_TASKS)
+        if unknown_tasks:
+            raise ValueError(f"Unknown tasks {sorted(unknown_tasks)} in the model routes, expected {ROUTED_TASKS}")
+        self.default_model = default_model
+        self.routes = dict(routes or {})
+
+    def model(self, task: str) -> str:
+        """Return the model the completions of `task` are sent to."""
+        return self.routes.get(task, self.default_model)
+
+    def completion(self, task: str, messages: list[dict[str, Any]], **kwargs: Any) -> ChatCompletion:
+        """Create a completion of the `messages` with the model of `task`, recorded as an LLM call span.
+
+        The span gets the route and the latency of the call, along with its token usage and cost as computed for the
+        LLM calls of the agent.
+        """
+        model = self.model(task)
+        with tracer.start_as_current_span(f"call_llm {model}") as span:
+            span.set_attributes({GenAI.OPERATION_NAME: "call_llm", GenAI.REQUEST_MODEL: model, ROUTE_ATTRIBUTE: task})
+            start = time.perf_counter()
+            try:
+                response = completion(model=model, messages=messages, **kwargs)
+            finally:
+                span.set_attribute(ROUTE_LATENCY_ATTRIBUTE, time.perf_counter() - start)
+
+            if span.is_recording():
+                usage = getattr(response, "usage", None)
+                span.set_attributes(
+                    {
+                        GenAI.OUTPUT: response.choices[0].message.content or "",
+                        GenAI.USAGE_INPUT_TOKENS: getattr(usage, "prompt_tokens", 0) or 0,
+                        GenAI.USAGE_OUTPUT_TOKENS: getattr(usage, "completion_tokens", 0) or 0,
+                    }
+                )
+                add_cost_info(span)
+                if (costs := _routed_costs.get()) is not None:
+                    costs.append(
+                        span.attributes.get(GenAI.USAGE_INPUT_COST, 0.0)
+                        + span.attributes.get(GenAI.USAGE_OUTPUT_COST, 0.0)
+                    )
+            span.set_status(StatusCode.OK)
+        return response
+
+    def __repr__(self) -> str:
+        """Describe the model of every task."""
+        return f"ModelRouter({', '.join(f'{task}={self.model(task)}' for task in ROUTED_TASKS)})"
+
+
+_model_router: ModelRouter | None = None
+
+
+def get_model_router() -> ModelRouter:
+    """Return the model router configured by `FAST_MODEL` and `MODEL_ROUTES`, created on first use."""
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter(FAST_MODEL, parse_model_routes(MODEL_ROUTES))
+    return _model_router
+
+
+def draft_readme(agent_factory_outputs: dict[str, Any]) -> str:
+    """Draft the README of the agent of `agent_factory_outputs` with the model of the `readme` route."""
+    outputs = {field: agent_factory_outputs.get(field) for field in README_SOURCE_FIELDS}
+    response = get_model_router().completion(
+        "readme",
+        [
+            {
+                "role": "user",
+                "content": README_PROMPT.format(
+                    readme_instructions=README_INSTRUCTIONS, outputs=json.dumps(outputs, indent=2, default=str)
+                ),
+            }
+        ],
+    )
+    readme = (response.choices[0].message.content or "").strip()
+    if readme.startswith("```"):
+        readme = readme.split("\n", 1)[-1].removesuffix("```").rstrip()
+    return readme
+
+
+def summarize_webpage(url: str, content: str) -> str:
+    """Summarize the `content` of the web page at `url` with the model of the `webpage_summary` route."""
+    response = get_model_router().completion(
+        "webpage_summary", [{"role": "user", "content": WEBPAGE_SUMMARY_PROMPT.format(url=url, content=content)}]
+    )
+    return response.choices[0].message.content or ""
+
+
+def summarize_long_webpages(
+    visit_webpage: Callable[..., str], min_chars: int = WEBPAGE_SUMMARY_MIN_CHARS
+) -> Callable[..., str]:
+    """Make the `visit_webpage` tool return a summary of the web pages longer than `min_chars` characters.
+
+    The summaries are written with the model of the `webpage_summary` route, so that long pages don't take up the
+    context of the agent. If a summary fails, the page is returned as is. A `min_chars` of 0 disables the summaries.
+    """
+    if not min_chars:
+        return visit_webpage
+    signature = inspect.signature(visit_webpage)
+
+    @functools.wraps(visit_webpage)
+    def wrapper(*args, **kwargs):
+        content = visit_webpage(*args, **kwargs)
+        if not isinstance(content, str) or len(content) <= min_chars:
+            return content
+        url = signature.bind(*args, **kwargs).arguments.get("url", "")
+        try:
+            summary = summarize_webpage(url, content)
+        except Exception as e:
+            logger.warning(f"Failed to summarize the web page {url}, returning it as is: {e}")
+            return content
+        logger.debug(f"Summarized the web page {url} from {len(content)} to {len(summary)} characters")
+        return summary
+
+    return wrapper
@@ -0,0 +1,205 @@
+"""Speculative generation of several drafts for each request, the first valid one being returned.
+
+The quality of the generations varies between runs, so rather than retrying a failed generation after it finished, the
+A2A server can start several generations (drafts) of the same request at once. Each finished draft is validated by
+preparing its artifacts, and the first one passing is returned while the others are cancelled. The number of drafts,
+how many of them run at the same time and their total cost are capped per request.
+"""
+
+import asyncio
+import time
+from typing import Any
+
+from a2a.server.apps import A2AStarletteApplication
+from any_agent import AgentRunError, AnyAgent
+from any_agent.tracing.agent_trace import AgentTrace
+from opentelemetry import context as otel_context
+from opentelemetry import trace
+from pydantic import BaseModel
+
+from agent_factory.callbacks import ConcurrentToolCalls, SpeculativeDrafts, StopSpeculativeDrafts, current_draft
+from agent_factory.config import TRACES_DIR
+from agent_factory.schemas import Status
+from agent_factory.utils.artifact_cache import ArtifactBundleCache, get_artifact_cache
+from agent_factory.utils.io_utils import prepare_agent_artifacts_async
+from agent_factory.utils.json_exporter import delete_trace_file, merge_trace_files
+from agent_factory.utils.logging import logger
+from agent_factory.utils.model_routing import track_routed_costs
+
+tracer = trace.get_tracer(__name__)
+
+
+def _agent_factory_outputs(final_output: Any) -> BaseModel | None:
+    """The `AgentFactoryOutputs` of a run, unwrapped from the envelope of the agents served over A2A."""
+    data = getattr(final_output, "data", final_output)
+    return data if isinstance(data, BaseModel) else None
+
+
+class SpeculativeAgent:
+    """Agent running `drafts` generations of each prompt concurrently, and returning the first valid one.
+
+    A draft is valid if it completed the generation and its artifacts could be prepared; the prepared artifacts are
+    stored in the artifact `cache`, so that they are not prepared again for the response. If no draft is valid, the
+    first draft to finish without an error is returned (e.g. asking the user for more details), and if all of them
+    failed, the error of the first one to fail is raised.
+
+    Every other attribute is the one of the wrapped `agent`, whose callbacks get a `StopSpeculativeDrafts`.
+
+    Args:
+        agent: The agent generating the drafts.
+        drafts: The number of drafts generated for each prompt.
+        max_concurrent_drafts: The number of drafts of a prompt running at the same time, all of them if `None`. The
+            next draft starts when a running one finishes without passing.
+        max_cost: The maximum total cost in USD of the drafts of a prompt, see `SpeculativeDrafts`.
+        cache: The artifact bundle cache storing the artifacts prepared to validate the drafts, if any.
+    """
+
+    def __init__(
+        self,
+        agent: AnyAgent,
+        drafts: int,
+        max_concurrent_drafts: int | None = None,
+        max_cost: float | None = None,
+        cache: ArtifactBundleCache | None = None,
+    ):
+        if drafts < 1:
+            raise ValueError(f"drafts must be at least 1, got {drafts}")
+        self.agent = agent
+        self.drafts = drafts
+        self.max_concurrent_drafts = min(max_concurrent_drafts or drafts, drafts)
+        self.max_cost = max_cost
+        self.cache = cache
+        self._stopping: set[asyncio.Task] = set()
+        callbacks = agent.config.callbacks
+        if not any(isinstance(callback, StopSpeculativeDrafts) for callback in callbacks):
+            # Before `ConcurrentToolCalls`, so that a stopped draft doesn't start the tool calls of its last turn.
+            concurrent = [i for i, callback in enumerate(callbacks) if isinstance(callback, ConcurrentToolCalls)]
+            callbacks.insert(concurrent[0] if concurrent else len(callbacks), StopSpeculativeDrafts())
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate the other attributes, such as `config`, to the wrapped agent."""
+        return getattr(self.agent, name)
+
+    async def _is_valid(self, drafts: SpeculativeDrafts, trace: AgentTrace) -> bool:
+        outputs = _agent_factory_outputs(trace.final_output)
+        if outputs is None or getattr(outputs, "status", None) != Status.COMPLETED:
+            return False
+        # The syntax repairs made while preparing the artifacts count towards the cost of the drafts.
+        with track_routed_costs() as routed_costs:
+            try:
+                await prepare_agent_artifacts_async(outputs.model_dump(), cache=self.cache)
+            except Exception as e:
+                logger.warning(f"Speculative draft rejected, its artifacts could not be prepared: {e}")
+                return False
+            finally:
+                drafts.cost += sum(routed_costs)
+        return True
+
+    async def _run_draft(
+        self, drafts: SpeculativeDrafts, index: int, trace_ids: dict[int, int], prompt: str, **kwargs: Any
+    ) -> tuple[int, AgentTrace | None, AgentRunError | None, bool]:
+        """Run a draft in its own trace, whose id is stored in `trace_ids`: the agent keeps the state of each of its
+        runs by trace id.
+        """
+        current_draft.set((drafts, index))
+        links = [trace.Link(trace.get_current_span().get_span_context())]
+        with tracer.start_as_current_span(
+            "speculative_draft", context=otel_context.Context(), links=links, attributes={"draft": index}
+        ) as span:
+            trace_ids[index] = span.get_span_context().trace_id
+            try:
+                agent_trace = await self.agent.run_async(prompt, **kwargs)
+            except AgentRunError as e:
+                return index, None, e, False
+            return index, agent_trace, None, await self._is_valid(drafts, agent_trace)
+
+    async def run_async(self, prompt: str, **kwargs: Any) -> AgentTrace:
+        """Run the drafts of the `prompt`, returning the trace of the first valid one.
+
+        The drafts still running then are cancelled, along with their LLM calls in flight. The spans of the returned
+        draft are moved to the trace of the request, where the clients read them, and those of the others are deleted.
+        """
+        drafts = SpeculativeDrafts(max_cost=self.max_cost)
+        request_trace_id = trace.get_current_span().get_span_context().trace_id
+        start = time.perf_counter()
+        running: set[asyncio.Task] = set()
+        draft_indexes: dict[asyncio.Task, int] = {}
+        trace_ids: dict[int, int] = {}
+        started = 0
+
+        def start_draft() -> None:
+            nonlocal started
+            task = asyncio.create_task(self._run_draft(drafts, started, trace_ids, prompt, **kwargs))
+            running.add(task)
+            draft_indexes[task] = started
+            started += 1
+
+        def discard_trace(index: int) -> None:
+            if index in trace_ids:
+                delete_trace_file(trace_ids[index], TRACES_DIR)
+
+        while started < self.max_concurrent_drafts:
+            start_draft()
+
+        finished: list[tuple[int, AgentTrace | None, AgentRunError | None]] = []
+        returned: int | None = None
+        try:
+            while running:
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index, agent_trace, error, valid = task.result()
+                    if valid:
+                        logger.info(
+                            f"Speculative draft {index} accepted after {time.perf_counter() - start:.1f}s, "
+                            f"{started} of {self.drafts} drafts started, {drafts.cost:.4f} USD spent so far"
+                        )
+                        returned = index
+                        return agent_trace
+                    finished.append((index, agent_trace, error))
+                    logger.info(f"Speculative draft {index} finished without passing" + (f": {error}" if error else ""))
+                while started < self.drafts and len(running) < self.max_concurrent_drafts:
+                    if drafts.stop_reason(started) is not None:
+                        break
+                    start_draft()
+
+            logger.warning(f"None of the {started} speculative drafts passed the validation")
+            returned, agent_trace, error = next((result for result in finished if result[1] is not None), finished[0])
+            if agent_trace is None:
+                raise error
+            return agent_trace
+        finally:
+            drafts.answered = True
+            # The cancelled drafts finish in the background, their tasks are referenced until then.
+            self._stopping.update(running)
+            for task in running:
+                task.cancel()
+                task.add_done_callback(self._stopping.discard)
+                # Once the draft is done, as its spans are exported until then.
+                task.add_done_callback(lambda _, index=draft_indexes[task]: discard_trace(index))
+            for index in trace_ids.keys() - {draft_indexes[task] for task in running} - {returned}:
+                discard_trace(index)
+            if returned is not None and request_trace_id and returned in trace_ids:
+                merge_trace_files(trace_ids[returned], request_trace_id, TRACES_DIR)
+
+
+def enable_speculative_drafts(
+    app: A2AStarletteApplication,
+    drafts: int,
+    max_concurrent_drafts: int | None = None,
+    max_cost: float | None = None,
+) -> SpeculativeAgent:
+    """Make the A2A `app` generate `drafts` drafts of each request concurrently, see `SpeculativeAgent`.
+
+    Must be called before any other wrapping of the agent executor of the `app`, e.g. `enable_artifact_preparation`.
+    """
+    agent_executor = app.handler.request_handler.agent_executor
+    agent = SpeculativeAgent(
+        agent_executor.agent,
+        drafts,
+        max_concurrent_drafts=max_concurrent_drafts,
+        max_cost=max_cost,
+        cache=get_artifact_cache(),
+    )
+    agent_executor.agent = agent
+    logger.info(f"Generating {drafts} speculative drafts of each request, {agent.max_concurrent_drafts} at a time")
+    return agent
@@ -0,0 +1,50 @@
+"""Compact digest of the tool functions that can be bundled with a generated agent."""
+
+import ast
+from functools import lru_cache
+from pathlib import Path
+
+from agent_factory.config import TOOLS_DIR
+
+
+def _function_digest(module_name: str, node: ast.FunctionDef | ast.AsyncFunctionDef) -> str:
+    """e.g. "- `tools/visit_webpage.py`: `visit_webpage(url: str, timeout: int=30) -> str` - Visit a webpage..."."""
+    prefix = "async " if isinstance(node, ast.AsyncFunctionDef) else ""
+    signature = f"{prefix}{node.name}({ast.unparse(node.args)})"
+    if node.returns is not None:
+        signature += f" -> {ast.unparse(node.returns)}"
+    docstring = ast.get_docstring(node) or ""
+    summary = docstring.strip().split("\n", 1)[0]
+    return f"- `tools/{module_name}.py`: `{signature}`" + (f" - {summary}" if summary else "")
+
+
+def module_digest(source: str, module_name: str) -> list[str]:
+    """Return a digest line for each public top-level function defined in the `source` of a tool module."""
+    tree = ast.parse(source)
+    return [
+        _function_digest(module_name, node)
+        for node in tree.body
+        if isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef) and not node.name.startswith("_")
+    ]
+
+
+@lru_cache(maxsize=8)
+def _build_digest(fingerprint: tuple[tuple[str, int, int], ...], tools_dir: Path) -> str:
+    lines = []
+    for name, _, _ in fingerprint:
+        lines.extend(module_digest((tools_dir / name).read_text(encoding="utf-8"), Path(name).stem))
+    return "\n".join(lines)
+
+
+def build_tool_digest(tools_dir: Path = TOOLS_DIR) -> str:
+    """Return the digest of every tool module: one line per tool, with its module, signature and one-line summary.
+
+    The digest is generated from the module sources without importing them, and only regenerated when the name, size
+    or mtime of a module changes.
+    """
+    fingerprint = tuple(
+        (path.name, path.stat().st_mtime_ns, path.stat().st_size)
+        for path in sorted(tools_dir.glob("*.py"))
+        if path.name != "__init__.py"
+    )
+    return _build_digest(fingerprint, tools_dir)
@@ -0,0 +1,69 @@
+"""Thread-safe in-memory LRU cache whose entries expire after a time-to-live."""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any, NamedTuple
+
+
+class CacheInfo(NamedTuple):
+    """Cache statistics, in the spirit of `functools.lru_cache().cache_info()`."""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class TTLCache:
+    """LRU cache of at most `maxsize` entries, each of which expires `ttl` seconds after being stored.
+
+    Args:
+        maxsize: Maximum number of entries, the least recently used entry is evicted when it is exceeded.
+        ttl: Seconds after which an entry expires.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        """Number of entries currently stored (including expired ones not yet evicted)."""
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value stored for `key`, or `default` if there is none or it expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry[0]:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store `value` for `key`, evicting the least recently used entry if the cache is full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = 0
+
+    def cache_info(self) -> CacheInfo:
+        """Return the hit and miss counters, and the size of the cache."""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.maxsize, len(self._entries))
@@ -0,0 +1,214 @@
+"""End-to-end throughput and latency benchmark of the agent generation.
+
+The benchmark starts the stub model server and an A2A server backed by it, then runs `generate_target_agent` a number of
+times at a fixed concurrency. It reports the requests per second, the latency percentiles, the time spent in each stage
+of the client (A2A streaming, trace assembly, artifact preparation and storage) and the peak memory of the server and
+of the client, and writes them as JSON so that regressions can be tracked:
+
+    uv run --group tests python tests/benchmarks/benchmark_generation.py --requests 100 --concurrency 10
+"""
+
+import asyncio
+import json
+import os
+import platform
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import fire
+from opentelemetry import trace
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+import agent_factory.agent_generator
+from agent_factory.agent_generator import generate_target_agent
+from agent_factory.config import PROJECT_ROOT
+from agent_factory.utils.client_utils import is_server_live
+
+PROMPT = "Summarize the content of a webpage given its URL."
+
+# The client spans timing each stage of a generation, see `generate_target_agent`.
+STAGES = ("a2a_streaming", "trace_assembly", "prepare_agent_artifacts", "storage")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_live(port: int, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not is_server_live("localhost", port):
+        if process.poll() is not None:
+            raise RuntimeError(f"Server on port {port} exited with code {process.returncode}")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Server on port {port} not live after {timeout} seconds")
+        time.sleep(0.2)
+
+
+@contextmanager
+def _servers(stub_latency: float, max_turns: int):
+    """Run the stub model server and the A2A server backed by it, yielding the A2A server port and process."""
+    stub_port, a2a_port = _free_port(), _free_port()
+    # Without the artifact cache, the identical outputs of the stub would be prepared once and then served from it.
+    env = os.environ | {"OPENAI_API_KEY": "stub", "LLM_CASSETTE_PATH": "", "ARTIFACT_CACHE_DIR": ""}
+    processes = []
+    try:
+        stub = subprocess.Popen(
+            [sys.executable, "-m", "agent_factory.stub_model_server", "--port", str(stub_port)]
+            + ["--latency", str(stub_latency)],
+            env=env,
+        )
+        processes.append(stub)
+        _wait_until_live(stub_port, stub)
+
+        server = subprocess.Popen(
+            [sys.executable, "-m", "agent_factory", "--model", "openai/stub"]
+            + ["--api-base", f"http://localhost:{stub_port}/v1", "--port", str(a2a_port)]
+            + ["--max-turns", str(max_turns), "--nochat", "--log-level", "warning"],
+            env=env,
+            # The factory tools read the `tools/` files relative to the package directory.
+            cwd=PROJECT_ROOT / "src" / "agent_factory",
+        )
+        processes.append(server)
+        _wait_until_live(a2a_port, server)
+        yield a2a_port, server
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+def _peak_rss_mb(pid: int) -> float | None:
+    """Return the peak resident memory of a process in MB, if the platform reports it (Linux)."""
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+    for line in status.splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1]) / 1024
+    return None
+
+
+def _percentiles(values: list[float]) -> dict[str, float | None]:
+    if not values:
+        return {"mean": None, "p50": None, "p95": None, "p99": None}
+    if len(values) == 1:
+        return {"mean": values[0], "p50": values[0], "p95": values[0], "p99": values[0]}
+    quantiles = statistics.quantiles(values, n=100, method="inclusive")
+    return {"mean": statistics.fmean(values), "p50": quantiles[49], "p95": quantiles[94], "p99": quantiles[98]}
+
+
+def summarize(latencies: list[float], stage_durations: dict[str, list[float]], wall_time: float) -> dict[str, Any]:
+    """Summarize the latencies (seconds) of the successful requests and the per-request durations of each stage."""
+    return {
+        "requests_per_second": len(latencies) / wall_time if wall_time else None,
+        "latency_seconds": _percentiles(latencies),
+        "stages_seconds": {stage: _percentiles(stage_durations.get(stage, [])) for stage in STAGES},
+    }
+
+
+def _stage_durations(spans: list[Any]) -> dict[str, list[float]]:
+    """Return the total duration of each stage in each generation trace, in seconds."""
+    per_trace: dict[tuple[int, str], float] = defaultdict(float)
+    for span in spans:
+        if span.name in STAGES:
+            per_trace[span.context.trace_id, span.name] += (span.end_time - span.start_time) / 1e9
+    durations: dict[str, list[float]] = defaultdict(list)
+    for (_, stage), duration in per_trace.items():
+        durations[stage].append(duration)
+    return durations
+
+
+async def _run_requests(port: int, requests: int, concurrency: int, output_dir: Path) -> tuple[list[float], int]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    failures = 0
+
+    async def run(i: int) -> None:
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await generate_target_agent(PROMPT, output_dir=output_dir / str(i), port=port)
+            except Exception:
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(run(i) for i in range(requests)))
+    return latencies, failures
+
+
+def run_benchmark(
+    requests: int = 50,
+    concurrency: int = 10,
+    warmup: int = 2,
+    stub_latency: float = 0.05,
+    max_turns: int = 40,
+    output: str = "benchmark_results.json",
+) -> None:
+    """Run the benchmark and write its results as JSON.
+
+    Args:
+        requests: Number of generations to run.
+        concurrency: Maximum number of generations running at the same time.
+        warmup: Number of generations run one at a time before measuring, and left out of the results.
+        stub_latency: Seconds taken by the stub model to answer each completion.
+        max_turns: The maximum number of turns of the factory agent.
+        output: The JSON results file.
+    """
+    exporter = InMemorySpanExporter()
+    trace.get_tracer_provider().add_span_processor(SimpleSpanProcessor(exporter))
+    # The stub answers every request with the same outputs, so the client artifact cache would turn every measured
+    # artifact preparation into a cache hit (and write to the cache of the repository).
+    agent_factory.agent_generator.get_artifact_cache = lambda: None
+
+    with tempfile.TemporaryDirectory() as tmp_dir, _servers(stub_latency, max_turns) as (port, server):
+        output_dir = Path(tmp_dir)
+        asyncio.run(_run_requests(port, warmup, 1, output_dir / "warmup"))
+        exporter.clear()
+
+        start = time.perf_counter()
+        latencies, failures = asyncio.run(_run_requests(port, requests, concurrency, output_dir))
+        wall_time = time.perf_counter() - start
+        server_peak_rss_mb = _peak_rss_mb(server.pid)
+
+    results = {
+        "created_at": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "requests": requests,
+            "concurrency": concurrency,
+            "warmup": warmup,
+            "stub_latency": stub_latency,
+            "max_turns": max_turns,
+        },
+        "succeeded": len(latencies),
+        "failed": failures,
+        "wall_time_seconds": wall_time,
+        **summarize(latencies, _stage_durations(exporter.get_finished_spans()), wall_time),
+        "peak_rss_mb": {
+            "server": server_peak_rss_mb,
+            # `ru_maxrss` is in KB on Linux.
+            "client": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        },
+    }
+    Path(output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    fire.Fire(run_benchmark)
@@ -75,7 +75,9 @@ def mock_agent_generator_dependencies():
         patch(
             "agent_factory.agent_generator.process_a2a_agent_final_response"
         ) as mock_process_a2a_agent_final_response,
-        patch("agent_factory.agent_generator.prepare_agent_artifacts") as mock_prepare_agent_artifacts,
+        patch(
+            "agent_factory.agent_generator.prepare_agent_artifacts_async", new_callable=AsyncMock
+        ) as mock_prepare_agent_artifacts,
         patch("agent_factory.agent_generator.get_storage_backend") as mock_get_storage_backend,
         patch(
             "agent_factory.agent_generator.create_agent_trace_from_dumped_spans"
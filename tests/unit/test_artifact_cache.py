@@ -0,0 +1,98 @@
+from unittest.mock import patch
+
+import pytest
+
+from agent_factory.schemas import Status
+from agent_factory.utils.artifact_cache import ArtifactBundleCache, canonical_hash
+from agent_factory.utils.io_utils import prepare_agent_artifacts, prepare_agent_artifacts_async
+
+
+@pytest.fixture
+def tools_dir(tmp_path):
+    tools_dir = tmp_path / "tools"
+    tools_dir.mkdir()
+    (tools_dir / "visit_webpage.py").write_text("def visit_webpage(url: str) -> str: ...")
+    return tools_dir
+
+
+@pytest.fixture
+def artifact_cache(tmp_path, tools_dir):
+    return ArtifactBundleCache(tmp_path / "cache", tools_dir=tools_dir)
+
+
+def test_canonical_hash_ignores_key_order_and_serializes_enums():
+    """Test that the hash does not depend on the insertion order of the keys and supports enums."""
+    assert canonical_hash({"a": 1, "b": [1, 2]}) == canonical_hash({"b": [1, 2], "a": 1})
+    assert canonical_hash({"status": Status.COMPLETED}) == canonical_hash({"status": "completed"})
+
+
+def test_cache_round_trip(artifact_cache):
+    """Test that stored artifacts are returned for the same outputs and not for different ones."""
+    outputs = {"readme": "# Agent", "status": Status.COMPLETED}
+    artifacts = {"agent.py": "print('hello')", "README.md": "# Agent"}
+
+    assert artifact_cache.get(outputs) is None
+    artifact_cache.put(outputs, artifacts)
+
+    assert artifact_cache.get(dict(reversed(outputs.items()))) == artifacts
+    assert artifact_cache.get({**outputs, "readme": "# Another agent"}) is None
+
+
+def test_cache_invalidated_by_tool_catalog_change(artifact_cache, tools_dir):
+    """Test that changing a tool file invalidates the cached entries."""
+    outputs = {"readme": "# Agent"}
+    artifact_cache.put(outputs, {"README.md": "# Agent"})
+
+    (tools_dir / "visit_webpage.py").write_text("def visit_webpage(url: str, timeout: int = 10) -> str: ...")
+
+    assert artifact_cache.get(outputs) is None
+
+
+def test_cache_invalidated_by_any_agent_version_change(artifact_cache):
+    """Test that changing the pinned any-agent version invalidates the cached entries."""
+    outputs = {"readme": "# Agent"}
+    artifact_cache.put(outputs, {"README.md": "# Agent"})
+
+    with patch("agent_factory.utils.artifact_cache.ANY_AGENT_VERSION", "0.0.0"):
+        assert artifact_cache.get(outputs) is None
+
+
+def test_cache_invalidated_by_registry_version_change(artifact_cache):
+    """Test that a change of the MCP registry invalidates the cached entries of outputs with MCP servers only."""
+    outputs = {"readme": "# Agent", "mcp_servers": [{"name": "slack", "tools": ["slack_post_message"]}]}
+    outputs_without_servers = {"readme": "# Agent", "mcp_servers": []}
+
+    with patch("agent_factory.utils.mcp_registry.registry_version", return_value="v1"):
+        artifact_cache.put(outputs, {"README.md": "# Agent"})
+        artifact_cache.put(outputs_without_servers, {"README.md": "# Agent"})
+        assert artifact_cache.get(outputs) is not None
+
+    with patch("agent_factory.utils.mcp_registry.registry_version", return_value="v2") as mock_version:
+        assert artifact_cache.get(outputs) is None
+        mock_version.reset_mock()
+        assert artifact_cache.get(outputs_without_servers) is not None
+        mock_version.assert_not_called()
+
+
+def test_cache_ignores_corrupted_entries(artifact_cache):
+    """Test that an unreadable entry is treated as a cache miss."""
+    outputs = {"readme": "# Agent"}
+    artifact_cache.put(outputs, {"README.md": "# Agent"})
+    (artifact_cache.cache_dir / f"{artifact_cache.key(outputs)}.json").write_text("{not json")
+
+    assert artifact_cache.get(outputs) is None
+
+
+@pytest.mark.asyncio
+async def test_prepare_agent_artifacts_uses_cache(sample_generator_agent_response_json, tmp_path):
+    """Test that a cache hit skips the artifact preparation pipeline."""
+    cache = ArtifactBundleCache(tmp_path / "cache")
+    artifacts = prepare_agent_artifacts(sample_generator_agent_response_json, cache=cache)
+
+    with patch("agent_factory.utils.io_utils.run_artifact_pipeline") as mock_pipeline:
+        assert prepare_agent_artifacts(sample_generator_agent_response_json, cache=cache) == artifacts
+        mock_pipeline.assert_not_called()
+
+    with patch("agent_factory.utils.io_utils.run_artifact_pipeline_async") as mock_pipeline_async:
+        assert await prepare_agent_artifacts_async(sample_generator_agent_response_json, cache=cache) == artifacts
+        mock_pipeline_async.assert_not_called()
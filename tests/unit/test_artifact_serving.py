@@ -0,0 +1,94 @@
+import json
+
+import pytest
+from a2a.server.agent_execution import AgentExecutor
+from a2a.server.events import EventQueue
+from a2a.server.tasks import TaskUpdater
+from a2a.types import (
+    DataPart,
+    Part,
+    SendStreamingMessageResponse,
+    SendStreamingMessageSuccessResponse,
+    TaskArtifactUpdateEvent,
+    TaskState,
+    TaskStatusUpdateEvent,
+    TextPart,
+)
+from a2a.utils import new_agent_parts_message
+
+from agent_factory.utils.artifact_serving import ArtifactPreparingExecutor
+from agent_factory.utils.client_utils import ARTIFACT_COUNT_METADATA_KEY, get_server_prepared_artifacts
+from agent_factory.utils.io_utils import prepare_agent_artifacts
+
+
+class FakeAgentExecutor(AgentExecutor):
+    """Reports a tool call, then completes the task with the given outputs."""
+
+    def __init__(self, outputs: dict, state: TaskState = TaskState.completed):
+        self.outputs = outputs
+        self.state = state
+
+    async def execute(self, context, event_queue):
+        updater = TaskUpdater(event_queue, "task", "context")
+        tool_started = new_agent_parts_message([Part(root=DataPart(data={"event_type": "tool_started"}))])
+        await updater.update_status(TaskState.working, message=tool_started)
+        message = new_agent_parts_message([Part(root=TextPart(text=json.dumps(self.outputs)))], "context", "task")
+        await updater.update_status(self.state, message=message, final=True)
+
+    async def cancel(self, context, event_queue):
+        pass
+
+
+async def _run(executor: AgentExecutor) -> list:
+    queue = EventQueue()
+    await executor.execute(None, queue)
+    events = []
+    while not queue.queue.empty():
+        events.append(await queue.dequeue_event(no_wait=True))
+    return events
+
+
+def _as_responses(events: list) -> list[SendStreamingMessageResponse]:
+    return [
+        SendStreamingMessageResponse(root=SendStreamingMessageSuccessResponse(id="1", result=event)) for event in events
+    ]
+
+
+@pytest.mark.asyncio
+async def test_artifact_preparing_executor_streams_artifacts(sample_generator_agent_response_json):
+    """Test that the artifacts are streamed between the agent events and the final status update."""
+    events = await _run(ArtifactPreparingExecutor(FakeAgentExecutor(sample_generator_agent_response_json)))
+    expected_artifacts = prepare_agent_artifacts(sample_generator_agent_response_json)
+
+    assert isinstance(events[0], TaskStatusUpdateEvent) and not events[0].final
+    assert all(isinstance(event, TaskArtifactUpdateEvent) for event in events[1:-1])
+    final_event = events[-1]
+    assert final_event.final and final_event.status.state == TaskState.completed
+    assert final_event.metadata == {ARTIFACT_COUNT_METADATA_KEY: len(expected_artifacts)}
+    assert get_server_prepared_artifacts(_as_responses(events)) == expected_artifacts
+
+
+@pytest.mark.asyncio
+async def test_artifact_preparing_executor_skips_incomplete_generations(sample_generator_agent_response_json):
+    """Test that no artifacts are prepared for generations the agent did not complete."""
+    outputs = sample_generator_agent_response_json | {"status": "input_required"}
+    events = await _run(ArtifactPreparingExecutor(FakeAgentExecutor(outputs)))
+
+    assert len(events) == 2
+    assert events[-1].metadata is None
+    assert get_server_prepared_artifacts(_as_responses(events)) is None
+
+
+@pytest.mark.asyncio
+async def test_artifact_preparing_executor_preparation_failure(sample_generator_agent_response_json, monkeypatch):
+    """Test that a failed preparation still forwards the final status update, leaving the artifacts to the client."""
+
+    async def failing_artifacts(*args, **kwargs):
+        yield "README.md", "# Agent"
+        raise RuntimeError("mcpd failed")
+
+    monkeypatch.setattr("agent_factory.utils.artifact_serving.iter_agent_artifacts", failing_artifacts)
+    events = await _run(ArtifactPreparingExecutor(FakeAgentExecutor(sample_generator_agent_response_json)))
+
+    assert events[-1].final and events[-1].metadata is None
+    assert get_server_prepared_artifacts(_as_responses(events)) is None
@@ -52,9 +52,7 @@ class TestValidatePythonSyntax:
         valid_code = "def my_func():\n    print('hello')"
         custom_response = self.create_llm_response(mock_llm_response_factory, valid_code)
 
-        with patch(
-            "agent_factory.utils.artifact_validation.completion", return_value=custom_response
-        ) as mock_completion:
+        with patch("agent_factory.utils.model_routing.completion", return_value=custom_response) as mock_completion:
             result = validate_python_syntax(invalid_code)
             assert result.code == valid_code
             mock_completion.assert_called_once()
@@ -66,9 +64,7 @@ class TestValidatePythonSyntax:
 
         custom_response = mock_llm_response_factory(content=llm_response_content)
 
-        with patch(
-            "agent_factory.utils.artifact_validation.completion", return_value=custom_response
-        ) as mock_completion:
+        with patch("agent_factory.utils.model_routing.completion", return_value=custom_response) as mock_completion:
             with pytest.raises(SyntaxError):
                 validate_python_syntax(invalid_code, max_retries=2)
             assert mock_completion.call_count == 2
@@ -83,7 +79,7 @@ class TestValidatePythonSyntax:
         llm_response_2 = self.create_llm_response(mock_llm_response_factory, valid_code)
 
         with patch(
-            "agent_factory.utils.artifact_validation.completion", side_effect=[llm_response_1, llm_response_2]
+            "agent_factory.utils.model_routing.completion", side_effect=[llm_response_1, llm_response_2]
         ) as mock_completion:
             result = validate_python_syntax(initial_invalid_code, max_retries=3)
             assert result.code == valid_code
@@ -107,7 +103,7 @@ class TestPreparePythonCode:
         result = prepare_python_code(code)
 
         mock_clean.assert_called_once_with(code)
-        mock_validate.assert_called_once_with(cleaned_code, max_retries=3, attempt=1, model="gpt-4o-mini")
+        mock_validate.assert_called_once_with(cleaned_code, max_retries=3, attempt=1)
         assert result == validated_code_snippet
 
     @patch("agent_factory.utils.artifact_validation.validate_python_syntax", side_effect=SyntaxError("Test error"))
@@ -121,4 +117,4 @@ class TestPreparePythonCode:
             prepare_python_code(code)
 
         mock_clean.assert_called_once_with(code)
-        mock_validate.assert_called_once_with(code, max_retries=3, attempt=1, model="gpt-4o-mini")
+        mock_validate.assert_called_once_with(code, max_retries=3, attempt=1)
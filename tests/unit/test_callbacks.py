@@ -1,8 +1,28 @@
-from unittest.mock import MagicMock
+import asyncio
+import inspect
+import json
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from any_agent import AgentConfig, AgentRunError, AnyAgent
+from any_agent.callbacks import Callback
+from litellm import ModelResponse
 
-from agent_factory.callbacks import LimitAgentTurns
+from agent_factory.callbacks import (
+    TOOL_EXECUTION_ATTRIBUTE,
+    CompactContext,
+    ConcurrentToolCalls,
+    LimitAgentBudget,
+    LimitAgentTurns,
+    MemoizeToolCalls,
+    RecordCachedTokens,
+    RecordModelRoute,
+    cacheable,
+    parallelizable,
+)
+from agent_factory.utils.json_exporter import JsonFileSpanExporter
 
 
 def test_limit_agent_turns_exceeds_limit():
@@ -19,3 +39,455 @@ def test_limit_agent_turns_exceeds_limit():
     with pytest.raises(RuntimeError) as exc_info:
         callback.before_llm_call(mock_context)
     assert str(exc_info.value) == f"Reached limit of agent turns: {max_turns}"
+
+
+def _llm_call(callback, context, messages, input_tokens=0, output_tokens=0, cost=0.0):
+    """Run an LLM call between the callback hooks, with its usage on the span the way the default callbacks set it."""
+    callback.before_llm_call(context, messages=messages)
+    context.current_span.attributes = {
+        "gen_ai.usage.input_tokens": input_tokens,
+        "gen_ai.usage.output_tokens": output_tokens,
+        "gen_ai.usage.input_cost": cost / 2,
+        "gen_ai.usage.output_cost": cost / 2,
+    }
+    callback.after_llm_call(context, MagicMock())
+
+
+def test_limit_agent_budget_tokens():
+    """Test that the agent is asked to wrap up once at the soft token limit, and aborted at the hard one."""
+    context = MagicMock()
+    context.shared = {}
+    messages = []
+    callback = LimitAgentBudget(max_tokens=1000, soft_limit=0.5)
+
+    _llm_call(callback, context, messages, input_tokens=300, output_tokens=100)
+    assert messages == []
+    assert context.shared["budget_usage"]["input_tokens"] == 300
+    assert context.shared["budget_usage"]["output_tokens"] == 100
+
+    _llm_call(callback, context, messages, input_tokens=400, output_tokens=100)
+    _llm_call(callback, context, messages, input_tokens=50, output_tokens=50)
+    assert len(messages) == 1
+    assert messages[0]["role"] == "user"
+    assert "Wrap up now" in messages[0]["content"]
+    assert "900/1000 tokens" in messages[0]["content"]
+
+    with pytest.raises(RuntimeError, match="Reached agent budget limit: 1000/1000 tokens"):
+        _llm_call(callback, context, messages)
+
+
+def test_limit_agent_budget_cost_and_time():
+    """Test that cost and elapsed time are limited as well, and that there is no limit by default."""
+    context = MagicMock()
+    context.shared = {}
+    callback = LimitAgentBudget(max_cost=0.1)
+    _llm_call(callback, context, [], cost=0.2)
+    with pytest.raises(RuntimeError, match="0.2/0.1 cost"):
+        callback.before_llm_call(context, messages=[])
+
+    context.shared = {}
+    callback = LimitAgentBudget(max_seconds=10)
+    with patch("agent_factory.callbacks.time.monotonic", side_effect=[100.0, 105.0, 111.0]):
+        # The time from the start of the run to its first LLM call counts.
+        callback.before_agent_invocation(context, "prompt")
+        callback.before_llm_call(context, messages=[])
+        with pytest.raises(RuntimeError, match="11/10 seconds"):
+            callback.before_llm_call(context, messages=[])
+
+    context.shared = {}
+    unlimited = LimitAgentBudget()
+    messages = []
+    _llm_call(unlimited, context, messages, input_tokens=10**9, cost=10**6)
+    unlimited.before_llm_call(context, messages=messages)
+    assert messages == []
+
+
+def test_limit_agent_budget_invalid_soft_limit():
+    with pytest.raises(ValueError, match="soft_limit"):
+        LimitAgentBudget(max_tokens=10, soft_limit=1.5)
+
+
+def _conversation(n_turns: int, result_size: int) -> list[dict]:
+    """A conversation of `n_turns` assistant turns, each calling `visit_webpage` once."""
+    messages = [{"role": "system", "content": "instructions"}, {"role": "user", "content": "build an agent"}]
+    for i in range(n_turns):
+        tool_call = {"id": f"call_{i}", "type": "function", "function": {"name": "visit_webpage", "arguments": "{}"}}
+        messages.append({"role": "assistant", "content": None, "tool_calls": [tool_call]})
+        messages.append({"role": "tool", "tool_call_id": f"call_{i}", "content": str(i) * result_size})
+    return messages
+
+
+def test_compact_context_compacts_older_tool_results():
+    """Test that the oldest tool results are compacted until the conversation fits, keeping the recent turns."""
+    context = MagicMock()
+    context.shared = {}
+    messages = _conversation(n_turns=6, result_size=8000)
+    original = [dict(message) for message in messages]
+    callback = CompactContext(max_tokens=9000, keep_recent_turns=2, digest_chars=100)
+
+    callback.before_llm_call(context, messages=messages)
+
+    compacted = [i for i, (message, before) in enumerate(zip(messages, original)) if message != before]
+    # Each result is ~2000 tokens: compacting the 2 oldest ones is enough to fit in 9000 tokens.
+    assert compacted == [3, 5]
+    assert messages[3]["content"].startswith("[Compacted tool result of visit_webpage, 7900 characters omitted")
+    assert messages[3]["content"].endswith("0" * 100)
+    assert messages[:3] == original[:3]
+    saved = context.shared["context_tokens_saved"]
+    assert saved > 3500
+    context.current_span.set_attribute.assert_called_with("agent_factory.context_compaction.tokens_saved", saved)
+
+    # Already compacted results are left as they are.
+    callback.before_llm_call(context, messages=messages)
+    context.current_span.set_attribute.assert_called_with("agent_factory.context_compaction.tokens_saved", 0)
+
+
+def test_compact_context_keeps_recent_turns():
+    """Test that nothing is compacted below the threshold, nor in the most recent turns."""
+    context = MagicMock()
+    context.shared = {}
+    messages = _conversation(n_turns=3, result_size=8000)
+    original = [dict(message) for message in messages]
+
+    CompactContext(max_tokens=100_000).before_llm_call(context, messages=messages)
+    CompactContext(max_tokens=10, keep_recent_turns=3).before_llm_call(context, messages=messages)
+
+    assert messages == original
+    assert "context_tokens_saved" not in context.shared
+
+
+def test_record_cached_tokens():
+    """Test that the cached input tokens reported by the provider are recorded on the span and for the run."""
+    context = MagicMock()
+    context.shared = {}
+    callback = RecordCachedTokens()
+    response = ModelResponse(
+        usage={"prompt_tokens": 1000, "completion_tokens": 10, "prompt_tokens_details": {"cached_tokens": 800}}
+    )
+
+    callback.after_llm_call(context, response)
+    callback.after_llm_call(context, response)
+
+    assert context.shared["cached_input_tokens"] == 1600
+    context.current_span.set_attribute.assert_any_call("agent_factory.usage.cached_input_tokens", 800)
+    context.current_span.set_attribute.assert_any_call("agent_factory.usage.cached_input_ratio", 0.8)
+
+    # Nothing is recorded when the response doesn't report cached tokens.
+    context = MagicMock()
+    context.shared = {}
+    callback.after_llm_call(context, ModelResponse(usage={"prompt_tokens": 1000, "completion_tokens": 10}))
+    assert "cached_input_tokens" not in context.shared
+
+
+def test_record_cached_tokens_instructions_key():
+    """Test that the cache key of the system instructions is recorded on every LLM call span."""
+    context = MagicMock()
+    context.shared = {}
+    RecordCachedTokens(instructions_key="multi_step:0123:no_tool_digest").after_llm_call(
+        context, ModelResponse(usage={"prompt_tokens": 1000, "completion_tokens": 10})
+    )
+
+    context.current_span.set_attribute.assert_called_once_with(
+        "agent_factory.instructions.cache_key", "multi_step:0123:no_tool_digest"
+    )
+
+
+def test_record_model_route():
+    """Test that the route of the agent's LLM calls and their latency are recorded on their spans."""
+    context = MagicMock()
+    context.shared = {}
+    callback = RecordModelRoute()
+
+    callback.before_llm_call(context)
+    callback.after_llm_call(context, MagicMock())
+
+    attributes = dict(call.args for call in context.current_span.set_attribute.call_args_list)
+    assert attributes["agent_factory.route"] == "design"
+    assert attributes["agent_factory.route.latency_seconds"] >= 0
+    assert "llm_call_started_at" not in context.shared
+
+
+@pytest.fixture
+def memoize_context():
+    mock_context = MagicMock()
+    mock_context.shared = {}
+    return mock_context
+
+
+def _execute_tool(callback, context, tool, *args, **kwargs):
+    """Run a tool between the callback hooks, the way the agent frameworks do."""
+    context = callback.before_tool_execution(context)
+    result = tool(*args, **kwargs)
+    callback.after_tool_execution(context, result)
+    return result
+
+
+def test_memoize_tool_calls_reuses_results(memoize_context):
+    """Test that identical calls to a cacheable tool are only executed once per run, with hits recorded on the span."""
+    calls = []
+
+    @cacheable
+    def visit(url: str) -> dict:
+        calls.append(url)
+        return {"url": url}
+
+    callback = MemoizeToolCalls()
+    results = [_execute_tool(callback, memoize_context, visit, url) for url in ["a", "a", "b", "a"]]
+
+    assert calls == ["a", "b"]
+    assert results == [{"url": "a"}, {"url": "a"}, {"url": "b"}, {"url": "a"}]
+    assert memoize_context.shared["tool_call_cache_hits"] == 2
+    memoize_context.current_span.set_attribute.assert_any_call("agent_factory.tool_call_cache.hit", True)
+    memoize_context.current_span.set_attribute.assert_called_with("agent_factory.tool_call_cache.hits", 2)
+
+
+def test_memoize_tool_calls_per_run():
+    """Test that results are not shared across runs."""
+    calls = []
+
+    @cacheable
+    def read(name: str) -> str:
+        calls.append(name)
+        return name
+
+    callback = MemoizeToolCalls()
+    for _ in range(2):
+        context = MagicMock()
+        context.shared = {}
+        _execute_tool(callback, context, read, "README.md")
+
+    assert calls == ["README.md", "README.md"]
+
+
+def test_memoize_tool_calls_ignores_non_cacheable_tools(memoize_context):
+    """Test that tools not declared cacheable are always executed and not recorded."""
+    calls = []
+
+    def search(query: str) -> str:
+        calls.append(query)
+        return query
+
+    callback = MemoizeToolCalls()
+    for _ in range(2):
+        _execute_tool(callback, memoize_context, search, "news")
+
+    assert calls == ["news", "news"]
+    assert "tool_call_cache_hits" not in memoize_context.shared
+    memoize_context.current_span.set_attribute.assert_not_called()
+
+
+def test_memoize_tool_calls_copies_results(memoize_context):
+    """Test that modifying a returned result does not affect the memoized one."""
+
+    @cacheable
+    def search(keyphrase: str) -> list[dict]:
+        return [{"name": keyphrase}]
+
+    callback = MemoizeToolCalls()
+    _execute_tool(callback, memoize_context, search, "slack")[0]["name"] = "modified"
+
+    assert _execute_tool(callback, memoize_context, search, "slack") == [{"name": "slack"}]
+
+
+async def test_cacheable_async_tool(memoize_context):
+    """Test that async tools stay coroutine functions, and are memoized."""
+    calls = []
+
+    async def search(keyphrase: str) -> list[str]:
+        """Search."""
+        calls.append(keyphrase)
+        return [keyphrase]
+
+    memoized_search = cacheable(search)
+    assert inspect.iscoroutinefunction(memoized_search)
+    assert memoized_search.__name__ == "search"
+    assert memoized_search.__doc__ == "Search."
+
+    callback = MemoizeToolCalls()
+    for _ in range(2):
+        context = callback.before_tool_execution(memoize_context)
+        assert await memoized_search(keyphrase="slack") == ["slack"]
+        callback.after_tool_execution(context, None)
+
+    assert calls == ["slack"]
+
+
+def test_cacheable_tool_outside_of_a_run():
+    """Test that a cacheable tool is executed as usual when no MemoizeToolCalls callback is in use."""
+    calls = []
+
+    @cacheable
+    def read(name: str) -> str:
+        calls.append(name)
+        return name
+
+    assert read("a") == read("a") == "a"
+    assert calls == ["a", "a"]
+
+
+def _llm_response(tool_calls: list[tuple[str, dict]] | None = None, content: str | None = None) -> ModelResponse:
+    message = {"role": "assistant", "content": content}
+    if tool_calls:
+        message["tool_calls"] = [
+            {"id": f"call_{i}", "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+            for i, (name, arguments) in enumerate(tool_calls)
+        ]
+    return ModelResponse(choices=[{"message": message, "finish_reason": "stop"}])
+
+
+async def test_concurrent_tool_calls_run_in_parallel(monkeypatch):
+    """Test that the tool calls of one LLM response run concurrently, and that their results keep the original order."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+
+    def wait_and_echo(label: str, delay: float) -> str:
+        """Wait for `delay` seconds, then return `label`."""
+        time.sleep(delay)
+        return label
+
+    labels = ["first", "second", "third"]
+    responses = [
+        _llm_response(tool_calls=[("wait_and_echo", {"label": label, "delay": 0.5}) for label in labels]),
+        _llm_response(content="done"),
+    ]
+    tools = [parallelizable(wait_and_echo)]
+    agent = await AnyAgent.create_async(
+        "tinyagent",
+        AgentConfig(model_id="openai/gpt-4o-mini", tools=tools, callbacks=[ConcurrentToolCalls(tools)]),
+    )
+
+    with (
+        patch("any_agent.frameworks.tinyagent.acompletion", AsyncMock(side_effect=responses)) as mock_completion,
+        # Don't write the spans of this run to the traces dir, if the A2A server tracing was set up by another test.
+        patch.object(JsonFileSpanExporter, "export"),
+    ):
+        start = time.perf_counter()
+        await agent.run_async("Echo the labels")
+        elapsed = time.perf_counter() - start
+
+    assert elapsed < 1.0
+    messages = mock_completion.call_args.kwargs["messages"]
+    assert [message["content"] for message in messages if message["role"] == "tool"] == labels
+
+
+async def test_concurrent_tool_calls_skip_memoized_calls(monkeypatch):
+    """Test that the calls already memoized in the run are served from the memo, instead of being started again."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    executed = []
+
+    def fetch(key: str) -> str:
+        """Return the value of `key`."""
+        executed.append(key)
+        return f"value of {key}"
+
+    responses = [
+        _llm_response(tool_calls=[("fetch", {"key": "a"})]),
+        _llm_response(tool_calls=[("fetch", {"key": "a"}), ("fetch", {"key": "b"})]),
+        _llm_response(content="done"),
+    ]
+    tools = [cacheable(parallelizable(fetch))]
+    agent = await AnyAgent.create_async(
+        "tinyagent",
+        AgentConfig(
+            model_id="openai/gpt-4o-mini", tools=tools, callbacks=[MemoizeToolCalls(), ConcurrentToolCalls(tools)]
+        ),
+    )
+
+    with (
+        patch("any_agent.frameworks.tinyagent.acompletion", AsyncMock(side_effect=responses)) as mock_completion,
+        patch.object(JsonFileSpanExporter, "export"),
+    ):
+        await agent.run_async("Fetch the values")
+
+    assert executed == ["a", "b"]
+    messages = mock_completion.call_args.kwargs["messages"]
+    assert [message["content"] for message in messages if message["role"] == "tool"] == [
+        "value of a",
+        "value of a",
+        "value of b",
+    ]
+
+
+async def test_concurrent_tool_calls_started_after_guards(monkeypatch):
+    """Test that a callback stopping the run before the first tool execution keeps every call of the turn from running."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    executed = []
+
+    def fetch(key: str) -> str:
+        """Return the value of `key`."""
+        executed.append(key)
+        return f"value of {key}"
+
+    class StopBeforeTools(Callback):
+        def before_tool_execution(self, context, *args, **kwargs):
+            raise RuntimeError("Reached agent budget limit")
+
+    tools = [parallelizable(fetch)]
+    agent = await AnyAgent.create_async(
+        "tinyagent",
+        AgentConfig(
+            model_id="openai/gpt-4o-mini", tools=tools, callbacks=[StopBeforeTools(), ConcurrentToolCalls(tools)]
+        ),
+    )
+
+    responses = [_llm_response(tool_calls=[("fetch", {"key": "a"}), ("fetch", {"key": "b"})])]
+    with (
+        patch("any_agent.frameworks.tinyagent.acompletion", AsyncMock(side_effect=responses)),
+        patch.object(JsonFileSpanExporter, "export"),
+        pytest.raises(AgentRunError),
+    ):
+        await agent.run_async("Fetch the values")
+    await asyncio.sleep(0.1)
+
+    assert executed == []
+
+
+async def test_concurrent_tool_calls_record_execution_time():
+    """Test that the execution time of a call is recorded on its span, apart from the time spent waiting for it."""
+
+    def wait() -> str:
+        """Wait for a moment."""
+        time.sleep(0.1)
+        return "done"
+
+    tool = parallelizable(wait)
+    callback = ConcurrentToolCalls([tool])
+    context = MagicMock()
+    context.shared = {}
+
+    callback.before_tool_execution(context)
+    assert await tool() == "done"
+    callback.after_tool_execution(context, "done")
+
+    name, execution_seconds = context.current_span.set_attribute.call_args.args
+    assert name == TOOL_EXECUTION_ATTRIBUTE
+    assert 0.1 <= execution_seconds < 0.5
+
+
+def test_concurrent_tool_calls_resolve_tools_per_agent():
+    """Test that the parallelizable tools are resolved from the tools of each agent, through their wrappers."""
+
+    def make_fetch(source: str):
+        def fetch(key: str) -> str:
+            return f"{source}: {key}"
+
+        return fetch
+
+    fetch_a, fetch_b = make_fetch("a"), make_fetch("b")
+
+    assert ConcurrentToolCalls([cacheable(parallelizable(fetch_a))]).parallelizable_tools == {"fetch": fetch_a}
+    assert ConcurrentToolCalls([parallelizable(fetch_b)]).parallelizable_tools == {"fetch": fetch_b}
+    assert ConcurrentToolCalls([fetch_a]).parallelizable_tools == {}
+
+
+async def test_parallelizable_tool_called_directly():
+    """Test that a parallelizable sync tool becomes a coroutine function, run in the tool thread pool."""
+
+    def current_thread_name() -> str:
+        """Return the name of the thread running the tool."""
+        return threading.current_thread().name
+
+    tool = parallelizable(current_thread_name)
+
+    assert inspect.iscoroutinefunction(tool)
+    assert tool.__doc__ == "Return the name of the thread running the tool."
+    assert (await tool()).startswith("tool-call")
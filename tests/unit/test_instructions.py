@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from agent_factory import instructions
+from agent_factory.instructions import (
+    DELIVERABLES_INSTRUCTIONS,
+    DRAFTED_README_INSTRUCTIONS,
+    INSTRUCTIONS_TEMPLATE_VERSION,
+    MULTI_STEP_INSTRUCTIONS,
+    README_INSTRUCTIONS,
+    SINGLE_STEP_INSTRUCTIONS,
+    instructions_cache_key,
+    load_system_instructions,
+)
+
+
+def test_system_instructions_share_static_prefix():
+    """Test that the instructions of every mode start with the same static prefix, and only differ at their end."""
+    instructions = [
+        load_system_instructions(chat=chat, include_tool_digest=tool_digest)
+        for chat in [True, False]
+        for tool_digest in [True, False]
+    ]
+
+    prefix = os.path.commonprefix(instructions)
+    assert DELIVERABLES_INSTRUCTIONS in prefix
+    assert len(prefix) > 0.75 * max(len(text) for text in instructions)
+    assert instructions[0].rstrip().endswith(MULTI_STEP_INSTRUCTIONS.rstrip())
+    assert instructions[-1].rstrip().endswith(SINGLE_STEP_INSTRUCTIONS.rstrip())
+
+
+def test_system_instructions_drafted_readme():
+    """Test that the agent is asked to leave the README empty when it is drafted, and the instructions keyed apart."""
+    instructions = load_system_instructions(chat=True)
+    drafted_readme_instructions = load_system_instructions(chat=True, draft_readme=True)
+
+    assert README_INSTRUCTIONS in instructions and DRAFTED_README_INSTRUCTIONS not in instructions
+    assert DRAFTED_README_INSTRUCTIONS in drafted_readme_instructions
+    assert README_INSTRUCTIONS not in drafted_readme_instructions
+    assert instructions_cache_key(chat=True, draft_readme=True) != instructions_cache_key(chat=True)
+
+
+@pytest.fixture
+def fresh_instructions_cache(monkeypatch):
+    """Clear the rendered and precompiled instructions caches, counting the renderings."""
+    renderings = []
+    render = instructions._render_system_instructions
+
+    def counting_render(chat, tool_digest, draft_readme=False):
+        renderings.append((chat, tool_digest))
+        return render(chat, tool_digest, draft_readme)
+
+    monkeypatch.setattr(instructions, "_rendered_instructions", {})
+    monkeypatch.setattr(instructions, "_render_system_instructions", counting_render)
+    instructions._precompiled_instructions.cache_clear()
+    yield renderings
+    instructions._precompiled_instructions.cache_clear()
+
+
+def test_system_instructions_rendered_once_per_key(fresh_instructions_cache, monkeypatch, tmp_path):
+    """Test that each variant of the instructions is rendered once, and has its own cache key."""
+    monkeypatch.setattr(instructions, "PRECOMPILED_INSTRUCTIONS_PATH", tmp_path / "missing.py")
+    for _ in range(3):
+        for chat in [True, False]:
+            load_system_instructions(chat=chat, include_tool_digest=True)
+
+    assert len(fresh_instructions_cache) == 2
+    keys = {
+        instructions_cache_key(chat=chat, include_tool_digest=digest)
+        for chat in [True, False]
+        for digest in [True, False]
+    }
+    assert len(keys) == 4
+    assert instructions_cache_key(chat=True).startswith(f"multi_step:{INSTRUCTIONS_TEMPLATE_VERSION}:")
+
+
+def test_precompiled_system_instructions(fresh_instructions_cache, monkeypatch, tmp_path):
+    """Test that the precompiled instructions are loaded instead of rendered, unless their key is stale."""
+    path = instructions.precompile_instructions(str(tmp_path / "precompiled.py"))
+    expected = instructions._render_system_instructions(True, None)
+    fresh_instructions_cache.clear()
+    monkeypatch.setattr(instructions, "PRECOMPILED_INSTRUCTIONS_PATH", path)
+
+    assert load_system_instructions(chat=True) == expected
+    assert load_system_instructions(chat=False, include_tool_digest=True)
+    assert fresh_instructions_cache == []
+
+    monkeypatch.setattr(instructions, "INSTRUCTIONS_TEMPLATE_VERSION", "new-version")
+    load_system_instructions(chat=True)
+    assert fresh_instructions_cache == [(True, None)]
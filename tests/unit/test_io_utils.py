@@ -3,14 +3,19 @@ from pathlib import Path
 from unittest.mock import patch
 
 import pytest
+from pydantic import ValidationError
 
 from agent_factory.instructions import AGENT_CODE_TEMPLATE
-from agent_factory.schemas import AgentParameters
+from agent_factory.schemas import AgentFactoryOutputs, AgentParameters, DraftedReadmeAgentFactoryOutputs
+from agent_factory.utils.artifact_cache import ArtifactBundleCache
 from agent_factory.utils.io_utils import (
     extract_requirements_from_string,
     get_imports_from_string,
+    iter_agent_artifacts,
     parse_cli_args_to_params_json,
     prepare_agent_artifacts,
+    prepare_agent_artifacts_async,
+    run_artifact_pipeline,
 )
 
 
@@ -49,6 +54,69 @@ def test_prepare_agent_artifacts(sample_generator_agent_response_json):
     )
 
 
+def test_run_artifact_pipeline_reports_stage_timings(sample_generator_agent_response_json):
+    """Test that the pipeline reports the wall-clock time spent in each of its stages."""
+    result = run_artifact_pipeline(sample_generator_agent_response_json)
+
+    assert set(result.stage_timings) == {"mcpd", "agent_code", "tools", "requirements"}
+    assert all(elapsed >= 0 for elapsed in result.stage_timings.values())
+    assert result.artifacts == prepare_agent_artifacts(sample_generator_agent_response_json)
+
+
+@pytest.mark.asyncio
+async def test_prepare_agent_artifacts_async_matches_sync(sample_generator_agent_response_json):
+    """Test that the async entry point produces the same artifacts as the sync one."""
+    async_artifacts = await prepare_agent_artifacts_async(sample_generator_agent_response_json)
+
+    assert async_artifacts == prepare_agent_artifacts(sample_generator_agent_response_json)
+    assert list(async_artifacts)[0] == "agent.py"
+    assert list(async_artifacts)[-1] == ".gitignore"
+
+
+@pytest.mark.asyncio
+async def test_iter_agent_artifacts(sample_generator_agent_response_json, tmp_path):
+    """Test that the streamed artifacts match the prepared ones, the files needing no preparation first."""
+    cache = ArtifactBundleCache(tmp_path)
+    streamed = [artifact async for artifact in iter_agent_artifacts(sample_generator_agent_response_json, cache=cache)]
+    cached = [artifact async for artifact in iter_agent_artifacts(sample_generator_agent_response_json, cache=cache)]
+
+    expected_artifacts = prepare_agent_artifacts(sample_generator_agent_response_json)
+    assert dict(streamed) == expected_artifacts
+    assert [path for path, _ in streamed[:3]] == ["README.md", "agent_parameters.json", ".gitignore"]
+    assert streamed[-1][0] == "requirements.txt"
+    assert dict(cached) == expected_artifacts
+
+
+@pytest.mark.asyncio
+async def test_readme_drafted_when_left_empty(sample_generator_agent_response_json, monkeypatch):
+    """Test that the README the agent left empty is drafted with the routed model, by every preparation path."""
+    drafted_from = []
+
+    def draft_readme(agent_factory_outputs):
+        drafted_from.append(agent_factory_outputs["agent_description"])
+        return "# Drafted README"
+
+    monkeypatch.setattr("agent_factory.utils.io_utils.draft_readme", draft_readme)
+    outputs = sample_generator_agent_response_json | {"readme": ""}
+
+    artifacts = prepare_agent_artifacts(outputs)
+    streamed = dict([artifact async for artifact in iter_agent_artifacts(outputs)])
+
+    assert artifacts["README.md"] == "# Drafted README"
+    assert streamed == artifacts
+    assert drafted_from == [outputs["agent_description"]] * 2
+    assert prepare_agent_artifacts(sample_generator_agent_response_json)["README.md"] != "# Drafted README"
+
+
+def test_readme_required_unless_drafted(sample_generator_agent_response_json):
+    """Test that the agent may only leave out the `readme` with the output type of the README drafting."""
+    outputs = {k: v for k, v in sample_generator_agent_response_json.items() if k != "readme"}
+
+    with pytest.raises(ValidationError, match="readme"):
+        AgentFactoryOutputs.model_validate(outputs)
+    assert DraftedReadmeAgentFactoryOutputs.model_validate(outputs).readme == ""
+
+
 @pytest.mark.parametrize(
     "cli_args_str, expected_params",
     [
@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+from any_llm.types.completion import ChatCompletion, ChatCompletionChunk
+from pydantic import BaseModel
+
+import agent_factory.utils.model_routing as model_routing
+from agent_factory.utils.llm_cassette import (
+    CassetteMissError,
+    LLMCassette,
+    install_cassette,
+    normalize_request,
+    uninstall_cassette,
+)
+
+
+def _completion(content: str) -> ChatCompletion:
+    return ChatCompletion.model_validate(
+        {
+            "id": "chatcmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-4o-mini",
+            "choices": [
+                {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}},
+            ],
+        }
+    )
+
+
+def _chunks(content: str) -> list[ChatCompletionChunk]:
+    return [
+        ChatCompletionChunk.model_validate(
+            {
+                "id": "chatcmpl-1",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": "gpt-4o-mini",
+                "choices": [{"index": 0, "delta": {"content": token}}],
+            }
+        )
+        for token in content.split()
+    ]
+
+
+class FakeModel:
+    """Answers every request with the number of calls it received so far."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def acompletion(self, **params):
+        self.calls += 1
+        if params.get("stream"):
+
+            async def stream():
+                for chunk in _chunks(f"streamed call {self.calls}"):
+                    yield chunk
+
+            return stream()
+        return _completion(f"call {self.calls}")
+
+    def completion(self, **params):
+        self.calls += 1
+        return _completion(f"call {self.calls}")
+
+
+MESSAGES = [{"role": "user", "content": "build an agent"}]
+
+
+def test_cassette_records_and_replays(tmp_path):
+    """Test that recorded responses are replayed without calling the model, repeated requests in their order."""
+    model = FakeModel()
+    path = tmp_path / "cassette.jsonl"
+    recorder = LLMCassette(path, mode="record").wrap(model.acompletion)
+    asyncio.run(recorder(model="gpt-4o-mini", messages=MESSAGES, api_key="secret"))
+    asyncio.run(recorder(model="gpt-4o-mini", messages=MESSAGES))
+    asyncio.run(recorder(model="gpt-4o", messages=MESSAGES))
+    assert "secret" not in path.read_text()
+
+    cassette = LLMCassette(path, mode="replay")
+    assert len(cassette) == 3
+    replayer = cassette.wrap(model.acompletion)
+    responses = [
+        asyncio.run(replayer(model="gpt-4o-mini", messages=MESSAGES, api_key="other")),
+        asyncio.run(replayer(model="gpt-4o", messages=MESSAGES)),
+        asyncio.run(replayer(model="gpt-4o-mini", messages=MESSAGES)),
+        asyncio.run(replayer(model="gpt-4o-mini", messages=MESSAGES)),
+    ]
+
+    assert model.calls == 3
+    assert [response.choices[0].message.content for response in responses] == ["call 1", "call 3", "call 2", "call 2"]
+    assert all(isinstance(response, ChatCompletion) for response in responses)
+    with pytest.raises(CassetteMissError):
+        asyncio.run(replayer(model="gpt-4o-mini", messages=[{"role": "user", "content": "other"}]))
+
+
+def test_cassette_streamed_responses(tmp_path):
+    """Test that streamed responses are recorded chunk by chunk, and replayed as a stream."""
+
+    async def consume(completion):
+        response = await completion(model="gpt-4o-mini", messages=MESSAGES, stream=True)
+        return [chunk async for chunk in response]
+
+    model = FakeModel()
+    path = tmp_path / "cassette.jsonl"
+    recorded = asyncio.run(consume(LLMCassette(path, mode="record").wrap(model.acompletion)))
+    replayed = asyncio.run(consume(LLMCassette(path, mode="replay").wrap(model.acompletion)))
+
+    assert model.calls == 1
+    assert [chunk.choices[0].delta.content for chunk in replayed] == ["streamed", "call", "1"]
+    assert replayed == recorded
+
+
+def test_normalize_request():
+    """Test that the request keys ignore credentials, unset parameters and tool results."""
+
+    class Output(BaseModel):
+        code: str
+
+    request = normalize_request(
+        {
+            "model": "gpt-4o-mini",
+            "messages": [*MESSAGES, {"role": "tool", "tool_call_id": "call_1", "content": "<html>...</html>"}],
+            "response_format": Output,
+            "api_key": "secret",
+            "temperature": None,
+        }
+    )
+
+    assert request == {
+        "model": "gpt-4o-mini",
+        "messages": [*MESSAGES, {"role": "tool", "tool_call_id": "call_1"}],
+        "response_format": Output.model_json_schema(),
+    }
+
+
+def test_install_cassette(tmp_path, monkeypatch):
+    """Test that the routed completions go through the installed cassette, until it is uninstalled."""
+    model = FakeModel()
+    monkeypatch.setattr(model_routing, "completion", model.completion)
+    path = tmp_path / "cassette.jsonl"
+
+    install_cassette(path, mode="record")
+    try:
+        model_routing.completion(model="gpt-4o-mini", messages=MESSAGES)
+        install_cassette(path, mode="replay")
+        response = model_routing.completion(model="gpt-4o-mini", messages=MESSAGES)
+    finally:
+        uninstall_cassette()
+
+    assert model.calls == 1
+    assert response.choices[0].message.content == "call 1"
+    assert model_routing.completion == model.completion
+
+
+def test_cassette_invalid_mode(tmp_path):
+    with pytest.raises(ValueError, match="Unknown cassette mode"):
+        LLMCassette(tmp_path / "cassette.jsonl", mode="rewind")
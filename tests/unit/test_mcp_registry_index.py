@@ -0,0 +1,259 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from agent_factory.utils import mcp_registry
+from agent_factory.utils.mcp_registry_index import RegistryIndex, tokenize
+from agent_factory.utils.mcp_registry_snapshot import read_registry_snapshot, write_registry_snapshot
+
+SERVERS = [
+    {
+        "name": "slack",
+        "description": "Channel management and messaging capabilities",
+        "license": "MIT",
+        "isOfficial": True,
+        "tools": [{"name": "slack_post_message"}, {"name": "slack_list_channels"}],
+        "categories": ["Messaging"],
+        "tags": ["chat", "team"],
+    },
+    {
+        "name": "google-calendar",
+        "description": "Manage Google Calendar events",
+        "license": "Apache-2.0",
+        "tools": [{"name": "list_events"}, {"name": "create_event"}],
+        "categories": ["Productivity"],
+        "tags": ["calendar", "google"],
+    },
+    {
+        "name": "gmail",
+        "description": "Read and send Google mail, and share calendar invites",
+        "license": "MIT",
+        "tools": [{"name": "send_email"}],
+        "categories": ["Messaging", "Productivity"],
+        "tags": ["email", "google"],
+    },
+]
+
+
+@pytest.fixture
+def index() -> RegistryIndex:
+    return RegistryIndex(SERVERS, version="v1")
+
+
+def test_tokenize():
+    """Test that text is split into lowercase alphanumeric terms."""
+    assert tokenize("Google-Calendar MCP, slack_post_message") == [
+        "google",
+        "calendar",
+        "mcp",
+        "slack",
+        "post",
+        "message",
+    ]
+
+
+def test_search_ranks_best_match_first(index):
+    """Test that servers matching every term are returned, the most relevant first."""
+    results = index.search("google calendar")
+
+    assert [server["name"] for server in results] == ["google-calendar", "gmail"]
+
+
+def test_search_relevance_cutoff(index):
+    """Test that servers scoring much lower than the best match are left out."""
+    assert [server["name"] for server in index.search("google calendar", min_relative_score=0.99)] == [
+        "google-calendar"
+    ]
+
+
+def test_search_requires_every_term(index):
+    """Test that a server matching only some of the terms is not returned."""
+    assert [server["name"] for server in index.search("slack calendar")] == []
+
+
+def test_search_matches_tool_names_and_prefixes(index):
+    """Test that tool names are indexed and that terms match as prefixes of longer words."""
+    assert [server["name"] for server in index.search("post")] == ["slack"]
+    assert [server["name"] for server in index.search("calend")] == ["google-calendar", "gmail"]
+
+
+def test_search_wildcard_keeps_registry_order(index):
+    """Test that the wildcard returns every server matching the filters, in registry order."""
+    assert [server["name"] for server in index.search("*")] == ["slack", "google-calendar", "gmail"]
+    assert [server["name"] for server in index.search("*", license="mit")] == ["slack", "gmail"]
+
+
+@pytest.mark.parametrize(
+    ("filters", "expected"),
+    [
+        ({"license": "apache"}, ["google-calendar"]),
+        ({"categories": ["messag"]}, ["slack", "gmail"]),
+        ({"categories": ["messaging", "productivity"]}, ["gmail"]),
+        ({"tags": ["google"]}, ["google-calendar", "gmail"]),
+        ({"is_official": True}, ["slack"]),
+        ({"license": "GPL"}, []),
+    ],
+)
+def test_search_filters(index, filters, expected):
+    """Test that the license, category, tag and official filters narrow the results."""
+    assert sorted(server["name"] for server in index.search("*", **filters)) == sorted(expected)
+
+
+@pytest.fixture
+def registry_state(tmp_path):
+    mcp_registry.clear_registry_cache()
+    with patch.object(mcp_registry, "MCP_REGISTRY_SNAPSHOT_PATH", tmp_path / "mcp_registry.json"):
+        yield tmp_path / "mcp_registry.json"
+    mcp_registry.clear_registry_cache()
+
+
+def test_get_registry_index_loads_once(registry_state):
+    """Test that the registry is fetched on first access only."""
+    with patch.object(mcp_registry, "fetch_registry_servers", return_value=SERVERS) as mock_fetch:
+        first = mcp_registry.get_registry_index()
+        second = mcp_registry.get_registry_index()
+
+    assert first is second
+    assert mock_fetch.call_count == 1
+    assert mcp_registry.get_registry_server("gmail") == SERVERS[2]
+    assert mcp_registry.registry_version() == first.version
+
+
+def test_get_registry_index_shares_first_load(registry_state):
+    """Test that concurrent first accesses share a single fetch, which runs without holding the lock of the index."""
+    fetching, release = threading.Event(), threading.Event()
+
+    def fetch():
+        fetching.set()
+        assert release.wait(timeout=5)
+        return SERVERS
+
+    with patch.object(mcp_registry, "fetch_registry_servers", side_effect=fetch) as mock_fetch:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            loads = [executor.submit(mcp_registry.get_registry_index) for _ in range(3)]
+            assert fetching.wait(timeout=5)
+            assert not mcp_registry._state.lock.locked()
+            assert not mcp_registry.registry_index_loaded()
+            release.set()
+            indexes = [load.result(timeout=5) for load in loads]
+
+    assert mock_fetch.call_count == 1
+    assert all(index is indexes[0] for index in indexes)
+
+
+def test_get_registry_index_first_load_failure_is_shared(registry_state):
+    """Test that the callers waiting on a failed first load get its error, and that the next access loads again."""
+    with patch.object(mcp_registry, "fetch_registry_servers", side_effect=RuntimeError("Subprocess failed")):
+        with pytest.raises(RuntimeError, match="Subprocess failed"):
+            mcp_registry.get_registry_index()
+    assert mcp_registry._state.loading is None
+
+    with patch.object(mcp_registry, "fetch_registry_servers", return_value=SERVERS):
+        assert len(mcp_registry.get_registry_index()) == len(SERVERS)
+
+
+@pytest.mark.asyncio
+async def test_get_registry_index_async_fetches_in_event_loop(registry_state):
+    """Test that the async first access fetches the registry with `run_binary_async`, shared by concurrent callers."""
+    with patch.object(
+        mcp_registry, "run_binary_async", new_callable=AsyncMock, return_value={"results": SERVERS}
+    ) as mock_run:
+        first, second = await asyncio.gather(
+            mcp_registry.get_registry_index_async(), mcp_registry.get_registry_index_async()
+        )
+
+    mock_run.assert_awaited_once_with("mcpd", ["search", "*", "--format=json"])
+    assert first is second
+    assert mcp_registry.get_registry_index() is first
+    assert read_registry_snapshot(registry_state).servers == SERVERS
+
+
+def test_get_registry_index_refreshes_in_background(registry_state):
+    """Test that a stale index keeps being served while a fresh one is built in the background."""
+    refreshed = threading.Event()
+    updated_servers = [*SERVERS, {"name": "sqlite", "description": "SQLite database"}]
+
+    def fetch():
+        if mock_fetch.call_count > 1:
+            refreshed.set()
+            return updated_servers
+        return SERVERS
+
+    with patch.object(mcp_registry, "fetch_registry_servers", side_effect=fetch) as mock_fetch:
+        stale = mcp_registry.get_registry_index()
+        assert mcp_registry.get_registry_index(ttl=0) is stale
+        assert refreshed.wait(timeout=5)
+        mcp_registry._state.refresh_thread.join(timeout=5)
+
+    fresh = mcp_registry.get_registry_index()
+    assert len(fresh) == len(updated_servers)
+    assert fresh.version != stale.version
+
+
+def test_get_registry_index_warm_starts_from_snapshot(registry_state):
+    """Test that the registry is persisted when fetched, and loaded from the snapshot without fetching it again."""
+    with patch.object(mcp_registry, "fetch_registry_servers", return_value=SERVERS):
+        fetched = mcp_registry.get_registry_index()
+    assert registry_state.exists()
+
+    mcp_registry.clear_registry_cache()
+    with patch.object(mcp_registry, "fetch_registry_servers", side_effect=RuntimeError("Subprocess failed")) as mock:
+        restored = mcp_registry.get_registry_index()
+
+    mock.assert_not_called()
+    assert restored.version == fetched.version
+    assert restored.servers_by_name == fetched.servers_by_name
+
+
+def test_get_registry_index_refreshes_stale_snapshot(registry_state):
+    """Test that an index loaded from a snapshot older than the TTL is refreshed in the background."""
+    write_registry_snapshot(SERVERS, registry_state)
+
+    with patch.object(mcp_registry, "fetch_registry_servers", return_value=SERVERS[:1]) as mock_fetch:
+        mcp_registry.get_registry_index(ttl=3600)
+        mock_fetch.assert_not_called()
+        with patch("agent_factory.utils.mcp_registry_snapshot.time.time", return_value=time.time() + 7200):
+            mcp_registry.clear_registry_cache()
+            stale = mcp_registry.get_registry_index(ttl=3600)
+            mcp_registry.get_registry_index(ttl=3600)
+        mcp_registry._state.refresh_thread.join(timeout=5)
+
+    assert len(stale) == len(SERVERS)
+    assert len(mcp_registry.get_registry_index()) == 1
+
+
+@pytest.mark.parametrize("content", ["", "not json", '{"format_version": 0, "servers": []}', '{"format_version": 1}'])
+def test_get_registry_index_ignores_invalid_snapshot(registry_state, content):
+    """Test that the registry is fetched when the snapshot is invalid or has another format version."""
+    registry_state.write_text(content)
+
+    with patch.object(mcp_registry, "fetch_registry_servers", return_value=SERVERS) as mock_fetch:
+        index = mcp_registry.get_registry_index()
+
+    mock_fetch.assert_called_once()
+    assert len(index) == len(SERVERS)
+    assert read_registry_snapshot(registry_state).servers == SERVERS
+
+
+def test_get_registry_index_without_snapshot_raises(registry_state):
+    """Test that a registry fetch failure is raised when there is no snapshot to load instead."""
+    with (
+        patch.object(mcp_registry, "fetch_registry_servers", side_effect=RuntimeError("Subprocess failed")),
+        pytest.raises(RuntimeError, match="Subprocess failed"),
+    ):
+        mcp_registry.get_registry_index()
+
+
+def test_build_registry_snapshot(tmp_path):
+    """Test that the snapshot can be built on demand at a given path."""
+    snapshot_path = tmp_path / "snapshot.json"
+    with patch.object(mcp_registry, "fetch_registry_servers", return_value=SERVERS):
+        mcp_registry.build_registry_snapshot(str(snapshot_path))
+
+    snapshot = read_registry_snapshot(snapshot_path)
+    assert snapshot.servers == SERVERS
+    assert snapshot.age < 60
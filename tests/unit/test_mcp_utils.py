@@ -1,14 +1,18 @@
+import asyncio
 import subprocess
+import sys
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
 
 from agent_factory.utils.mcpd_utils import (
+    DEFAULT_BINARY_TIMEOUT,
     export_mcpd_config_artifacts,
     initialize_mcp_config,
     register_mcp_server,
     run_binary,
+    run_binary_async,
 )
 
 
@@ -140,7 +144,7 @@ class TestExportMcpdConfigArtifacts:
             ]
         }
 
-        result = export_mcpd_config_artifacts(agent_factory_outputs)
+        result = export_mcpd_config_artifacts(agent_factory_outputs, use_binary=True)
 
         assert result == {
             ".mcpd.toml": "mcpd toml content",
@@ -187,7 +191,7 @@ class TestExportMcpdConfigArtifacts:
         agent_factory_outputs = {"mcp_servers": [{"name": "github"}]}
 
         with pytest.raises(RuntimeError, match="Failed to export MCP config"):
-            export_mcpd_config_artifacts(agent_factory_outputs)
+            export_mcpd_config_artifacts(agent_factory_outputs, use_binary=True)
 
     @patch("agent_factory.utils.mcpd_utils.Path")
     @patch("agent_factory.utils.mcpd_utils.run_binary")
@@ -213,7 +217,7 @@ class TestExportMcpdConfigArtifacts:
 
         agent_factory_outputs = {"mcp_servers": [{"name": "github"}]}
 
-        result = export_mcpd_config_artifacts(agent_factory_outputs, output_dir=output_dir)
+        result = export_mcpd_config_artifacts(agent_factory_outputs, output_dir=output_dir, use_binary=True)
 
         assert result is not None
         assert ".mcpd.toml" in result
@@ -223,6 +227,35 @@ class TestExportMcpdConfigArtifacts:
         mock_init_config.assert_called_once_with(self.mock_mcpd_toml)
         mock_register_server.assert_called_once_with("github", config_path=self.mock_mcpd_toml, tools=None)
 
+    @patch("agent_factory.utils.mcpd_utils.run_binary")
+    def test_export_in_process_by_default(self, mock_run_binary, tmp_path):
+        """Test that the artifacts are generated in-process, without running mcpd, by default."""
+        generated = {".mcpd.toml": "config", ".env": "contract", "secrets.prod.toml": "context"}
+        with patch(
+            "agent_factory.utils.mcpd_config.generate_mcpd_config_artifacts", return_value=generated
+        ) as mock_generate:
+            result = export_mcpd_config_artifacts({"mcp_servers": [{"name": "github"}]}, output_dir=tmp_path)
+
+        assert result == generated
+        mock_generate.assert_called_once_with([{"name": "github"}])
+        mock_run_binary.assert_not_called()
+        assert (tmp_path / ".env").read_text() == "contract"
+
+    @patch("agent_factory.utils.mcpd_utils._export_mcpd_config_artifacts_with_binary")
+    def test_export_falls_back_to_binary(self, mock_export_with_binary):
+        """Test that the mcpd binary is used when the in-process generation fails."""
+        mock_export_with_binary.return_value = {".mcpd.toml": "config"}
+        mcp_servers = [{"name": "unknown-server"}]
+
+        with patch(
+            "agent_factory.utils.mcpd_config.generate_mcpd_config_artifacts",
+            side_effect=KeyError("MCP server 'unknown-server' not found in the registry"),
+        ):
+            result = export_mcpd_config_artifacts({"mcp_servers": mcp_servers})
+
+        assert result == {".mcpd.toml": "config"}
+        mock_export_with_binary.assert_called_once_with(mcp_servers, None)
+
 
 class TestRunBinary:
     """Tests for run_binary function."""
@@ -239,7 +272,7 @@ class TestRunBinary:
 
         assert result == {"key": "value"}
         mock_subprocess_run.assert_called_once_with(
-            ["path/to/binary", "arg1"], capture_output=True, text=True, check=True
+            ["path/to/binary", "arg1"], capture_output=True, text=True, check=True, timeout=DEFAULT_BINARY_TIMEOUT
         )
 
     @patch("subprocess.run")
@@ -253,7 +286,7 @@ class TestRunBinary:
 
         assert result == {"return_code": 0}
         mock_subprocess_run.assert_called_once_with(
-            ["path/to/binary", "arg1"], capture_output=True, text=True, check=True
+            ["path/to/binary", "arg1"], capture_output=True, text=True, check=True, timeout=DEFAULT_BINARY_TIMEOUT
         )
 
     @patch("subprocess.run")
@@ -290,3 +323,108 @@ class TestRunBinary:
 
         with pytest.raises(RuntimeError, match="An unexpected error occurred during binary execution"):
             run_binary("path/to/binary", ["arg1"])
+
+    @patch("subprocess.run")
+    def test_run_binary_timeout(self, mock_subprocess_run):
+        """Test that RuntimeError is raised when the binary does not complete in time."""
+        mock_subprocess_run.side_effect = subprocess.TimeoutExpired(cmd="cmd", timeout=1)
+
+        with pytest.raises(RuntimeError, match="Binary timed out"):
+            run_binary("path/to/binary", ["arg1"], timeout=1)
+
+
+class TestRunBinaryAsync:
+    """Tests for run_binary_async function, using the Python interpreter as binary."""
+
+    async def test_run_binary_async_success(self):
+        """Test successful binary execution with JSON output."""
+        result = await run_binary_async(sys.executable, ["-c", 'print(\'{"key": "value"}\')'])
+
+        assert result == {"key": "value"}
+
+    async def test_run_binary_async_ignore_response(self):
+        """Test that STDOUT is ignored and the return code is returned."""
+        result = await run_binary_async(sys.executable, ["-c", "print('not json')"], ignore_response=True)
+
+        assert result == {"return_code": 0}
+
+    async def test_run_binary_async_non_zero_exit(self):
+        """Test that RuntimeError is raised on a non-zero exit code."""
+        with pytest.raises(RuntimeError, match="Subprocess failed"):
+            await run_binary_async(sys.executable, ["-c", "import sys; sys.exit(3)"])
+
+    async def test_run_binary_async_json_decode_error(self):
+        """Test that ValueError is raised on invalid JSON output."""
+        with pytest.raises(ValueError, match="Invalid JSON output"):
+            await run_binary_async(sys.executable, ["-c", "print('not json')"])
+
+    async def test_run_binary_async_file_not_found(self):
+        """Test that RuntimeError is raised when the binary does not exist."""
+        with pytest.raises(RuntimeError, match="Binary not found"):
+            await run_binary_async("path/to/missing/binary", ["arg1"])
+
+    @pytest.fixture
+    def spawned_processes(self):
+        """Record the processes spawned by run_binary_async."""
+        processes = []
+        original_create_subprocess_exec = asyncio.create_subprocess_exec
+
+        async def recording_create_subprocess_exec(*args, **kwargs):
+            process = await original_create_subprocess_exec(*args, **kwargs)
+            processes.append(process)
+            return process
+
+        with patch("asyncio.create_subprocess_exec", side_effect=recording_create_subprocess_exec):
+            yield processes
+
+    async def test_run_binary_async_timeout_kills_process(self, spawned_processes):
+        """Test that a binary running past its timeout is killed and RuntimeError is raised."""
+        with pytest.raises(RuntimeError, match="Binary timed out"):
+            await run_binary_async(sys.executable, ["-c", "import time; time.sleep(30)"], timeout=0.5)
+
+        assert spawned_processes[0].returncode is not None
+
+    async def test_run_binary_async_cancellation_kills_process(self, spawned_processes):
+        """Test that cancelling the call kills the running binary."""
+        task = asyncio.create_task(run_binary_async(sys.executable, ["-c", "import time; time.sleep(30)"]))
+        while not spawned_processes:
+            await asyncio.sleep(0.05)
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert spawned_processes[0].returncode is not None
+
+    async def test_run_binary_async_bounded_concurrency(self):
+        """Test that no more than MAX_CONCURRENT_BINARY_RUNS binaries run at the same time."""
+        running, max_running = 0, 0
+        original_create_subprocess_exec = asyncio.create_subprocess_exec
+
+        async def tracking_create_subprocess_exec(*args, **kwargs):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            process = await original_create_subprocess_exec(*args, **kwargs)
+            original_communicate = process.communicate
+
+            async def communicate():
+                nonlocal running
+                try:
+                    return await original_communicate()
+                finally:
+                    running -= 1
+
+            process.communicate = communicate
+            return process
+
+        with (
+            patch("agent_factory.utils.mcpd_utils.MAX_CONCURRENT_BINARY_RUNS", 2),
+            patch("asyncio.create_subprocess_exec", side_effect=tracking_create_subprocess_exec),
+        ):
+            results = await asyncio.gather(
+                *(run_binary_async(sys.executable, ["-c", "import time; time.sleep(0.2); print(1)"]) for _ in range(5))
+            )
+
+        assert results == [1] * 5
+        assert max_running == 2
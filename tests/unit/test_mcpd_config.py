@@ -0,0 +1,192 @@
+import json
+import shutil
+import tomllib
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from agent_factory.utils.mcpd_config import (
+    _cached_server_fragment,
+    build_server_entry,
+    generate_mcpd_config_artifacts,
+    get_server_fragment,
+    register_mcp_servers,
+    select_installation,
+)
+from agent_factory.utils.mcpd_utils import export_mcpd_config_artifacts
+
+UNIT_TESTS_DATA_DIR = Path(__file__).parent / "data"
+ARTIFACTS_DIR = Path(__file__).parent.parent / "artifacts"
+
+# MCP servers used by the generated agents in `tests/artifacts`, whose mcpd files were produced by the mcpd binary.
+GOLDEN_MCP_SERVERS = {
+    "url-to-podcast": [{"name": "elevenlabs-mcp", "tools": ["text_to_speech"]}],
+    "scoring-blueprints-submission": [
+        {"name": "slack", "tools": ["slack_list_channels", "slack_post_message"]},
+        {"name": "sqlite", "tools": ["write_query"]},
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def sample_mcp_registry() -> dict[str, dict]:
+    with (UNIT_TESTS_DATA_DIR / "sample_mcp_registry.json").open() as f:
+        return {server["name"]: server for server in json.load(f)["results"]}
+
+
+def _normalize_mcpd_toml(content: str) -> dict:
+    """Sort the tools and required argument lists, whose order in the mcpd output is not stable."""
+    config = tomllib.loads(content)
+    for server in config["servers"]:
+        for field, values in server.items():
+            if field == "tools" or field.startswith("required_"):
+                server[field] = sorted(values)
+    return config
+
+
+@pytest.mark.parametrize("prompt_id", list(GOLDEN_MCP_SERVERS))
+def test_generate_matches_mcpd_binary_output(prompt_id, sample_mcp_registry):
+    """Test that the generated files are equivalent to the ones the mcpd binary produced for the same servers."""
+    artifacts = generate_mcpd_config_artifacts(GOLDEN_MCP_SERVERS[prompt_id], get_server=sample_mcp_registry.get)
+
+    golden_dir = ARTIFACTS_DIR / prompt_id
+    assert _normalize_mcpd_toml(artifacts[".mcpd.toml"]) == _normalize_mcpd_toml(
+        (golden_dir / ".mcpd.toml").read_text()
+    )
+    assert artifacts[".env"] == (golden_dir / ".env").read_text()
+    assert artifacts["secrets.prod.toml"] == (golden_dir / "secrets.prod.toml").read_text()
+
+
+@pytest.mark.skipif(shutil.which("mcpd") is None, reason="requires the mcpd binary")
+@pytest.mark.parametrize("prompt_id", list(GOLDEN_MCP_SERVERS))
+def test_generate_matches_live_mcpd_binary(prompt_id):
+    """Test the in-process generation against the output of the installed mcpd binary and its live registry."""
+    outputs = {"mcp_servers": GOLDEN_MCP_SERVERS[prompt_id]}
+
+    native = export_mcpd_config_artifacts(outputs)
+    binary = export_mcpd_config_artifacts(outputs, use_binary=True)
+
+    assert _normalize_mcpd_toml(native[".mcpd.toml"]) == _normalize_mcpd_toml(binary[".mcpd.toml"])
+    assert native[".env"] == binary[".env"]
+    assert tomllib.loads(native["secrets.prod.toml"]) == tomllib.loads(binary["secrets.prod.toml"])
+
+
+def test_build_server_entry_defaults_to_all_tools(sample_mcp_registry):
+    """Test that all the server tools are allowed when no subset is requested."""
+    server = sample_mcp_registry["slack"]
+
+    entry = build_server_entry(server)
+
+    assert entry["tools"] == [tool["name"] for tool in server["tools"]]
+    assert entry["package"] == "npx::@modelcontextprotocol/server-slack@latest"
+
+
+def test_build_server_entry_pins_version(sample_mcp_registry):
+    """Test that an explicitly requested version overrides the registry one."""
+    entry = build_server_entry(sample_mcp_registry["sqlite"], tools=["read_query"], version="2025.1.1")
+
+    assert entry["package"] == "uvx::mcp-server-sqlite@2025.1.1"
+
+
+def test_build_server_entry_rejects_unknown_tools(sample_mcp_registry):
+    """Test that requesting a tool the server does not provide raises."""
+    with pytest.raises(ValueError, match="does not provide the tools"):
+        build_server_entry(sample_mcp_registry["slack"], tools=["slack_post_message", "slack_delete_workspace"])
+
+
+def test_select_installation_prefers_recommended():
+    """Test that the recommended installation wins over the runtime preference order."""
+    server = {
+        "name": "example",
+        "installations": {
+            "uvx": {"runtime": "uvx", "package": "example-mcp"},
+            "npx": {"runtime": "npx", "package": "@example/mcp", "recommended": True},
+            "docker": {"runtime": "docker", "package": "example/mcp", "recommended": True},
+        },
+    }
+
+    assert select_installation(server)["runtime"] == "npx"
+
+
+def test_select_installation_without_supported_runtime():
+    """Test that a server only installable with unsupported runtimes raises."""
+    server = {"name": "example", "installations": {"docker": {"runtime": "docker", "package": "example/mcp"}}}
+
+    with pytest.raises(ValueError, match="has no installation"):
+        select_installation(server)
+
+
+@pytest.fixture
+def cached_registry(sample_mcp_registry):
+    """Serve the sample registry through the cached registry lookup, starting from an empty fragment cache."""
+    _cached_server_fragment.cache_clear()
+    with (
+        patch(
+            "agent_factory.utils.mcpd_config.get_registry_server", side_effect=sample_mcp_registry.__getitem__
+        ) as mock_get_server,
+        patch("agent_factory.utils.mcpd_config.registry_version", return_value="v1") as mock_version,
+    ):
+        yield mock_get_server, mock_version
+    _cached_server_fragment.cache_clear()
+
+
+def test_server_fragment_cached_by_name_version_and_tools(cached_registry):
+    """Test that a server registered again with the same tools (in any order) is served from the cache."""
+    mock_get_server, _ = cached_registry
+
+    first = get_server_fragment("slack", tools=["slack_post_message", "slack_list_channels"])
+    second = get_server_fragment("slack", tools=["slack_list_channels", "slack_post_message"])
+    get_server_fragment("slack", tools=["slack_list_channels", "slack_post_message"], version="1.0.0")
+
+    assert first is second
+    assert mock_get_server.call_count == 2
+
+
+def test_server_fragment_cache_invalidated_on_registry_change(cached_registry):
+    """Test that the cached fragments are rebuilt when the registry metadata changes."""
+    mock_get_server, mock_version = cached_registry
+
+    get_server_fragment("sqlite", tools=["write_query"])
+    mock_version.return_value = "v2"
+    get_server_fragment("sqlite", tools=["write_query"])
+
+    assert mock_get_server.call_count == 2
+
+
+def test_register_mcp_servers(tmp_path, cached_registry):
+    """Test that registering several servers at once writes the generated config without launching mcpd."""
+    mcp_servers = GOLDEN_MCP_SERVERS["scoring-blueprints-submission"]
+    config_path = tmp_path / ".mcpd.toml"
+
+    with patch("agent_factory.utils.mcpd_utils.subprocess.run") as mock_run:
+        register_mcp_servers(mcp_servers, config_path)
+
+    mock_run.assert_not_called()
+    assert config_path.read_text() == generate_mcpd_config_artifacts(mcp_servers)[".mcpd.toml"]
+
+
+def test_register_mcp_servers_merges_existing_config(tmp_path, cached_registry):
+    """Test that the servers are added to those of an existing config file, which are kept as they are."""
+    mcp_servers = GOLDEN_MCP_SERVERS["scoring-blueprints-submission"]
+    first, others = mcp_servers[:1], mcp_servers[1:]
+    config_path = tmp_path / ".mcpd.toml"
+    config_path.write_text("")
+
+    register_mcp_servers(first, config_path)
+    register_mcp_servers(others, config_path)
+
+    assert config_path.read_text() == generate_mcpd_config_artifacts(mcp_servers)[".mcpd.toml"]
+    with pytest.raises(ValueError, match="already registered"):
+        register_mcp_servers(first, config_path)
+
+
+def test_register_mcp_servers_keeps_unsupported_config(tmp_path, cached_registry):
+    """Test that a config file with settings that would be lost by the merge is left untouched."""
+    config_path = tmp_path / ".mcpd.toml"
+    config_path.write_text('[[servers]]\n  name = "time"\n  package = "uvx::mcp-server-time@latest"\n  timeout = 5\n')
+
+    with pytest.raises(ValueError, match="unsupported settings \\['timeout'\\]"):
+        register_mcp_servers(GOLDEN_MCP_SERVERS["scoring-blueprints-submission"], config_path)
+
+    assert "timeout = 5" in config_path.read_text()
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from any_agent.tracing.attributes import GenAI
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from agent_factory.utils import model_routing
+from agent_factory.utils.model_routing import (
+    ROUTE_ATTRIBUTE,
+    ROUTE_LATENCY_ATTRIBUTE,
+    ModelRouter,
+    parse_model_routes,
+    summarize_long_webpages,
+    track_routed_costs,
+)
+
+
+@pytest.fixture
+def routed_calls(monkeypatch, mock_llm_response_factory):
+    """Answer the routed completions with "summary", recording their models and the exported spans."""
+    calls = []
+    exporter = InMemorySpanExporter()
+    tracer_provider = TracerProvider()
+    tracer_provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+    def completion(model, messages, **kwargs):
+        calls.append(model)
+        return mock_llm_response_factory(content="summary")
+
+    monkeypatch.setattr(model_routing, "completion", completion)
+    monkeypatch.setattr(model_routing, "tracer", tracer_provider.get_tracer(__name__))
+    monkeypatch.setattr(
+        model_routing, "_model_router", ModelRouter("openai/gpt-4o-mini", {"webpage_summary": "openai/gpt-4.1-nano"})
+    )
+    return calls, exporter
+
+
+def test_parse_model_routes():
+    assert parse_model_routes("") == {}
+    assert parse_model_routes(" readme = openai/gpt-4.1-mini, syntax_repair=openai/gpt-4o-mini,") == {
+        "readme": "openai/gpt-4.1-mini",
+        "syntax_repair": "openai/gpt-4o-mini",
+    }
+    with pytest.raises(ValueError, match="expected task=model"):
+        parse_model_routes("readme")
+    with pytest.raises(ValueError, match="Unknown task 'design'"):
+        parse_model_routes("design=openai/gpt-4o-mini")
+
+
+def test_routed_completion_span(routed_calls):
+    """Test that each task goes to its model, the call being recorded as an LLM call span with its route and cost."""
+    calls, exporter = routed_calls
+    router = model_routing.get_model_router()
+
+    router.completion("syntax_repair", [{"role": "user", "content": "Fix it"}])
+    router.completion("webpage_summary", [{"role": "user", "content": "Summarize it"}])
+
+    assert calls == ["openai/gpt-4o-mini", "openai/gpt-4.1-nano"]
+    spans = exporter.get_finished_spans()
+    assert [span.attributes[ROUTE_ATTRIBUTE] for span in spans] == ["syntax_repair", "webpage_summary"]
+    attributes = spans[0].attributes
+    assert attributes[GenAI.OPERATION_NAME] == "call_llm"
+    assert attributes[GenAI.REQUEST_MODEL] == "openai/gpt-4o-mini"
+    assert attributes[GenAI.USAGE_INPUT_TOKENS] == 3
+    assert attributes[ROUTE_LATENCY_ATTRIBUTE] >= 0
+    assert attributes[GenAI.USAGE_INPUT_COST] > 0
+
+
+async def test_track_routed_costs(routed_calls):
+    """Test that the costs of the routed calls are collected within the context, threads included."""
+    router = model_routing.get_model_router()
+    router.completion("syntax_repair", [{"role": "user", "content": "Fix it"}])
+
+    with track_routed_costs() as costs:
+        await asyncio.to_thread(router.completion, "syntax_repair", [{"role": "user", "content": "Fix it"}])
+        router.completion("readme", [{"role": "user", "content": "Write it"}])
+
+    assert len(costs) == 2
+    assert all(cost > 0 for cost in costs)
+
+
+def test_summarize_long_webpages(routed_calls, monkeypatch):
+    """Test that only the web pages longer than the threshold are summarized, and returned as is on failure."""
+    calls, _ = routed_calls
+
+    def visit_webpage(url: str, timeout: int = 30) -> str:
+        return "short page" if "short" in url else "x" * 100
+
+    summarized = summarize_long_webpages(visit_webpage, min_chars=50)
+
+    assert summarized("https://example.com/short") == "short page"
+    assert summarized(url="https://example.com/long") == "summary"
+    assert calls == ["openai/gpt-4.1-nano"]
+    assert summarize_long_webpages(visit_webpage, min_chars=0) is visit_webpage
+
+    def failing_completion(*args, **kwargs):
+        raise ConnectionError("model unavailable")
+
+    monkeypatch.setattr(model_routing, "completion", failing_completion)
+    assert summarized("https://example.com/long") == "x" * 100
@@ -0,0 +1,81 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from agent_factory import factory_tools
+from agent_factory.factory_tools import preload_tool_sources, read_file, read_files
+
+
+@pytest.fixture
+def tools_dir(tmp_path):
+    tools_dir = tmp_path / "tools"
+    tools_dir.mkdir()
+    (tools_dir / "README.md").write_text("# Tools")
+    (tools_dir / "first_tool.py").write_text("def first_tool(): ...")
+    (tools_dir / "second_tool.py").write_text("def second_tool(): ...")
+    with patch.dict(factory_tools._file_cache, clear=True):
+        yield tools_dir
+
+
+def test_read_file_cached(tools_dir):
+    """Test that a file is only read from disk once while it is unchanged."""
+    file_name = str(tools_dir / "first_tool.py")
+
+    with patch("pathlib.Path.read_text", autospec=True, side_effect=lambda path: "cached") as mock_read_text:
+        assert read_file(file_name) == "cached"
+        assert read_file(file_name) == "cached"
+
+    assert mock_read_text.call_count == 1
+
+
+def test_read_file_reloaded_on_change(tools_dir):
+    """Test that a modified file is read again."""
+    file_path = tools_dir / "first_tool.py"
+    assert read_file(str(file_path)) == "def first_tool(): ..."
+
+    file_path.write_text("def first_tool(updated): ...")
+    os.utime(file_path, ns=(0, file_path.stat().st_mtime_ns + 1_000_000))
+
+    assert read_file(str(file_path)) == "def first_tool(updated): ..."
+
+
+def test_read_file_large_files_not_cached(tools_dir):
+    """Test that files larger than the size cap are not kept in memory."""
+    file_path = tools_dir / "first_tool.py"
+
+    with patch.object(factory_tools, "MAX_CACHED_FILE_SIZE", 4):
+        assert read_file(str(file_path)) == "def first_tool(): ..."
+
+    assert file_path.resolve() not in factory_tools._file_cache
+
+
+def test_read_file_not_allowed(tmp_path):
+    """Test that only files in a `tools` directory can be read."""
+    with pytest.raises(ValueError, match="parent dir must be `tools`"):
+        read_file(str(tmp_path / "secrets.txt"))
+
+
+def test_read_files(tools_dir):
+    """Test that several files are read in a single call, keyed by the given names."""
+    file_names = [str(tools_dir / "README.md"), str(tools_dir / "second_tool.py")]
+
+    assert read_files(file_names) == {file_names[0]: "# Tools", file_names[1]: "def second_tool(): ..."}
+
+
+def test_read_files_not_allowed(tools_dir, tmp_path):
+    """Test that no file is read if any of the paths is not allowed."""
+    with pytest.raises(ValueError, match="parent dir must be `tools`"):
+        read_files([str(tools_dir / "README.md"), str(tmp_path / "secrets.txt")])
+
+    assert not factory_tools._file_cache
+
+
+def test_preload_tool_sources(tools_dir):
+    """Test that the tool files are loaded in the cache eagerly."""
+    assert preload_tool_sources(tools_dir) == 3
+
+    with patch("pathlib.Path.read_text", autospec=True) as mock_read_text:
+        assert read_file(str(tools_dir / "second_tool.py")) == "def second_tool(): ..."
+
+    mock_read_text.assert_not_called()
@@ -1,53 +1,164 @@
+import json
+from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 
-from agent_factory.factory_tools import KEYS_TO_DROP, search_mcp_servers
+from agent_factory.factory_tools import (
+    KEYS_TO_DROP,
+    _search_cache,
+    get_mcp_server_details,
+    search_mcp_servers,
+    search_mcp_servers_cache_info,
+)
+from agent_factory.utils.mcp_registry import get_registry_server
+from agent_factory.utils.mcp_registry_index import RegistryIndex
+
+UNIT_TESTS_DATA_DIR = Path(__file__).parent / "data"
+
+
+@pytest.fixture
+def sample_registry_index() -> RegistryIndex:
+    with (UNIT_TESTS_DATA_DIR / "sample_mcp_registry.json").open() as f:
+        index = RegistryIndex(json.load(f)["results"], version="sample")
+    _search_cache.clear()
+    with patch("agent_factory.factory_tools.get_registry_index_async", return_value=index):
+        yield index
+    _search_cache.clear()
 
 
 @pytest.mark.parametrize("is_official", [True, False])
-def test_search_mcp_servers_cleaned(is_official):
+async def test_search_mcp_servers_cleaned(is_official):
     """Test that search_mcp_servers returns cleaned server descriptions."""
-    results = search_mcp_servers("database", is_official=is_official)
+    results = await search_mcp_servers("database", is_official=is_official)
     for result in results:
         assert all(k not in KEYS_TO_DROP for k in result)
         assert all("inputSchema" not in tool for tool in result.get("tools", []))
 
 
 @pytest.mark.parametrize("keyphrase", ["slack", "github", "google calendar"])
-def test_search_mcp_servers_contains_keyphrase(keyphrase):
-    """Test that search results contain the keyphrase in name, description, or tags."""
-    results = search_mcp_servers(keyphrase)
+async def test_search_mcp_servers_contains_keyphrase(keyphrase):
+    """Test that every word of the keyphrase is found in the indexed fields of the search results."""
+    results = await search_mcp_servers(keyphrase)
 
     for result in results:
-        keyphrase_found = (
-            (keyphrase.lower() in result.get("name", "").lower())
-            or (keyphrase.lower() in result.get("description", "").lower())
-            or any(keyphrase.lower() in tag.lower() for tag in result.get("tags", []))
-        )
-        assert keyphrase_found, f"Keyphrase '{keyphrase}' not found in result: {result}"
+        server = get_registry_server(result["name"])
+        indexed_words = " ".join(
+            [
+                server.get("name", ""),
+                server.get("displayName", ""),
+                server.get("description", ""),
+                *(tool["name"] for tool in server.get("tools", [])),
+                *server.get("categories", []),
+                *server.get("tags", []),
+            ]
+        ).lower()
+        for word in keyphrase.split():
+            assert word in indexed_words, f"Keyphrase '{keyphrase}' not found in result: {result}"
 
 
 @pytest.mark.parametrize("invalid_keyphrase", ["slack,github", ""])
-def test_search_mcp_servers_validate_single_word(invalid_keyphrase):
+async def test_search_mcp_servers_validate_single_word(invalid_keyphrase):
     """Test that search_mcp_servers raises ValueError for multi-word or empty keyphrases."""
     with pytest.raises(ValueError, match="Keyphrase must be a single word"):
-        search_mcp_servers(invalid_keyphrase)
+        await search_mcp_servers(invalid_keyphrase)
 
 
-def test_search_mcp_servers_normalizes_keyphrase():
+async def test_search_mcp_servers_normalizes_keyphrase(sample_registry_index):
     """Test that search_mcp_servers applies strip() and lower() to the keyphrase."""
-    test_cases = [
-        ("  GITHUB  ", "github"),
-        ("GitHub", "github"),
+    for keyphrase in ["  SLACK  ", "Slack"]:
+        results = await search_mcp_servers(keyphrase=keyphrase)
+        assert [result["name"] for result in results] == ["slack"]
+
+
+async def test_search_mcp_servers_does_not_modify_index(sample_registry_index):
+    """Test that cleaning up the results leaves the indexed records untouched."""
+    indexed_server = json.loads(json.dumps(sample_registry_index.servers_by_name["sqlite"]))
+
+    results = await search_mcp_servers("sqlite", compact=False)
+    results[0]["tools"][0]["name"] = "modified"
+    results[0]["installations"].clear()
+
+    assert sample_registry_index.servers_by_name["sqlite"] == indexed_server
+
+
+async def test_search_mcp_servers_cached_by_normalized_query(sample_registry_index):
+    """Test that repeated searches differing only in case, whitespace or filter order are served from the cache."""
+    with patch.object(sample_registry_index, "search", wraps=sample_registry_index.search) as mock_search:
+        first = await search_mcp_servers("slack", tags=["b", "a"], license="MIT")
+        second = await search_mcp_servers("  SLACK ", tags=["A", "b"], license="mit")
+
+    assert first == second
+    assert mock_search.call_count == 1
+    assert search_mcp_servers_cache_info()[:2] == (1, 1)
+
+
+async def test_search_mcp_servers_normalizes_filters(sample_registry_index):
+    """Test that the filters are searched with the normalized values they are cached by."""
+    padded = await search_mcp_servers("*", license=" MIT ")
+    _search_cache.clear()
+    exact = await search_mcp_servers("*", license="mit")
+
+    assert padded == exact
+    assert [server["name"] for server in exact] == ["elevenlabs-mcp", "slack", "sqlite"]
+
+
+async def test_search_mcp_servers_cache_invalidated_on_registry_change(sample_registry_index):
+    """Test that cached results are not reused once the registry version changes."""
+    await search_mcp_servers("slack")
+    sample_registry_index.version = "updated"
+    await search_mcp_servers("slack")
+
+    assert search_mcp_servers_cache_info()[:2] == (0, 2)
+
+
+async def test_search_mcp_servers_cached_results_are_copies(sample_registry_index):
+    """Test that modifying returned results does not affect later cache hits."""
+    results = await search_mcp_servers("slack")
+    results[0]["name"] = "modified"
+
+    assert (await search_mcp_servers("slack"))[0]["name"] == "slack"
+
+
+async def test_search_mcp_servers_compact(sample_registry_index):
+    """Test that compact results only hold the server name, a one-line description and the tool names."""
+    results = await search_mcp_servers("sqlite")
+
+    assert results == [
+        {
+            "name": "sqlite",
+            "description": sample_registry_index.servers_by_name["sqlite"]["description"],
+            "tools": [tool["name"] for tool in sample_registry_index.servers_by_name["sqlite"]["tools"]],
+        }
     ]
 
-    for input_kw, expected_kw in test_cases:
-        with patch("agent_factory.factory_tools.run_binary") as mock_run:
-            mock_run.return_value = {"results": []}
-            search_mcp_servers(keyphrase=input_kw)
-            assert mock_run.call_args is not None
-            assert len(mock_run.call_args.args) > 1
-            args = mock_run.call_args.args[1]  # element 0 should be the cmd, element 1 should be the 'args'.
-            assert expected_kw in args
-            assert expected_kw == args[1]  # should be the 2nd element (after the subcommand).
+
+async def test_search_mcp_servers_pagination(sample_registry_index):
+    """Test that `limit` and `offset` page through the results, reusing the cached search."""
+    all_names = [result["name"] for result in await search_mcp_servers("*")]
+    pages = [await search_mcp_servers("*", limit=2, offset=offset) for offset in (0, 2)]
+
+    assert [result["name"] for page in pages for result in page] == all_names
+    assert len(pages[0]) == 2
+    assert search_mcp_servers_cache_info()[:2] == (2, 1)
+
+
+@pytest.mark.parametrize(("limit", "offset"), [(0, 0), (5, -1)])
+async def test_search_mcp_servers_validate_pagination(limit, offset):
+    """Test that invalid pagination arguments raise ValueError."""
+    with pytest.raises(ValueError, match="`limit` must be at least 1"):
+        await search_mcp_servers("slack", limit=limit, offset=offset)
+
+
+async def test_get_mcp_server_details(sample_registry_index):
+    """Test that the full registry record of a server is returned, as a copy."""
+    details = await get_mcp_server_details(" slack ")
+    details["tools"].clear()
+
+    assert await get_mcp_server_details("slack") == sample_registry_index.servers_by_name["slack"]
+
+
+async def test_get_mcp_server_details_unknown_server(sample_registry_index):
+    """Test that an unknown server name raises ValueError pointing to the search tool."""
+    with pytest.raises(ValueError, match="search_mcp_servers"):
+        await get_mcp_server_details("not-a-server")
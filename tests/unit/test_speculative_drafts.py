@@ -0,0 +1,138 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from any_agent import AgentRunError
+from any_agent.tracing.agent_trace import AgentTrace
+from any_agent.tracing.attributes import GenAI
+from opentelemetry import trace
+from opentelemetry.trace import format_trace_id
+
+from agent_factory.callbacks import StopSpeculativeDrafts, current_draft
+from agent_factory.schemas import AgentFactoryOutputs
+from agent_factory.utils import model_routing, speculative_drafts
+from agent_factory.utils.speculative_drafts import SpeculativeAgent
+
+tracer = trace.get_tracer(__name__)
+
+
+class FakeAgent:
+    """Runs each draft as a number of LLM calls of a given duration and cost, going through the callbacks."""
+
+    def __init__(self, drafts: list[tuple[int, float, float, AgentFactoryOutputs | None]]):
+        self.config = SimpleNamespace(callbacks=[])
+        self.drafts = drafts
+        self.started: list[int] = []
+        self.stopped: list[int] = []
+        self.cancelled: list[int] = []
+
+    async def run_async(self, prompt: str) -> AgentTrace:
+        _, index = current_draft.get()
+        self.started.append(index)
+        n_calls, duration, cost, outputs = self.drafts[index]
+        # Export a span of the draft to its trace file, as the A2A server does.
+        trace_id = format_trace_id(trace.get_current_span().get_span_context().trace_id)
+        (speculative_drafts.TRACES_DIR / f"0x{trace_id}.jsonl").write_text(f"draft {index}\n")
+        context = MagicMock()
+        try:
+            for _ in range(n_calls):
+                for callback in self.config.callbacks:
+                    callback.before_llm_call(context)
+                await asyncio.sleep(duration)
+                context.current_span.attributes = {GenAI.USAGE_INPUT_COST: cost, GenAI.USAGE_OUTPUT_COST: 0.0}
+                for callback in self.config.callbacks:
+                    callback.after_llm_call(context)
+        except RuntimeError as e:
+            self.stopped.append(index)
+            raise AgentRunError(AgentTrace(), e) from e
+        except asyncio.CancelledError:
+            self.cancelled.append(index)
+            raise
+        if outputs is None:
+            raise AgentRunError(AgentTrace(), RuntimeError("Reached limit of agent turns"))
+        return AgentTrace(final_output=outputs)
+
+
+@pytest.fixture(autouse=True)
+def traces_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(speculative_drafts, "TRACES_DIR", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def outputs(sample_generator_agent_response_json, monkeypatch):
+    """Valid and invalid outputs, the artifacts of the invalid ones failing to be prepared after a syntax repair."""
+
+    def repair_syntax(cost):
+        if (routed_costs := model_routing._routed_costs.get()) is not None:
+            routed_costs.append(cost)
+
+    async def prepare_agent_artifacts_async(agent_factory_outputs, cache=None):
+        if agent_factory_outputs["readme"].startswith("invalid"):
+            await asyncio.to_thread(repair_syntax, float(agent_factory_outputs["readme"].partition(":")[2] or 0))
+            raise SyntaxError("invalid syntax")
+        return {}
+
+    monkeypatch.setattr(
+        "agent_factory.utils.speculative_drafts.prepare_agent_artifacts_async", prepare_agent_artifacts_async
+    )
+    valid = AgentFactoryOutputs.model_validate(sample_generator_agent_response_json)
+    return valid, valid.model_copy(update={"readme": "invalid"})
+
+
+@pytest.mark.asyncio
+async def test_first_valid_draft_wins(outputs, traces_dir):
+    """Test that the first valid draft is returned, skipping the invalid ones, and that the others are stopped."""
+    valid, invalid = outputs
+    agent = FakeAgent([(5, 0.05, 0.0, valid), (1, 0.01, 0.0, invalid), (2, 0.01, 0.0, valid)])
+    speculative_agent = SpeculativeAgent(agent, drafts=3)
+
+    with tracer.start_as_current_span("request") as span:
+        agent_trace = await speculative_agent.run_async("Summarize a webpage")
+    await asyncio.sleep(0.1)
+
+    assert agent_trace.final_output is valid
+    assert sorted(agent.started) == [0, 1, 2]
+    assert agent.cancelled == [0]
+    assert sum(isinstance(callback, StopSpeculativeDrafts) for callback in agent.config.callbacks) == 1
+    # Only the spans of the returned draft are kept, in the trace of the request.
+    request_trace_file = traces_dir / f"0x{format_trace_id(span.get_span_context().trace_id)}.jsonl"
+    assert [path.name for path in traces_dir.iterdir()] == [request_trace_file.name]
+    assert request_trace_file.read_text() == "draft 2\n"
+
+
+@pytest.mark.asyncio
+async def test_drafts_cost_cap_and_concurrency(outputs):
+    """Test that no more drafts run at once than allowed, and that the extra drafts stop at the cost cap."""
+    _, invalid = outputs
+    agent = FakeAgent([(1, 0.01, 1.0, invalid), (3, 0.01, 1.0, invalid), (1, 0.01, 1.0, invalid)])
+    speculative_agent = SpeculativeAgent(agent, drafts=3, max_concurrent_drafts=1, max_cost=2.5)
+
+    trace = await speculative_agent.run_async("Summarize a webpage")
+
+    # The first draft is kept as a fallback, as none of them is valid.
+    assert trace.final_output is invalid
+    assert agent.started == [0, 1]
+    assert agent.stopped == [1]
+
+
+@pytest.mark.asyncio
+async def test_all_drafts_failing(outputs):
+    """Test that the error of the first failed draft is raised if no draft finished."""
+    agent = FakeAgent([(1, 0.01, 0.0, None), (1, 0.02, 0.0, None)])
+
+    with pytest.raises(AgentRunError, match="agent turns"):
+        await SpeculativeAgent(agent, drafts=2).run_async("Summarize a webpage")
+
+
+@pytest.mark.asyncio
+async def test_drafts_cost_cap_counts_syntax_repairs(outputs):
+    """Test that the syntax repairs made to validate a draft count towards the cost cap of the drafts."""
+    _, invalid = outputs
+    repaired = invalid.model_copy(update={"readme": "invalid:2.0"})
+    agent = FakeAgent([(1, 0.01, 0.5, repaired), (1, 0.01, 0.5, invalid)])
+
+    await SpeculativeAgent(agent, drafts=2, max_concurrent_drafts=1, max_cost=2.0).run_async("Summarize a webpage")
+
+    assert agent.started == [0]
@@ -0,0 +1,74 @@
+import json
+
+from starlette.testclient import TestClient
+
+from agent_factory.schemas import AgentFactoryOutputs, Status
+from agent_factory.stub_model_server import DEFAULT_TOOL_CALLS, StubModel, create_app
+
+TOOLS = [{"type": "function", "function": {"name": "search_mcp_servers", "parameters": {}}}]
+
+
+def _request(client: TestClient, messages: list[dict], **params) -> dict:
+    response = client.post("/v1/chat/completions", json={"model": "stub", "messages": messages, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_stub_model_follows_script():
+    """Test that each turn requests the next scripted tool calls, and then the final AgentFactoryOutputs."""
+    client = TestClient(create_app(StubModel(completion_tokens=42)))
+    messages = [{"role": "system", "content": "instructions"}, {"role": "user", "content": "build an agent"}]
+
+    for turn in DEFAULT_TOOL_CALLS:
+        completion = _request(client, messages, tools=TOOLS)
+        message = completion["choices"][0]["message"]
+        assert completion["choices"][0]["finish_reason"] == "tool_calls"
+        assert [call["function"]["name"] for call in message["tool_calls"]] == [name for name, _ in turn]
+        assert completion["usage"]["completion_tokens"] == 42
+        messages.append(message)
+        messages.extend(
+            {"role": "tool", "tool_call_id": call["id"], "content": "result"} for call in message["tool_calls"]
+        )
+
+    completion = _request(client, messages, tools=TOOLS)
+    output = AgentFactoryOutputs.model_validate_json(completion["choices"][0]["message"]["content"])
+    assert output.status == Status.COMPLETED
+    assert completion["choices"][0]["finish_reason"] == "stop"
+
+
+def test_stub_model_final_answer_without_tools():
+    """Test that requests without tools, e.g. to conform the answer to the response format, get the final answer."""
+    client = TestClient(create_app(StubModel()))
+    completion = _request(client, [{"role": "user", "content": "Please conform this output"}])
+    AgentFactoryOutputs.model_validate_json(completion["choices"][0]["message"]["content"])
+
+
+def test_stub_model_streaming():
+    """Test that streamed responses are sent as server-sent chat completion chunks."""
+    client = TestClient(create_app(StubModel()))
+    response = client.post(
+        "/v1/chat/completions",
+        json={"model": "stub", "messages": [{"role": "user", "content": "build"}], "tools": TOOLS, "stream": True},
+    )
+
+    events = [line.removeprefix("data: ") for line in response.text.splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(event) for event in events[:-1]]
+    assert chunks[0]["object"] == "chat.completion.chunk"
+    assert chunks[0]["choices"][0]["delta"]["tool_calls"][0]["function"]["name"] == "search_mcp_servers"
+    assert chunks[1]["choices"][0]["finish_reason"] == "tool_calls"
+    assert chunks[2]["usage"]["total_tokens"] > 0
+
+
+def test_stub_model_final_answer_envelope():
+    """Test that the final answer is wrapped in the A2A envelope when the response format requires it."""
+    client = TestClient(create_app(StubModel()))
+    response_format = {
+        "type": "json_schema",
+        "json_schema": {"name": "Return", "schema": {"properties": {"task_status": {}, "data": {}}}},
+    }
+    completion = _request(client, [{"role": "user", "content": "build"}], response_format=response_format)
+
+    answer = json.loads(completion["choices"][0]["message"]["content"])
+    assert answer["task_status"] == "completed"
+    AgentFactoryOutputs.model_validate(answer["data"])
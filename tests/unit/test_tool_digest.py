@@ -0,0 +1,94 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from agent_factory.config import TOOLS_DIR
+from agent_factory.instructions import load_system_instructions
+from agent_factory.utils.tool_digest import _build_digest, build_tool_digest, module_digest
+
+ARTIFACTS_DIR = Path(__file__).parent.parent / "artifacts"
+
+SAMPLE_TOOL_SOURCE = '''
+def _helper(text: str) -> str:
+    return text
+
+
+def fetch_page(url: str, timeout: int = 30, *, headers: dict | None = None) -> str:
+    """Fetch the page at the given url.
+
+    Args:
+        url: The url of the page.
+    """
+
+
+async def ping(host):
+    pass
+'''
+
+
+def test_module_digest():
+    """Test that public functions are listed with their signature and the first line of their docstring."""
+    assert module_digest(SAMPLE_TOOL_SOURCE, "fetch_page") == [
+        (
+            "- `tools/fetch_page.py`: `fetch_page(url: str, timeout: int=30, *, headers: dict | None=None) -> str` - "
+            "Fetch the page at the given url."
+        ),
+        "- `tools/fetch_page.py`: `async ping(host)`",
+    ]
+
+
+def test_build_tool_digest_covers_every_tool():
+    """Test that the digest lists every tool module, and is served from the cache while the tools are unchanged."""
+    _build_digest.cache_clear()
+
+    digest = build_tool_digest()
+    assert build_tool_digest() is digest
+    assert _build_digest.cache_info().hits == 1
+
+    for path in TOOLS_DIR.glob("*.py"):
+        if path.name != "__init__.py":
+            assert f"`tools/{path.name}`: `{path.stem}(" in digest
+
+
+@pytest.mark.parametrize("chat", [True, False])
+def test_load_system_instructions_tool_digest(chat):
+    """Test that the tool digest is only embedded in the system instructions when requested."""
+    assert build_tool_digest() in load_system_instructions(chat=chat, include_tool_digest=True)
+    assert "**Available Python Tools**" not in load_system_instructions(chat=chat)
+
+
+def _count_turns(prompt_id: str, tool_digest: str | None = None) -> int:
+    """Count the LLM turns of a recorded generation, leaving out the turns only spent reading files in the digest."""
+    with (ARTIFACTS_DIR / prompt_id / "agent_factory_trace.json").open() as f:
+        spans = sorted(json.load(f)["spans"], key=lambda span: span["start_time"])
+
+    turns: list[list[dict]] = []
+    for span in spans:
+        if span["name"].startswith("call_llm"):
+            turns.append([])
+        elif span["name"].startswith("execute_tool") and turns:
+            turns[-1].append(span["attributes"])
+
+    def covered_by_digest(tool_call: dict) -> bool:
+        if tool_call["gen_ai.tool.name"] != "read_file":
+            return False
+        file_name = json.loads(tool_call["gen_ai.tool.args"])["file_name"]
+        return file_name == "tools/README.md" or f"`{file_name}`" in tool_digest
+
+    if tool_digest is None:
+        return len(turns)
+    return sum(1 for tool_calls in turns if not tool_calls or not all(map(covered_by_digest, tool_calls)))
+
+
+@pytest.mark.parametrize(
+    ("prompt_id", "expected_turns"),
+    [("summarize-url-content", 1), ("url-to-podcast", 2), ("scoring-blueprints-submission", 3)],
+)
+def test_tool_digest_turn_count_on_recorded_prompts(prompt_id, expected_turns):
+    """Compare the turns of the recorded generations with the turns left once the tool files are not read."""
+    recorded_turns = _count_turns(prompt_id)
+    turns_with_digest = _count_turns(prompt_id, build_tool_digest())
+
+    assert turns_with_digest == expected_turns
+    assert turns_with_digest <= recorded_turns
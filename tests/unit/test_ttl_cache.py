@@ -0,0 +1,38 @@
+from unittest.mock import patch
+
+from agent_factory.utils.ttl_cache import TTLCache
+
+
+def test_ttl_cache_hits_and_misses():
+    """Test that stored values are returned and the counters are updated."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.put("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.cache_info() == (1, 1, 2, 1)
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    """Test that the least recently used entry is evicted when the cache is full."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries():
+    """Test that entries are not returned once their time-to-live has elapsed."""
+    cache = TTLCache(maxsize=2, ttl=10)
+    with patch("agent_factory.utils.ttl_cache.time.monotonic", return_value=100.0):
+        cache.put("a", 1)
+    with patch("agent_factory.utils.ttl_cache.time.monotonic", return_value=109.0):
+        assert cache.get("a") == 1
+    with patch("agent_factory.utils.ttl_cache.time.monotonic", return_value=110.0):
+        assert cache.get("a") is None
+    assert len(cache) == 0